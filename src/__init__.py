@@ -13,3 +13,20 @@ from .rt import *
 from .ip import *
 from .heap import *
 from .utils import *
+from .stats import *
+from .cache import *
+from .spatial import *
+from .snapshot import MappedRoutingTable
+from .fib import Fib
+from .graph import CsrGraph
+from .forward import Forwarder, ForwardingReport
+from .traffic import LinkUtilization, link_utilization
+from .failures import RouteChange
+from .neighbor import Neighbor, NeighborState
+from .timer import Timer, TimerWheel
+from .trace import (ReplayReport, StepResult, Trace, TraceEvent,
+                    compare_engines, replay)
+from .export import (export_binary, export_csv, export_jsonl, export_tables,
+                     read_binary)
+from .ring import RingBuffer
+from .partition import PartitionedNetwork
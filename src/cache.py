@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+
+from collections import OrderedDict
+from sys import getsizeof
+from typing import Any, Generic, Hashable, Optional, Set, Tuple, TypeVar
+
+
+V = TypeVar("V")
+
+
+def estimate_size(o: Any) -> int:
+    """
+    Estimate how many bytes an object takes, including the objects it refers
+    to through its attributes or as the elements of a list, tuple, set or
+    dictionary. Objects referred to several times are counted once.
+    """
+    seen: Set[int] = set()
+    size = 0
+    todo = [o]
+    while todo:
+        o = todo.pop()
+        if id(o) in seen:
+            continue
+        seen.add(id(o))
+        size += getsizeof(o)
+        if isinstance(o, (list, tuple, set, frozenset)):
+            todo.extend(o)
+        elif isinstance(o, dict):
+            todo.extend(o.keys())
+            todo.extend(o.values())
+        elif hasattr(o, "__dict__"):
+            todo.append(vars(o))
+    return size
+
+
+class LRUCache(Generic[V]):
+    """
+    A least recently used cache bounded by the estimated memory size of its
+    values instead of their count.
+
+    ---
+    Attributes:
+    ---
+    * limit: int : maximum number of bytes taken by all cached values.
+    * _size: int : number of bytes currently taken.
+    * _data: OrderedDict[Hashable, Tuple[V, int]] : cached values and their
+      sizes, the least recently used ones first.
+    """
+    def __init__(self, limit: int) -> None:
+        self.limit: int = limit
+        self._size: int = 0
+        self._data: "OrderedDict[Hashable, Tuple[V, int]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[V]:
+        """
+        Return a cached value, None if it is not cached.
+        """
+        item = self._data.get(key)
+        if item is None:
+            return None
+        self._data.move_to_end(key)
+        return item[0]
+
+    def put(self, key: Hashable, value: V, size: Optional[int] = None) -> None:
+        """
+        Cache a value, evicting the least recently used values until
+        everything fits.
+
+        :key: key of the value.
+        :value: the value.
+        :size: size of the value in bytes, estimated when not given.
+        """
+        if size is None:
+            size = estimate_size(value)
+        self.discard(key)
+        if size > self.limit:
+            return
+        self._data[key] = (value, size)
+        self._size += size
+        while self._size > self.limit:
+            _, (_, s) = self._data.popitem(last=False)
+            self._size -= s
+
+    def discard(self, key: Hashable) -> None:
+        """
+        Remove a value from the cache, if it is there.
+        """
+        item = self._data.pop(key, None)
+        if item is not None:
+            self._size -= item[1]
+
+    def clear(self) -> None:
+        """
+        Remove all values from the cache.
+        """
+        self._data.clear()
+        self._size = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -3,7 +3,24 @@ import sys
 CANVAS_WIDTH = 800
 CANVAS_HEIGHT = 600
 RADIUS = 15
-if "--debug" or "-d" in sys.argv:
-    flag_debug = True
-if "--silent" or "-s" in sys.argv:
-    flag_silent = True
+ANIMATION_DELAY = 2000
+ANIMATION_MIN_DELAY = 50
+ANIMATION_MAX_DELAY = 5000
+POLL_INTERVAL = 50
+ZOOM_MIN = 0.02
+ZOOM_MAX = 4.0
+ZOOM_STEP = 1.2
+DETAIL_ZOOM = 0.5
+PAN_STEP = 50
+REDRAW_DELAY = 100
+CACHE_SIZE = 64 * 1024 * 1024
+DENSE_MAX_ROUTERS = 1000
+DENSE_MIN_DENSITY = 0.02
+HELLO_INTERVAL = 10
+DEAD_INTERVAL = 40
+MAX_AGE = 3600
+MAX_COST = 0xffff
+MAX_PRIORITY = 0xff
+RING_SIZE = 4 * 1024 * 1024
+flag_debug = "--debug" in sys.argv or "-d" in sys.argv
+flag_silent = "--silent" in sys.argv or "-s" in sys.argv
@@ -1,90 +1,123 @@
 #!/usr/bin/env python3
-from .link_state import LinkStateAdvertisement
-from .rt import RoutingTable, RTEntry
-from heapq import heappop, heappush
-from typing import List, Optional, Tuple
+from .graph import CsrGraph
+from .lfa import loop_free_alternates
+from .link_state import LinkStateAdvertisement, LinkType
+from .rt import DestType, RoutingTable, RTEntry
+from .stats import Stats
+from .utils import DEBUG, log
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 from sys import maxsize
 
 
-class Node:
-    """
-    Node in a graph.
+Key = Tuple[int, int, int]
 
-    This is used when we run the Dijkstra's algorithm for finding the best
-    paths to each router in a network.
 
-    ---
-    Attributes:
-    ---
-        * id : int : Router ID of this router represented as a graph vertex(node).
-        * cost int : Cost of getting to this vertex. The lower the index, the 
-                     likelier is a vertex going to be visited.
-        * neighbors: List[Tuple[Node, int]] : A list of all neighbor vertices.
-        * previous : A reference to the previous node.
+def _key(adv: LinkStateAdvertisement) -> Key:
     """
-    def __init__(self, id: int) -> None:
-        """
-        Create a new node.
-
-        :id: unique id of the Node, in our case a router, therefore, this
-             should be the router ID of the router we are interpreting as a
-             node.
-        """
-        self.id: int = id
-        self.cost: int = maxsize
-        self.neighbors: List[Tuple[Node, int]] = list()
-        self.previous: Optional[Node] = None
-
-    def add(self, n: "Node", cost: int) -> None:
-        """
-        Add a new neighbor to an existing node.
-
-        :n: Node object we want to add as a neighbor.
-        :cost: The cost of the link between this node and the one we are
-        adding.
-        """
-        self.neighbors.append((n, cost))
-
-    def __lt__(self, o: "Node") -> bool:
-        """
-        This method is implemented due to the fact that we are passing nodes
-        into a heap, because our Dijkstra's algorithm is implemented using a min
-        heap.
-        """
-        return self.cost < o.cost
-
-    def __str__(self) -> str:
-        return f"Node: {{ {self.id}, {self.cost}, {self.neighbors} }}"
+    Return what identifies an advertisement, newer instances of it replace
+    the older ones.
+    """
+    return (adv.ls_type, adv.ls_id, adv.advertising_router)
 
 
 class LinkStateDatabase:
     """
     Database holding all Link State Advertisements received by the router.
+
+    Advertisements are kept in a dictionary keyed by what identifies them in
+    OSPF(RFC 2328, section 12.1), their type, link state ID and advertising
+    router, so that a single advertisement can be added, replaced or removed
+    in constant time. The
+    graph of the network is built from them once and kept, until they change.
+
+    The routers of an area, whose databases are in sync, all share a single
+    database, the network floods the changes into it once and every router
+    sees them at once. A router, which is changed on its own, keeps only its
+    differences from the shared database in an overlay, the shared
+    advertisements are never copied. The memory taken grows with the number
+    of advertisements and the differences, not with the number of routers.
+
+    ---
+    Attributes:
+    ---
+    * _content: Dict[Key, LinkStateAdvertisement] : advertisements, keyed by
+      `_key()`, added on top of the shared database, if there is one, they
+      take the place of the shared ones with the same key.
+    * _my_id: int : index of the router the database belongs to.
+    * _base: Optional[LinkStateDatabase] : shared database, this one is an
+      overlay of, None for a database of its own.
+    * _removed: Set[Key] : keys of the advertisements of the shared
+      database, which were removed from this one.
+    * version: int : incremented with every change.
+    * _built: Optional[tuple] : the graph and stub networks built from the
+      advertisements, along with the versions of the shared database and of
+      this one they were built from.
     """
-    def __init__(self, id: int) -> None:
+    def __init__(self,
+                 id: int,
+                 base: Optional["LinkStateDatabase"] = None) -> None:
         """
         Creates a new Link State Database.
 
         :id: Router ID of our current router. This is required, because we need
              to know our router ID when we run the SPF algorithm.
              Theoretically, this is not necessary to have as a class attribute.
+        :base: shared database of the area, the new database starts out in
+               sync with it.
         """
-        self._content: List[LinkStateAdvertisement] = list()
+        self._content: Dict[Key, LinkStateAdvertisement] = dict()
         self._my_id: int = id
+        self._base: Optional[LinkStateDatabase] = base
+        self._removed: Set[Key] = set()
+        self.version: int = 0
+        self._built: Optional[tuple] = None
 
     def __getitem__(self, key: int) -> Optional[LinkStateAdvertisement]:
-        for each in self._content:
+        for each in self._lsas():
             if each.ls_id == key:
                 return each
         return None
 
+    def __len__(self) -> int:
+        return sum(1 for _ in self._lsas())
+
+    def _lsas(self) -> Iterator[LinkStateAdvertisement]:
+        """
+        Iterate over all advertisements, the shared ones followed by the ones
+        of the overlay.
+        """
+        base = self._base
+        if base is None:
+            yield from self._content.values()
+            return
+        removed = self._removed
+        content = self._content
+        for key, adv in base._content.items():
+            if key not in removed and key not in content:
+                yield adv
+        yield from content.values()
+
+    def in_sync(self) -> bool:
+        """
+        Check if the database holds exactly the advertisements of the shared
+        database, it is an overlay of.
+        """
+        return self._base is not None and\
+            not self._content and not self._removed
+
     def add(self, adv: LinkStateAdvertisement) -> None:
         """
         Add a new link state advertisement to the link state database.
 
         :adv: A Link State Advertisement we wish to be added to the database.
         """
-        self._content.append(adv)
+        key = _key(adv)
+        self._removed.discard(key)
+        if self._base is not None and self._base._content.get(key) is adv:
+            self._content.pop(key, None)
+        else:
+            self._content[key] = adv
+        self.version += 1
 
     def remove(self, adv: LinkStateAdvertisement) -> None:
         """
@@ -92,11 +125,46 @@ class LinkStateDatabase:
 
         :adv: A Link State Advertisement we wish removed from the database.
         """
-        for each in self._content:
-            if each.ls_id == adv.ls_id:
-                self._content.remove(each)
+        key = _key(adv)
+        base = self._base._content if self._base is not None else {}
+        if self._content.get(key) is adv:
+            del self._content[key]
+        elif base.get(key) is not adv or key in self._removed:
+            # an older instance, which was already replaced
+            return
+        if key in base:
+            self._removed.add(key)
+        self.version += 1
+
+    def _build(self) -> Tuple[CsrGraph, List[LinkStateAdvertisement]]:
+        """
+        Return the graph and the stub networks, building them only if the
+        advertisements changed since the last time. A database in sync with
+        the shared one uses the graph of the shared one.
+        """
+        if self.in_sync():
+            return self._base._build()  # type: ignore
+        version = self._base.version if self._base is not None else 0
+        if self._built is None or self._built[0] != (version, self.version):
+            lsas = list(self._lsas())
+            stubs = [adv for adv in lsas
+                     if any(b.type == LinkType.STUB for b in adv.bodies)]
+            self._built = ((version, self.version),
+                           CsrGraph.from_lsas(lsas),
+                           stubs)
+        return self._built[1], self._built[2]
+
+    def graph(self) -> CsrGraph:
+        """
+        Return the graph of the network described by the advertisements. For
+        more information about the graph, please consult its documentation in
+        `graph.py`.
+        """
+        return self._build()[0]
 
-    def create_routing_table(self) -> RoutingTable:
+    def create_routing_table(self,
+                             stats: Optional[Stats] = None,
+                             lfa: bool = False) -> RoutingTable:
         """
         This method does three things:
             1. Constructs a graph of the network based on the information from
@@ -104,76 +172,143 @@ class LinkStateDatabase:
             2. Calculate the best route to each of the networks routers. This
             is done with the use of Dijkstra's algorithm.
             3. Create and return a Routing Table, this holds entries about
-            every destination (Router) on the network. For more info on how a
+            every destination (Router) on the network, as well as every stub
+            network advertised by a reachable router. For more info on how a
             Routing Table is structured, please consult its documentation
             found in the `rt.py` file.
+
+        Every type of service, which some link has a metric for, gets its own
+        routing table. They are all computed over the same graph, only the
+        costs of the links differ.
+
+        :stats: optional statistics object, into which the graph build and
+                SPF phases are recorded.
+        :lfa: whether to find loop-free alternates of the next hops as well,
+              which takes an extra SPF run from every neighbor.
+        """
+        if stats is None:
+            stats = Stats()
+        with stats.timer("graph_build"):
+            graph = self.graph()
+            stubs = self.stubs()
+
+        with stats.timer("spf"):
+            start = graph.dense.get(self._my_id)
+            if start is None:
+                return RoutingTable()
+            rt = _shortest_paths(graph, start, stubs, stats, lfa)
+            for tos in tos_values(graph, stubs):
+                rt.add_tos_table(tos, _shortest_paths(graph.for_tos(tos),
+                                                      start,
+                                                      stubs,
+                                                      stats,
+                                                      lfa,
+                                                      tos))
+            return rt
+
+    def stubs(self) -> List[LinkStateAdvertisement]:
+        """
+        Return the advertisements, which list stub networks. Stub networks are
+        leaves, they are not part of the graph.
         """
-        rt = RoutingTable()
-        nodes: List[Node] = list()
-        used_ids: List[int] = list()
-        # create a graph
-        for adv in self._content:
-            if not adv.advertising_router in used_ids:
-                nodes.append(Node(adv.advertising_router))
-                used_ids.append(adv.advertising_router)
-        for each in nodes:
-            for adv in self._content:
-                # start, end, cost of link
-                adv_id, id, cost = (adv.advertising_router, adv.bodies[0].link_data, adv.bodies[0].tos_zero)
-                # node where the link originates from
-                x = [n for n in nodes if adv_id == n.id]
-                if len(x) == 1:
-                    # if the end of the link is current router
-                    if id == each.id:
-                        # add it as a neighbor
-                        each.add(x[0], cost)
-
-        # run djikstra for each router from with this router as start
-        start = self._my_id
-        ids = [x.id for x in nodes if x.id != self._my_id]
-
-        # Here is where the real magic happens. We run djikstra's algorithm
-        # which is implemented using a min-heap.
-
-        while ids:
-            id = ids.pop(0)
-            end = None
-            heap = []
-            for each in nodes:
-                if each.id == start:
-                    each.cost = 0
-                else:
-                    each.cost = maxsize
-                    if each.id == id:
-                        end = each
-                heappush(heap, each)
-
-            while heap:
-                for pair in heap[0].neighbors:
-                    if pair[0].cost > (pair[1] + heap[0].cost):
-                        pair[0].cost = pair[1] + heap[0].cost
-                        pair[0].previous = heap[0]
-                heappop(heap)
-
-            if end:
-                cost = end.cost
-
-                if end.previous:
-                    p = end.previous
-                    x = [end.id]
-                    while p.id != start:
-                        x.append(p.id)
-                        if p.previous:
-                            p = p.previous
-                    x.reverse()
-                    rt.add_entry(RTEntry.create(id, cost, x[0]))
-            else:
-                print("[ERROR] Incomplete entry, total cost.")
-
-        return rt
+        return self._build()[1]
 
     def __str__(self) -> str:
-        s = ""
-        for each in self._content:
-            s += f"{each}\n"
-        return s
+        return "".join(f"{each}\n" for each in self._lsas())
+
+
+def tos_values(graph: CsrGraph,
+               stubs: List[LinkStateAdvertisement]) -> List[int]:
+    """
+    Return the types of service apart from TOS 0, which some link or stub
+    network has a metric for, each of them needs its own routing table.
+    """
+    values = set(graph.tos)
+    for adv in stubs:
+        for body in adv.bodies:
+            if body.type == LinkType.STUB:
+                values.update(body.tos_and_metric)
+    values.discard(0)
+    return sorted(values)
+
+
+def _shortest_paths(graph: CsrGraph,
+                    start: int,
+                    stubs: List[LinkStateAdvertisement],
+                    stats: Stats,
+                    lfa: bool,
+                    tos: int = 0) -> RoutingTable:
+    """
+    Run Dijkstra's algorithm from a router and create its routing table.
+    """
+    dist, hop, _ = graph.spf(start, stats)
+    backup = None
+    if lfa:
+        backup = loop_free_alternates(graph,
+                                      start,
+                                      dist,
+                                      hop,
+                                      lambda n: graph.spf(n, stats)[0])
+    return make_routing_table(graph, start, dist, hop, stubs, backup, tos)
+
+
+def make_routing_table(graph: CsrGraph,
+                       start: int,
+                       dist: List[int],
+                       hop: List[int],
+                       stubs: List[LinkStateAdvertisement],
+                       backup: Optional[List[int]] = None,
+                       tos: int = 0) -> RoutingTable:
+    """
+    Create a routing table of a router from the best paths found from it.
+
+    :graph: graph of the network.
+    :start: dense number of the router.
+    :dist: cost of the best path to each router, maxsize if there is none.
+    :hop: dense number of the next hop to each router.
+    :stubs: advertisements, which list stub networks.
+    :backup: dense number of the loop-free alternate of the next hop to each
+             router, -1 if there is none.
+    :tos: type of service the paths were found for, the stub networks are
+          reached at its cost.
+    """
+    rt = RoutingTable()
+    ids = graph.ids.tolist()
+    alternates = [ids[b] if b >= 0 else None for b in backup] if backup\
+        else [None] * len(ids)
+    for v, id in enumerate(ids):
+        if v == start:
+            continue
+        if dist[v] < maxsize:
+            rt.add_entry(RTEntry.create(id,
+                                        dist[v],
+                                        ids[hop[v]],
+                                        alternates[v]))
+        elif log.enabled(DEBUG):
+            log.debug("Router %s can't reach router %s.", ids[start], id)
+
+    # a stub network is reached through the router advertising it, if more
+    # routers advertise it, the cheapest one is used
+    networks: Dict[Tuple[int, int], RTEntry] = dict()
+    for adv in stubs:
+        v = graph.dense[adv.advertising_router]
+        if dist[v] == maxsize:
+            continue
+        for body in adv.bodies:
+            if body.type != LinkType.STUB:
+                continue
+            entry = RTEntry(DestType.NETWORK,
+                            body.link_id,
+                            body.link_data,
+                            1,
+                            dist[v] + body.metric(tos),
+                            ids[hop[v]],
+                            alternates[v])
+            key = (body.link_id, body.link_data)
+            best = networks.get(key)
+            if not best or (entry.cost, entry.next_hop) <\
+                    (best.cost, best.next_hop):
+                networks[key] = entry
+    for entry in networks.values():
+        rt.add_network(entry)
+    return rt
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+
+from typing import Tuple
+
+import numpy as np
+
+from .graph import CsrGraph
+
+
+def all_pairs(graph: CsrGraph,
+              block: int = 64) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Compute the best paths between all pairs of routers at once with a
+    blocked Floyd–Warshall algorithm.
+
+    The pivots are taken a block at a time. Only the rows and columns of the
+    block are updated pivot by pivot, the rest of the matrix is then updated
+    with a single min-plus product of the two panels, which numpy does in
+    large chunks. For small, dense networks this beats running Dijkstra's
+    algorithm from every router.
+
+    Returns a matrix of path costs, infinite where there is no path, and a
+    matrix of next hops, both indexed by dense router numbers. The next hop
+    from a router to itself is the router itself, -1 means there is no path.
+    Just like `CsrGraph.spf()`, equal cost paths are broken by the lower next
+    hop.
+
+    :graph: graph of the network.
+    :block: number of pivots taken at once.
+    """
+    n = len(graph)
+    weight = np.full((n, n), np.inf)
+    src = np.repeat(np.arange(n), np.diff(graph.indptr))
+    # of parallel links, only the cheapest one counts
+    np.minimum.at(weight, (src, graph.indices), graph.weights.astype(np.float64))
+    dist = weight.copy()
+    np.fill_diagonal(dist, 0.0)
+
+    # temporary min-plus products are kept below this many items
+    chunk = max(1, (1 << 22) // max(1, block * n))
+    for start in range(0, n, block):
+        k = slice(start, min(start + block, n))
+        for p in range(k.start, k.stop):
+            np.minimum(dist[k], dist[k, p, None] + dist[None, p], out=dist[k])
+            np.minimum(dist[:, k], dist[:, p, None] + dist[None, p, k],
+                       out=dist[:, k])
+        for r in range(0, n, chunk):
+            rows = slice(r, min(r + chunk, n))
+            via = (dist[rows, k, None] + dist[None, k]).min(axis=1)
+            np.minimum(dist[rows], via, out=dist[rows])
+
+    # the next hop is the lowest neighbor, through which the best path goes
+    hop = np.full((n, n), -1, dtype=np.int64)
+    for s in range(n):
+        neighbors = graph.indices[graph.indptr[s]:graph.indptr[s + 1]]
+        if not len(neighbors):
+            hop[s, s] = s
+            continue
+        neighbors = np.unique(neighbors)
+        through = weight[s, neighbors, None] + dist[neighbors]
+        best = (through == dist[s]) & np.isfinite(dist[s])
+        first = best.argmax(axis=0)
+        hop[s] = np.where(best.any(axis=0), neighbors[first], -1)
+        hop[s, s] = s
+    return dist, hop
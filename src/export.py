@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Bulk export of the routing tables of all routers, optionally along with the
+paths they lead along, as CSV, JSON Lines or a columnar binary file.
+
+The routes are streamed one router at a time through buffered writes, so
+memory use does not grow with the number of routers exported. Every route
+is described by the same fields in all formats:
+
+    router           index of the router the routing table belongs to
+    tos              type of service of the routing table
+    type             'router' or 'network'
+    destination      index of the destination router or address of the
+                     stub network
+    mask             network mask, full for routers
+    cost             total cost of the route
+    next_hop         index of the next hop
+    backup_next_hop  index of the loop-free alternate, empty(or -1 in the
+                     binary file) if there is none
+    path             indexes of the routers on the way, only for routes to
+                     routers of TOS 0, when paths are exported
+
+A binary file is a little endian header followed by blocks of up to
+`BLOCK_ROWS` routes, each made of a block header and one array per field:
+
+    header   magic, version, flags
+    block    number of routes, number of routers in all paths
+             router, tos, type, destination, mask, cost, next hop, backup
+             next hop, path lengths(only with paths), path routers(only
+             with paths)
+"""
+
+import csv
+import json
+import struct
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .net import Network
+from .rt import RTEntry
+from .utils import msg
+
+
+MAGIC = b"2SPC"
+VERSION = 1
+
+BLOCK_ROWS = 1 << 16
+
+FIELDS = ("router",
+          "tos",
+          "type",
+          "destination",
+          "mask",
+          "cost",
+          "next_hop",
+          "backup_next_hop")
+
+_HEADER = struct.Struct("<4sHH")
+_BLOCK = struct.Struct("<II")
+
+_COLUMNS = (("router", np.int32),
+            ("tos", np.uint8),
+            ("type", np.uint8),
+            ("destination", np.int64),
+            ("mask", np.uint32),
+            ("cost", np.int64),
+            ("next_hop", np.int64),
+            ("backup_next_hop", np.int64))
+
+_PATHS = 1
+_NETWORK = 1
+_BUFFER = 1 << 20
+
+Route = Tuple[int, int, int, RTEntry, Optional[List[int]]]
+
+
+def _routes(net: Network, paths: bool) -> Iterator[List[Route]]:
+    """
+    Yield the routes of one router at a time, as (router, tos, type, entry,
+    path). Each routing table is brought up to date right before its routes
+    are yielded, nothing is computed for the whole network at once. Paths
+    follow the routing tables of other routers, so with paths those are
+    brought up to date first, one router at a time.
+    """
+    if paths:
+        for router in net._routers.values():
+            net._update_rt(router)
+    for index, router in net._routers.items():
+        rt = net._update_rt(router)
+        routes: List[Route] = []
+        for tos in rt.tos_values():
+            table = rt.for_tos(tos)
+            found = net._find_paths(router) if paths and not tos else None
+            for i, entry in enumerate(table.get_entries()):
+                routes.append((index, tos, 0, entry,
+                               found[i] if found is not None else None))
+            for entry in table.get_networks():
+                routes.append((index, tos, _NETWORK, entry, None))
+        yield routes
+
+
+def _fields(route: Route) -> List:
+    index, tos, kind, entry, _ = route
+    return [index,
+            tos,
+            "network" if kind & _NETWORK else "router",
+            entry.destination_id,
+            entry.network_mask,
+            entry.cost,
+            entry.next_hop,
+            entry.backup_next_hop]
+
+
+def export_csv(net: Network, path: str, paths: bool = False) -> int:
+    """
+    Write the routes of all routers into a CSV file with a header row, the
+    routers of a path are separated by spaces. Returns the number of routes
+    written.
+
+    :net: the network.
+    :path: path of the output file.
+    :paths: whether to add the paths of the routes to routers.
+    """
+    count = 0
+    with open(path, "w", newline="", buffering=_BUFFER) as f:
+        writer = csv.writer(f)
+        writer.writerow(FIELDS + ("path",) if paths else FIELDS)
+        for routes in _routes(net, paths):
+            rows = []
+            for route in routes:
+                row = _fields(route)
+                if paths:
+                    row.append(" ".join(map(str, route[4] or ())))
+                rows.append(row)
+            writer.writerows(rows)
+            count += len(rows)
+    return count
+
+
+def export_jsonl(net: Network, path: str, paths: bool = False) -> int:
+    """
+    Write the routes of all routers into a JSON Lines file, one object per
+    route, with the fields named as in `FIELDS`. Returns the number of routes
+    written.
+
+    :net: the network.
+    :path: path of the output file.
+    :paths: whether to add the paths of the routes to routers.
+    """
+    count = 0
+    encode = json.JSONEncoder(separators=(",", ":")).encode
+    with open(path, "w", buffering=_BUFFER) as f:
+        for routes in _routes(net, paths):
+            lines = []
+            for route in routes:
+                obj = dict(zip(FIELDS, _fields(route)))
+                if paths and route[4] is not None:
+                    obj["path"] = route[4]
+                lines.append(encode(obj))
+                lines.append("\n")
+            f.write("".join(lines))
+            count += len(routes)
+    return count
+
+
+def _write_block(f: BinaryIO, block: List[Route], paths: bool) -> None:
+    found = [route[4] or [] for route in block] if paths else []
+    hops = sum(map(len, found))
+    f.write(_BLOCK.pack(len(block), hops))
+    rows = [(index,
+             tos,
+             kind,
+             e.destination_id,
+             e.network_mask,
+             e.cost,
+             e.next_hop,
+             e.backup_next_hop if e.backup_next_hop is not None else -1)
+            for index, tos, kind, e, _ in block]
+    for (_, dtype), column in zip(_COLUMNS, zip(*rows)):
+        f.write(np.array(column, dtype=dtype).tobytes())
+    if paths:
+        f.write(np.array([len(p) for p in found], dtype=np.uint32).tobytes())
+        f.write(np.fromiter((r for p in found for r in p),
+                            dtype=np.int32,
+                            count=hops).tobytes())
+
+
+def export_binary(net: Network, path: str, paths: bool = False) -> int:
+    """
+    Write the routes of all routers into a columnar binary file, see the
+    module documentation. Returns the number of routes written.
+
+    :net: the network.
+    :path: path of the output file.
+    :paths: whether to add the paths of the routes to routers.
+    """
+    count = 0
+    block: List[Route] = []
+    with open(path, "wb", buffering=_BUFFER) as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, _PATHS if paths else 0))
+        for routes in _routes(net, paths):
+            block.extend(routes)
+            while len(block) >= BLOCK_ROWS:
+                _write_block(f, block[:BLOCK_ROWS], paths)
+                del block[:BLOCK_ROWS]
+            count += len(routes)
+        if block:
+            _write_block(f, block, paths)
+    return count
+
+
+def _read(f: BinaryIO, dtype: type, count: int) -> np.ndarray:
+    size = np.dtype(dtype).itemsize * count
+    return np.frombuffer(f.read(size), dtype=dtype, count=count)
+
+
+def read_binary(path: str) -> Optional[Iterator[Dict[str, np.ndarray]]]:
+    """
+    Read a file written by `export_binary()` one block at a time, None if it
+    is not such a file. Every block is a dictionary of arrays keyed by the
+    fields in `FIELDS`, along with 'path_lengths' and 'paths', the routers of
+    all paths one after another, if the file has paths.
+
+    :path: path of the file.
+    """
+    f = open(path, "rb")
+    header = f.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        f.close()
+        msg("e", "'%s' is not an export of routing tables.", path)
+        return None
+    magic, version, flags = _HEADER.unpack(header)
+    if magic != MAGIC or version != VERSION:
+        f.close()
+        msg("e", "'%s' is not an export of routing tables of version %s.",
+            path, VERSION)
+        return None
+    return _blocks(f, bool(flags & _PATHS))
+
+
+def _blocks(f: BinaryIO, paths: bool) -> Iterator[Dict[str, np.ndarray]]:
+    with f:
+        while True:
+            head = f.read(_BLOCK.size)
+            if len(head) < _BLOCK.size:
+                return
+            rows, hops = _BLOCK.unpack(head)
+            block = {name: _read(f, dtype, rows) for name, dtype in _COLUMNS}
+            if paths:
+                block["path_lengths"] = _read(f, np.uint32, rows)
+                block["paths"] = _read(f, np.int32, hops)
+            yield block
+
+
+def export_tables(net: Network,
+                  path: str,
+                  format: Optional[str] = None,
+                  paths: bool = False) -> Optional[int]:
+    """
+    Export the routes of all routers, in the format given or else the one
+    the extension of the file stands for('.csv', '.jsonl' or '.bin').
+    Returns the number of routes written, None if the format is unknown.
+
+    :net: the network.
+    :path: path of the output file.
+    :format: 'csv', 'jsonl' or 'binary'.
+    :paths: whether to add the paths of the routes to routers.
+    """
+    if format is None:
+        format = {"csv": "csv", "jsonl": "jsonl", "bin": "binary"}\
+            .get(path.rsplit(".", 1)[-1].lower(), "")
+    exporter = _EXPORTERS.get(format)
+    if exporter is None:
+        msg("e", "Unknown export format of '%s'.", path)
+        return None
+    return exporter(net, path, paths)
+
+
+_EXPORTERS = {"csv": export_csv,
+              "jsonl": export_jsonl,
+              "binary": export_binary}
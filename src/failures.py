@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from sys import maxsize
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .graph import CsrGraph
+from .stats import Stats
+from .utils import msg
+
+
+@dataclass
+class RouteChange:
+    """
+    A route, which changes when a link fails.
+
+    ---
+    Attributes:
+    ---
+    * source: int : index of the router the route starts at.
+    * destination: int : index of the router the route leads to.
+    * old_cost: Optional[int] : cost of the route before the failure.
+    * new_cost: Optional[int] : cost of the route after the failure, None if
+      the destination can't be reached anymore.
+    * old_next_hop: Optional[int] : index of the next hop before the failure.
+    * new_next_hop: Optional[int] : index of the next hop after the failure,
+      None if the destination can't be reached anymore.
+    """
+    source: int
+    destination: int
+    old_cost: Optional[int]
+    new_cost: Optional[int]
+    old_next_hop: Optional[int]
+    new_next_hop: Optional[int]
+
+    @property
+    def delta(self) -> Optional[int]:
+        """
+        Change of the cost, None if the destination became unreachable.
+        """
+        if self.old_cost is None or self.new_cost is None:
+            return None
+        return self.new_cost - self.old_cost
+
+
+Task = Tuple[List[Tuple[int, int]], List[int]]
+
+# graph of the whole network, set once in every worker process, so it does
+# not have to be sent along with each failure
+_graph: Optional[CsrGraph] = None
+
+
+def _init_worker(graph: CsrGraph) -> None:
+    global _graph
+    _graph = graph
+
+
+def _recompute(task: Task,
+               graph: Optional[CsrGraph] = None
+               ) -> List[Tuple[List[int], List[int]]]:
+    """
+    Run Dijkstra's algorithm from the given routers, with the failed links
+    left out of the graph.
+    """
+    links, sources = task
+    failed = (graph or _graph).without(links)  # type: ignore
+    return [failed.spf(s)[:2] for s in sources]
+
+
+def what_if_failures(graph: CsrGraph,
+                     links: Iterable[Tuple[int, int]],
+                     bidirectional: bool = True,
+                     workers: int = 1,
+                     stats: Optional[Stats] = None
+                     ) -> Dict[Tuple[int, int], List[RouteChange]]:
+    """
+    Find the routes, which change when a single link fails, for each of many
+    links.
+
+    The best paths from every router are computed once. A failed link only
+    matters to the routers, whose shortest path tree contains it, every other
+    router keeps its routes, so only those are computed again.
+
+    :graph: graph of the network.
+    :links: links to fail one at a time, as pairs of router indexes.
+    :bidirectional: whether a failure takes down the link in both
+                    directions.
+    :workers: number of processes the failures are spread over.
+    :stats: optional statistics object, into which the SPF runs are timed.
+    """
+    if stats is None:
+        stats = Stats()
+    n = len(graph)
+    ids = graph.ids.tolist()
+
+    with stats.timer("spf"):
+        baseline = [graph.spf(s) for s in range(n)]
+    parents = np.array([p for _, _, p in baseline], dtype=np.int64)\
+        .reshape(n, n)
+
+    keys: List[Tuple[int, int]] = []
+    tasks: List[Task] = []
+    for a, b in links:
+        da, db = graph.dense.get(a), graph.dense.get(b)
+        if da is None or db is None:
+            msg("w", "There is no link from %s to %s.", a, b)
+            continue
+        failed = [(da, db), (db, da)] if bidirectional else [(da, db)]
+        hit = np.zeros(n, dtype=bool)
+        for x, y in failed:
+            hit |= parents[:, y] == x
+        keys.append((a, b))
+        tasks.append((failed, np.nonzero(hit)[0].tolist()))
+
+    with stats.timer("spf"):
+        if workers > 1:
+            with ProcessPoolExecutor(workers,
+                                     initializer=_init_worker,
+                                     initargs=(graph,)) as pool:
+                results = list(pool.map(_recompute, tasks, chunksize=16))
+        else:
+            results = [_recompute(task, graph) for task in tasks]
+
+    report: Dict[Tuple[int, int], List[RouteChange]] = dict()
+    for key, (_, sources), rows in zip(keys, tasks, results):
+        changes = []
+        for s, (dist, hop) in zip(sources, rows):
+            old_dist, old_hop, _ = baseline[s]
+            changed = np.nonzero((np.array(dist) != np.array(old_dist)) |
+                                 (np.array(hop) != np.array(old_hop)))[0]
+            for v in changed.tolist():
+                changes.append(RouteChange(
+                    ids[s],
+                    ids[v],
+                    old_dist[v] if old_dist[v] < maxsize else None,
+                    dist[v] if dist[v] < maxsize else None,
+                    ids[old_hop[v]] if old_hop[v] >= 0 else None,
+                    ids[hop[v]] if hop[v] >= 0 else None))
+        report[key] = changes
+    return report
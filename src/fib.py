@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+from .rt import RoutingTable, RTEntry
+
+
+class _FibNode:
+    """
+    Node of a path compressed binary trie.
+
+    ---
+    Attributes:
+    ---
+    * key: int : the prefix, with all bits after the first `length` cleared.
+    * length: int : length of the prefix in bits.
+    * entry: Optional[RTEntry] : route to the prefix, None for nodes, which
+      only join two branches.
+    * children: List[Optional[_FibNode]] : longer prefixes continuing with a
+      zero and a one bit.
+    """
+    __slots__ = ("key", "length", "entry", "children")
+
+    def __init__(self, key: int, length: int, entry: Optional[RTEntry]) -> None:
+        self.key: int = key
+        self.length: int = length
+        self.entry: Optional[RTEntry] = entry
+        self.children: List[Optional[_FibNode]] = [None, None]
+
+
+def _mask(length: int) -> int:
+    return (0xffffffff << (32 - length)) & 0xffffffff
+
+
+class Fib:
+    """
+    Forwarding information base of a single router, compiled from the stub
+    network entries of its routing table.
+
+    Routes are kept in a path compressed binary(Patricia) trie, a node is
+    only created where two prefixes branch off, so a longest prefix match
+    takes at most 32 steps, no matter how many routes there are.
+
+    ---
+    Attributes:
+    ---
+    * _root: _FibNode : the zero length prefix, the default route, if there
+      is one.
+    * _size: int : number of routes.
+    * _arrays: Optional[tuple] : the trie flattened into numpy arrays for
+      batch lookups, built on the first batch lookup.
+    """
+    def __init__(self, rt: Optional[RoutingTable] = None) -> None:
+        """
+        Create a new FIB.
+
+        :rt: routing table, whose stub network entries are inserted.
+        """
+        self._root: _FibNode = _FibNode(0, 0, None)
+        self._size: int = 0
+        self._arrays: Optional[tuple] = None
+        if rt:
+            for entry in rt.get_networks():
+                self.insert(entry)
+
+    def insert(self, entry: RTEntry) -> None:
+        """
+        Insert a route to a network, replacing a route to the same network.
+        """
+        length = bin(entry.network_mask).count("1")
+        key = entry.destination_id & _mask(length)
+        self._arrays = None
+        node = self._root
+        while True:
+            if length == node.length:
+                if node.entry is None:
+                    self._size += 1
+                node.entry = entry
+                return
+            bit = (key >> (31 - node.length)) & 1
+            child = node.children[bit]
+            if child is None:
+                node.children[bit] = _FibNode(key, length, entry)
+                self._size += 1
+                return
+            common = min(length,
+                         child.length,
+                         32 - (key ^ child.key).bit_length())
+            if common == child.length:
+                node = child
+                continue
+            # the child's prefix and the new one part ways, a node has to be
+            # put in between
+            fork = _FibNode(key & _mask(common), common, None)
+            node.children[bit] = fork
+            fork.children[(child.key >> (31 - common)) & 1] = child
+            if common == length:
+                fork.entry = entry
+            else:
+                fork.children[(key >> (31 - common)) & 1] =\
+                    _FibNode(key, length, entry)
+            self._size += 1
+            return
+
+    def lookup(self, address: int) -> Optional[RTEntry]:
+        """
+        Return the route with the longest prefix matching an address, None if
+        there is no such route.
+
+        :address: IPv4 address as a 32-bit number.
+        """
+        node = self._root
+        best = node.entry
+        while node.length < 32:
+            child = node.children[(address >> (31 - node.length)) & 1]
+            if child is None or (address ^ child.key) >> (32 - child.length):
+                break
+            node = child
+            if node.entry is not None:
+                best = node.entry
+        return best
+
+    def lookup_many(self, addresses: Iterable[int]) -> np.ndarray:
+        """
+        Return the next hop for each of many addresses, -1 for addresses
+        without a route. All addresses walk down the trie together, one level
+        at a time.
+
+        :addresses: IPv4 addresses as 32-bit numbers.
+        """
+        if self._arrays is None:
+            self._arrays = self._flatten()
+        keys, lengths, hops, zeros, ones = self._arrays
+        addr = np.asarray(addresses, dtype=np.int64).ravel()
+        node = np.zeros(len(addr), dtype=np.int64)
+        result = np.full(len(addr), hops[0], dtype=np.int64)
+        active = np.arange(len(addr))
+        while len(active):
+            n = node[active]
+            length = lengths[n]
+            # prefixes of all 32 bits have no children
+            deeper = length < 32
+            active, n, length = active[deeper], n[deeper], length[deeper]
+            bit = (addr[active] >> (31 - length)) & 1
+            child = np.where(bit == 1, ones[n], zeros[n])
+            found = child >= 0
+            active, child = active[found], child[found]
+            match = ((addr[active] ^ keys[child]) >> (32 - lengths[child])) == 0
+            active, child = active[match], child[match]
+            node[active] = child
+            hop = hops[child]
+            routed = hop != -2
+            result[active[routed]] = hop[routed]
+        return result
+
+    def _flatten(self) -> tuple:
+        """
+        Turn the trie into arrays of keys, prefix lengths, next hops(-2 for
+        nodes without a route) and indexes of both children(-1 for none),
+        the root being at index 0.
+        """
+        nodes = [self._root]
+        for node in nodes:
+            nodes.extend(c for c in node.children if c is not None)
+        index = {id(node): i for i, node in enumerate(nodes)}
+        keys = np.array([n.key for n in nodes], dtype=np.int64)
+        lengths = np.array([n.length for n in nodes], dtype=np.int64)
+        hops = np.array([n.entry.next_hop if n.entry else -2 for n in nodes],
+                        dtype=np.int64)
+        if hops[0] == -2:
+            hops[0] = -1
+        zeros, ones = (np.array([index[id(n.children[b])] if n.children[b]
+                                 else -1 for n in nodes], dtype=np.int64)
+                       for b in (0, 1))
+        return keys, lengths, hops, zeros, ones
+
+    def __len__(self) -> int:
+        return self._size
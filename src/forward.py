@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Data plane of the simulation, batches of packets forwarded hop by hop along
+the computed routing tables.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .rt import RoutingTable
+from .utils import msg
+
+
+DELIVERED = 0
+BLACK_HOLE = 1
+LOOP = 2
+
+
+@dataclass
+class ForwardingReport:
+    """
+    Outcome of forwarding a single batch of packets.
+
+    ---
+    Attributes:
+    ---
+    * status: np.ndarray : fate of each packet, DELIVERED, BLACK_HOLE(a
+      router on the way had no route) or LOOP(the packet was still on its
+      way after visiting more routers than there are on the network).
+    * hops: np.ndarray : number of links each packet crossed.
+    * links: np.ndarray : indexes of the routers each link connects, one
+      link per row.
+    * link_packets: np.ndarray : number of packets, which crossed each link.
+    * link_bytes: np.ndarray : number of bytes, which crossed each link.
+    """
+    status: np.ndarray
+    hops: np.ndarray
+    links: np.ndarray
+    link_packets: np.ndarray
+    link_bytes: np.ndarray
+
+    @property
+    def delivered(self) -> int:
+        return int(np.count_nonzero(self.status == DELIVERED))
+
+    @property
+    def black_holes(self) -> int:
+        return int(np.count_nonzero(self.status == BLACK_HOLE))
+
+    @property
+    def loops(self) -> int:
+        return int(np.count_nonzero(self.status == LOOP))
+
+    def link_counts(self) -> Dict[Tuple[int, int], Tuple[int, int]]:
+        """
+        Return the number of packets and bytes of every link, which carried
+        at least one packet, keyed by the indexes of the routers it connects.
+        """
+        used = np.nonzero(self.link_packets)[0]
+        return {(int(self.links[i, 0]), int(self.links[i, 1])):
+                (int(self.link_packets[i]), int(self.link_bytes[i]))
+                for i in used}
+
+
+class Forwarder:
+    """
+    Forwarding engine, which pushes whole batches of packets through the
+    network at once.
+
+    The routing tables are compiled into a single matrix holding the link a
+    router forwards packets for a destination to, in which routers are
+    numbered densely. A batch is then forwarded one hop at a time, every step
+    moves all packets still on their way with a handful of array operations,
+    so millions of packets per second can be forwarded.
+
+    The matrix takes 4 bytes for every pair of routers.
+
+    ---
+    Attributes:
+    ---
+    * routers: np.ndarray : sorted indexes of all routers, the position of a
+      router is its dense number.
+    * links: np.ndarray : indexes of the routers each link connects, one link
+      per row, in the order of their dense numbers.
+    * link_packets: np.ndarray : number of packets each link carried in all
+      batches so far.
+    * link_bytes: np.ndarray : number of bytes each link carried in all
+      batches so far.
+    * _via: np.ndarray : number of the link a router(row) forwards packets
+      for a destination(column) to, -1 where there is no route.
+    * _backup: Optional[np.ndarray] : like `_via`, but the links to the
+      loop-free alternates, None if the routing tables have none.
+    * _ends: np.ndarray : dense number of the router each link points to.
+    * _keys: np.ndarray : sorted `a * n + b` keys of the links between the
+      routers with dense numbers `a` and `b`.
+    * _failed: Dict[int, Tuple[int, np.ndarray]] : failed links, with the
+      router using them and the destinations it used them for.
+    """
+    def __init__(self,
+                 routers: Iterable[int],
+                 tables: Dict[int, RoutingTable],
+                 links: Iterable[Tuple[int, int]]) -> None:
+        """
+        Compile routing tables into a forwarding engine.
+
+        :routers: indexes of all routers.
+        :tables: routing table of each router, keyed by its index.
+        :links: links between routers, as pairs of router indexes.
+        """
+        self.routers: np.ndarray = np.unique(np.fromiter(routers, np.int64))
+        n = len(self.routers)
+
+        pairs = np.array(list(links), dtype=np.int64).reshape(-1, 2)
+        ends = self._dense_of(pairs.ravel())
+        if ends is None:
+            msg("w", "Links between unknown routers are left out.")
+            known = np.isin(pairs, self.routers).all(axis=1)
+            pairs = pairs[known]
+            ends = self._dense_of(pairs.ravel())
+        ends = ends.reshape(-1, 2)
+        keys, unique = np.unique(ends[:, 0] * n + ends[:, 1], return_index=True)
+        self.links: np.ndarray = pairs[unique]
+        self.link_packets: np.ndarray = np.zeros(len(self.links), np.int64)
+        self.link_bytes: np.ndarray = np.zeros(len(self.links), np.int64)
+        self._ends: np.ndarray = ends[unique, 1]
+        self._keys: np.ndarray = keys
+        self._failed: Dict[int, Tuple[int, np.ndarray]] = dict()
+
+        self._via: np.ndarray = np.full((n, n), -1, dtype=np.int32)
+        self._backup: Optional[np.ndarray] = None
+        for index, rt in tables.items():
+            row = self._dense_of([index])
+            entries = rt.get_entries()
+            if row is None or not entries or not len(keys):
+                continue
+            dest = self._dense_of([e.destination_id for e in entries])
+            hop = self._dense_of([e.next_hop for e in entries])
+            if dest is None or hop is None:
+                msg("w", "Routing table of %s leads to unknown routers.", index)
+                continue
+            self._via[row[0], dest] = self._links_of(row[0], hop)
+
+            has = [i for i, e in enumerate(entries)
+                   if e.backup_next_hop is not None]
+            alt = self._dense_of([entries[i].backup_next_hop for i in has])
+            if not has or alt is None:
+                continue
+            if self._backup is None:
+                self._backup = np.full((n, n), -1, dtype=np.int32)
+            self._backup[row[0], dest[has]] = self._links_of(row[0], alt)
+
+    def _links_of(self, router: int, hops: np.ndarray) -> np.ndarray:
+        """
+        Return the numbers of the links from a router to its next hops, -1
+        for a next hop without a link to it, which is as good as no route.
+        """
+        link = router * len(self.routers) + hops
+        at = np.searchsorted(self._keys, link)
+        at[at == len(self._keys)] = 0
+        return np.where(self._keys[at] == link, at, -1)
+
+    @classmethod
+    def from_network(cls, net, tos: int = 0) -> "Forwarder":
+        """
+        Compile the up to date routing tables of all routers on a network.
+
+        :net: the network, a `Network`.
+        :tos: type of service, whose routing tables are compiled.
+        """
+        routers = list(net._routers)
+        return cls(routers,
+                   {i: net.routing_table(i, tos) for i in routers},
+                   net.links().keys())
+
+    def _dense_of(self, indexes: Sequence[int]) -> Optional[np.ndarray]:
+        """
+        Turn router indexes into dense numbers, None if any of them is not on
+        the network.
+        """
+        indexes = np.asarray(indexes, dtype=np.int64)
+        pos = np.searchsorted(self.routers, indexes)
+        pos[pos == len(self.routers)] = 0
+        if len(self.routers) == 0 or\
+                not np.array_equal(self.routers[pos], indexes):
+            return None
+        return pos
+
+    def forward(self,
+                src: Sequence[int],
+                dst: Sequence[int],
+                size: Optional[Sequence[int]] = None) -> Optional[ForwardingReport]:
+        """
+        Forward a batch of packets from their source to their destination
+        router. Returns None, if a packet starts at or is sent to a router,
+        which is not on the network.
+
+        :src: index of the source router of each packet.
+        :dst: index of the destination router of each packet.
+        :size: size of each packet in bytes, 1 if not given.
+        """
+        s = self._dense_of(src)
+        d = self._dense_of(dst)
+        if s is None or d is None:
+            msg("e", "Packets can only be sent between routers on the network.")
+            return None
+        if size is None:
+            size = np.ones(len(s), dtype=np.int64)
+        size = np.broadcast_to(np.asarray(size, dtype=np.int64), s.shape)
+
+        n, m = len(self.routers), len(self.links)
+        status = np.full(len(s), DELIVERED, dtype=np.int8)
+        hops = np.zeros(len(s), dtype=np.int32)
+        packets = np.zeros(m, dtype=np.int64)
+        volume = np.zeros(m, dtype=np.int64)
+
+        cur = s.copy()
+        active = np.nonzero(cur != d)[0]
+        # a packet, which did not arrive after visiting every router, is
+        # going around in circles
+        for _ in range(n):
+            if not len(active):
+                break
+            link = self._via[cur[active], d[active]]
+            ok = link >= 0
+            status[active[~ok]] = BLACK_HOLE
+            active, link = active[ok], link[ok]
+
+            packets += np.bincount(link, minlength=m)
+            volume += np.bincount(link,
+                                  weights=size[active],
+                                  minlength=m).astype(np.int64)
+            there = self._ends[link]
+            cur[active] = there
+            hops[active] += 1
+            active = active[there != d[active]]
+        status[active] = LOOP
+
+        self.link_packets += packets
+        self.link_bytes += volume
+        return ForwardingReport(status, hops, self.links, packets, volume)
+
+    def random_packets(self,
+                       count: int,
+                       max_size: int = 1500,
+                       seed: Optional[int] = None
+                       ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Create a batch of packets between random routers, with random sizes.
+
+        :count: number of packets.
+        :max_size: the largest packet size in bytes.
+        :seed: seed of the random number generator.
+        """
+        rng = np.random.default_rng(seed)
+        src = self.routers[rng.integers(0, len(self.routers), count)]
+        dst = self.routers[rng.integers(0, len(self.routers), count)]
+        size = rng.integers(64, max_size + 1, count)
+        return src, dst, size
+
+    def fail_link(self, a: int, b: int) -> int:
+        """
+        Take down the link from router `a` to router `b` in the data plane.
+        Just like a router in failover mode, `a` right away sends the packets,
+        which would cross the link, to the loop-free alternate instead, when
+        there is one and its link is up, the rest of them are dropped. Nothing
+        is computed again. Returns the number of destinations, which are
+        still reachable through an alternate.
+
+        :a: index of the router the link originates from.
+        :b: index of the router the link points to.
+        """
+        ends = self._dense_of([a, b])
+        if ends is None or not len(self._keys):
+            return 0
+        link = int(self._links_of(ends[0], ends[1:])[0])
+        if link < 0 or link in self._failed:
+            return 0
+        row = self._via[ends[0]]
+        used = np.nonzero(row == link)[0]
+        self._failed[link] = (int(ends[0]), used)
+        if self._backup is None:
+            alt = np.full(len(used), -1, dtype=np.int32)
+        else:
+            alt = self._backup[ends[0], used]
+            alt[np.isin(alt, list(self._failed))] = -1
+        row[used] = alt
+        return int(np.count_nonzero(alt >= 0))
+
+    def restore_link(self, a: int, b: int) -> None:
+        """
+        Bring a link taken down by `fail_link()` back up.
+
+        :a: index of the router the link originates from.
+        :b: index of the router the link points to.
+        """
+        ends = self._dense_of([a, b])
+        if ends is None or not len(self._keys):
+            return
+        link = int(self._links_of(ends[0], ends[1:])[0])
+        failed = self._failed.pop(link, None)
+        if failed:
+            router, used = failed
+            self._via[router, used] = link
+
+    def reset(self) -> None:
+        """
+        Reset the per link totals of all batches.
+        """
+        self.link_packets[:] = 0
+        self.link_bytes[:] = 0
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+
+from copy import copy
+from heapq import heappop, heappush
+from sys import maxsize
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .link_state import LinkStateAdvertisement, LinkType
+from .stats import Stats
+
+
+class CsrGraph:
+    """
+    Graph of a network in compressed sparse row form.
+
+    Routers are numbered densely in the order of their indexes. The links
+    leaving the router `u` are `indices[indptr[u]:indptr[u + 1]]`, with the
+    costs in `weights` at the same positions. The whole graph is a handful
+    of flat arrays, so it is cheap to build, walk and pickle.
+
+    ---
+    Attributes:
+    ---
+    * ids: np.ndarray : sorted router indexes, the position of a router is
+      its dense number.
+    * dense: Dict[int, int] : dense number of each router index.
+    * indptr: np.ndarray : where the links of each router start, one more
+      item than there are routers.
+    * indices: np.ndarray : dense number of the router each link points to.
+    * weights: np.ndarray : cost of each link.
+    * tos: Dict[int, np.ndarray] : cost of each link for every type of
+      service, apart from TOS 0, which some link has a metric for.
+    * _lists: Optional[tuple] : the arrays as python lists, which are a lot
+      faster to walk one item at a time, made on first use and not pickled.
+    """
+    def __init__(self,
+                 ids: np.ndarray,
+                 indptr: np.ndarray,
+                 indices: np.ndarray,
+                 weights: np.ndarray,
+                 tos: Optional[Dict[int, np.ndarray]] = None) -> None:
+        self.ids: np.ndarray = ids
+        self.dense: Dict[int, int] = {r: i for i, r in enumerate(ids.tolist())}
+        self.indptr: np.ndarray = indptr
+        self.indices: np.ndarray = indices
+        self.weights: np.ndarray = weights
+        self.tos: Dict[int, np.ndarray] = tos if tos else dict()
+        self._lists: Optional[tuple] = None
+
+    @classmethod
+    def from_lsas(cls, lsas: Iterable[LinkStateAdvertisement]) -> "CsrGraph":
+        """
+        Build a graph from link state advertisements. Every advertising router
+        is a vertex, links point from the advertising router to the router in
+        the body of the advertisement. Links to routers, which do not
+        advertise anything, and stub networks are left out.
+
+        The metrics of all types of service share the same routers and links,
+        only one array of costs is added per type of service.
+        """
+        routers: List[int] = []
+        src: List[int] = []
+        dst: List[int] = []
+        cost: List[int] = []
+        metrics: Dict[int, Tuple[List[int], List[int]]] = dict()
+        for adv in lsas:
+            routers.append(adv.advertising_router)
+            for body in adv.bodies:
+                if body.type == LinkType.STUB:
+                    continue
+                for tos, metric in body.tos_and_metric.items():
+                    at, values = metrics.setdefault(tos, ([], []))
+                    at.append(len(cost))
+                    values.append(metric)
+                src.append(adv.advertising_router)
+                dst.append(body.link_data)
+                cost.append(body.tos_zero)
+
+        ids = np.unique(np.array(routers, dtype=np.int64))
+        n = len(ids)
+        s = np.searchsorted(ids, np.array(src, dtype=np.int64))
+        d = np.searchsorted(ids, np.array(dst, dtype=np.int64))
+        w = np.array(cost, dtype=np.int64)
+        tos: Dict[int, np.ndarray] = dict()
+        for t, (at, values) in metrics.items():
+            if not t:
+                continue
+            tos[t] = w.copy()
+            tos[t][at] = values
+        if n:
+            known = ids[np.minimum(d, n - 1)] == np.array(dst, dtype=np.int64)
+            s, d, w = s[known], d[known], w[known]
+            tos = {t: c[known] for t, c in tos.items()}
+        order = np.lexsort((d, s))
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(s, minlength=n), out=indptr[1:])
+        return cls(ids,
+                   indptr,
+                   d[order],
+                   w[order],
+                   {t: c[order] for t, c in tos.items()})
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["_lists"] = None
+        return state
+
+    def _as_lists(self) -> tuple:
+        if self._lists is None:
+            self._lists = (self.indptr.tolist(),
+                           self.indices.tolist(),
+                           self.weights.tolist())
+        return self._lists
+
+    def for_tos(self, tos: int) -> "CsrGraph":
+        """
+        Return the graph with the costs of a type of service. The routers and
+        links are shared with this graph, so nothing is built again. Types of
+        service, which no link has a metric for, use the default costs.
+
+        :tos: type of service.
+        """
+        if tos not in self.tos:
+            return self
+        graph = copy(self)
+        graph.weights = self.tos[tos]
+        graph.tos = dict()
+        indptr, indices, _ = self._as_lists()
+        graph._lists = (indptr, indices, graph.weights.tolist())
+        return graph
+
+    def spf(self,
+            source: int,
+            stats: Optional[Stats] = None
+            ) -> Tuple[List[int], List[int], List[int]]:
+        """
+        Run Dijkstra's algorithm from a single router. Returns the cost of
+        the best path to each router, the dense number of the first router
+        on that path and of the router just before the destination, maxsize
+        and -1 for routers, which can't be reached.
+
+        Equal cost paths are broken by the lower next hop, so the result does
+        not depend on the order of the advertisements.
+
+        :source: dense number of the router.
+        :stats: optional statistics object, into which the heap operations
+                and relaxations are counted.
+        """
+        indptr, indices, weights = self._as_lists()
+        n = len(self.ids)
+        dist = [maxsize] * n
+        hop = [n] * n
+        parent = [-1] * n
+        done = [False] * n
+
+        dist[source] = 0
+        hop[source] = source
+        heap = [(0, source)]
+        pushes, pops, relaxations = 1, 0, 0
+        while heap:
+            cost, u = heappop(heap)
+            pops += 1
+            if done[u]:
+                continue
+            done[u] = True
+            first = hop[u]
+            for k in range(indptr[u], indptr[u + 1]):
+                v = indices[k]
+                if done[v]:
+                    continue
+                new_cost = cost + weights[k]
+                h = v if u == source else first
+                if new_cost < dist[v] or (new_cost == dist[v] and h < hop[v]):
+                    dist[v] = new_cost
+                    hop[v] = h
+                    parent[v] = u
+                    heappush(heap, (new_cost, v))
+                    pushes += 1
+                    relaxations += 1
+
+        if stats is not None:
+            stats.count("spf_runs")
+            stats.count("heap_pushes", pushes)
+            stats.count("heap_pops", pops)
+            stats.count("relaxations", relaxations)
+        hop = [h if h < n else -1 for h in hop]
+        return dist, hop, parent
+
+    def path(self, parent: List[int], source: int, target: int) -> List[int]:
+        """
+        Reconstruct the best path to a router from the parents returned by
+        `spf()`, as a list of router indexes starting with the source. The
+        path is empty if the router can't be reached.
+
+        :parent: parents returned by `spf()`.
+        :source: dense number of the router `spf()` was run from.
+        :target: dense number of the router.
+        """
+        if target != source and parent[target] == -1:
+            return []
+        path = [target]
+        while path[-1] != source:
+            path.append(parent[path[-1]])
+        path.reverse()
+        return self.ids[path].tolist()
+
+    def without(self, links: List[Tuple[int, int]]) -> "CsrGraph":
+        """
+        Return a copy of the graph with some links left out.
+
+        :links: links to leave out, as pairs of dense router numbers.
+        """
+        src = np.repeat(np.arange(len(self.ids)), np.diff(self.indptr))
+        keep = np.ones(len(self.indices), dtype=bool)
+        for a, b in links:
+            keep &= (src != a) | (self.indices != b)
+        indptr = np.zeros(len(self.ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src[keep], minlength=len(self.ids)),
+                  out=indptr[1:])
+        return CsrGraph(self.ids,
+                        indptr,
+                        self.indices[keep],
+                        self.weights[keep],
+                        {t: c[keep] for t, c in self.tos.items()})
+
+    def degrees(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return the number of links leaving and entering each router.
+        """
+        return (np.diff(self.indptr),
+                np.bincount(self.indices, minlength=len(self.ids)))
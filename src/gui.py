@@ -1,11 +1,15 @@
+import math
 import tkinter as tk
+from collections import deque
 from dataclasses import dataclass
-from typing import List, Optional, Tuple, Union
-from time import sleep
+from queue import Empty, Queue
+from threading import Event, Thread
+from typing import Any, Deque, Dict, List, Optional, Tuple, Union
 
 from .constants import *
 from .net import Network
 from .ip import IpAddress
+from .spatial import GridIndex
 from .utils import debug, msg
 
 
@@ -142,8 +146,9 @@ class Gui:
     Attributes:
     ---
 
-    * _routers: List[RouterGui] : a list of all routers in the GUI.
-    * _links: List[Link] : a list of all links in the GUI.
+    * _routers: Dict[int, RouterGui] : all routers in the GUI, keyed by
+      their index.
+    * _links: Dict[int, Link] : all links in the GUI, keyed by their `id()`.
     * _index: int : last index of a new router or a switch in the GUI.
     * _network: Optional[Network] : Network object created after hitting the 
       `Construct Network` button.
@@ -151,20 +156,63 @@ class Gui:
       done by right-clicking two objects on the canvas. If this objects are
       valid, a link between them is created, the first click or, in other
       words, the first structure of a link is stored in this variable.
-    * _switches: List[SwitchGui] : a list of all switches in the GUI.
+    * _switches: Dict[int, SwitchGui] : all switches in the GUI, keyed by
+      their index.
+    * _grid: GridIndex : spatial index of all routers and switches, used to
+      find the device under the mouse without looking at every device.
+    * _adjacent: Dict[str, Dict[int, Link]] : links attached to each router
+      or switch, keyed by the device's canvas tag and the link's `id()`.
+    * _reach: float : length of the longest link ever added, in canvas units.
+      A link crossing the viewport has both ends at most this far from it.
     * _win: tkinter.Tk : backing window of the program.
+    * _frames: Deque[List[int]] : paths waiting to be animated, one path is
+      drawn per frame.
+    * _anim_job: Optional[str] : id of the scheduled `after()` callback
+      drawing the next frame, None when no animation is running.
+    * _worker: Optional[Thread] : thread constructing and running the network,
+      None when no construction is in progress.
+    * _cancel_event: Event : set to ask the worker thread to stop.
+    * _queue: Queue : messages posted by the worker thread, read on the main
+      thread by `_poll()`. Tk must only ever be touched from the main thread.
+    * _edits: int : incremented on every change to the network's layout.
+    * _built: int : value of `_edits` the current network was built from,
+      -1 if there is no network. The network is only updated, when these
+      two differ.
+    * _zoom: float : scale of the view, screen pixels per canvas unit.
+    * _origin: Tuple[float, float] : canvas coordinates shown in the top left
+      corner of the view. All devices keep their canvas coordinates, these
+      two attributes translate them to the screen and back.
+    * _pan_start: Optional[Tuple[int, int]] : screen position where the
+      current panning drag started.
+    * _draw_job: Optional[str] : id of the scheduled `after()` callback
+      redrawing the canvas once panning or zooming stops, None if there is
+      none.
     
     The rest the attributes are unimportant, as they are all just parts of the
     GUI such as buttons, entries and labels. They won't be documented here as
     their usage should be self explanatory just by glancing over the code.
     """
     def __init__(self) -> None:
-        self._routers: List[RouterGui] = list()
-        self._links: List[Link] = list()
+        self._routers: Dict[int, RouterGui] = dict()
+        self._links: Dict[int, Link] = dict()
         self._index: int = 0
         self._network: Optional[Network] = None
         self._link_start: Optional[Union[RouterGui, SwitchGui]] = None
-        self._switches: List[SwitchGui] = list()
+        self._switches: Dict[int, SwitchGui] = dict()
+        self._grid: GridIndex[Union[RouterGui, SwitchGui]] = GridIndex()
+        self._adjacent: Dict[str, Dict[int, Link]] = dict()
+        self._reach: float = 0.0
+        self._frames: Deque[List[int]] = deque()
+        self._anim_job: Optional[str] = None
+        self._worker: Optional[Thread] = None
+        self._cancel_event: Event = Event()
+        self._queue: Queue = Queue()
+        self._edits: int = 0
+        self._built: int = -1
+        self._zoom: float = 1.0
+        self._origin: Tuple[float, float] = (0.0, 0.0)
+        self._pan_start: Optional[Tuple[int, int]] = None
+        self._draw_job: Optional[str] = None
 
         self._win = tk.Tk()
         self._can = tk.Canvas(self._win,
@@ -176,12 +224,44 @@ class Gui:
                                               text="Construct Network",
                                               command=self._construct)
 
-        self._can.pack()
+        self._controls = tk.Frame(self._win)
+        self._speed_s = tk.Scale(self._controls,
+                                 label="Frame delay (ms)",
+                                 from_=ANIMATION_MIN_DELAY,
+                                 to=ANIMATION_MAX_DELAY,
+                                 resolution=ANIMATION_MIN_DELAY,
+                                 orient=tk.HORIZONTAL,
+                                 length=200)
+        self._speed_s.set(ANIMATION_DELAY)
+        self._skip_b = tk.Button(self._controls,
+                                 text="Skip",
+                                 command=self._skip_frame)
+        self._cancel_b = tk.Button(self._controls,
+                                   text="Cancel",
+                                   command=self._cancel)
+        self._progress_l = tk.Label(self._controls, text="", width=24)
+
+        self._can.pack(fill=tk.BOTH, expand=True)
         self._consturct_network_b.pack()
+        self._speed_s.pack(side=tk.LEFT)
+        self._skip_b.pack(side=tk.LEFT)
+        self._cancel_b.pack(side=tk.LEFT)
+        self._progress_l.pack(side=tk.LEFT)
+        self._controls.pack()
 
         self._can.bind("<Button-1>", self._left_click)
         self._can.bind("<Button-3>", self._right_click)
         self._can.bind("<Button-2>", self._middle_click)
+        self._can.bind("<Shift-Button-1>", self._pan_begin)
+        self._can.bind("<Shift-B1-Motion>", self._pan_move)
+        self._can.bind("<MouseWheel>", self._wheel)
+        self._can.bind("<Button-4>", self._wheel)
+        self._can.bind("<Button-5>", self._wheel)
+        self._can.bind("<Configure>", lambda _: self._draw())
+        self._win.bind("<Left>", lambda _: self._pan(PAN_STEP, 0))
+        self._win.bind("<Right>", lambda _: self._pan(-PAN_STEP, 0))
+        self._win.bind("<Up>", lambda _: self._pan(0, PAN_STEP))
+        self._win.bind("<Down>", lambda _: self._pan(0, -PAN_STEP))
 
     def run(self) -> None:
         """
@@ -193,38 +273,185 @@ class Gui:
         """
         Create a network. All the processes needed for a network to be created
         and used are described in the `net.py` file and its documentation.
+
+        The network is built and run on a worker thread, so that the window
+        stays responsive. The results are picked up by `_poll()`.
+
+        The network is only constructed once, afterwards it is just updated
+        with the edits made since. If nothing changed since the last
+        construction, the existing network is run again, which only reads its
+        cached results.
+        """
+        if self._worker:
+            return
+        self._cancel_animation()
+        self._cancel_event = Event()
+        self._queue = Queue()
+        self._worker = Thread(target=self._build,
+                              args=(self._tup_routers(),
+                                    self._tup_links(),
+                                    self._cancel_event,
+                                    self._queue,
+                                    self._network,
+                                    self._built,
+                                    self._edits),
+                              daemon=True)
+        self._consturct_network_b.configure(state=tk.DISABLED)
+        self._progress_l.configure(text="Constructing...")
+        self._worker.start()
+        self._win.after(POLL_INTERVAL, self._poll)
+
+    @classmethod
+    def _build(cls,
+               routers: List[Tuple[int, int, int, bool]],
+               links: List[Tuple[int, int, int]],
+               cancel: Event,
+               queue: Queue,
+               net: Optional[Network],
+               built: int,
+               edits: int) -> None:
+        """
+        Construct and run a network. This runs on the worker thread and must
+        not touch any Tk objects, everything is posted into the queue instead.
+
+        :routers: router settings, see `_tup_routers()`.
+        :links: link settings, see `_tup_links()`.
+        :cancel: event, which stops the network's run once set.
+        :queue: queue the progress and the results are posted into.
+        :net: an already constructed network, None to construct a new one.
+        :built: value of `Gui._edits` the network was last updated to.
+        :edits: current value of `Gui._edits`.
+        """
+        try:
+            if not net:
+                net = Network()
+                net.add_routers(routers)
+                net.add_links(links)
+            elif built != edits:
+                net.update(routers, links)
+            dr_tuple = net.get_dr_and_bdr()
+            paths = net.run(lambda step, done, total:
+                                queue.put(("progress", step, done, total)),
+                            cancel)
+            queue.put(("done", net, dr_tuple, paths, edits))
+        except Exception as e:
+            queue.put(("error", e))
+
+    def _poll(self) -> None:
+        """
+        Handle all messages posted by the worker thread. Reschedules itself
+        until the worker is done.
+        """
+        last = None
+        try:
+            while True:
+                message = self._queue.get_nowait()
+                if message[0] == "progress":
+                    last = message
+                else:
+                    self._finish(message)
+                    return
+        except Empty:
+            pass
+        if last:
+            _, step, done, total = last
+            self._progress_l.configure(text=f"{step}: {done}/{total}")
+        self._win.after(POLL_INTERVAL, self._poll)
+
+    def _finish(self, message: Tuple[Any, ...]) -> None:
         """
-        net = Network()
+        Apply the results of the worker thread on the main thread.
+
+        :message: either ('done', network, dr tuple, paths, edits) or
+                  ('error', exception).
+        """
+        self._worker = None
+        self._consturct_network_b.configure(state=tk.NORMAL)
+        if message[0] == "error":
+            self._progress_l.configure(text="Construction failed")
+            msg("e", "Network construction failed: %s", message[1])
+            return
+        if self._cancel_event.is_set():
+            self._progress_l.configure(text="Cancelled")
+            return
+
+        _, net, dr_tuple, paths, edits = message
         self._network = net
-        self._network.add_routers(self._tup_routers())
-        self._network.add_links(self._tup_links())
-        dr_tuple = self._network.get_dr_and_bdr()
+        self._built = edits
+        self._progress_l.configure(text="")
 
         if dr_tuple:
             dr, bdr = dr_tuple
-            debug(f"GUI: dr and bdr tuple: {dr_tuple}")
+            debug("GUI: dr and bdr tuple: %s", dr_tuple)
             res = self._find(dr)
             if res:
                 res.set_dr()
+                self._recolour(res)
             res = self._find(bdr)
             if res:
                 res.set_bdr()
+                self._recolour(res)
+
+        self._animate(paths)
+
+    def _animate(self, paths: List[List[int]]) -> None:
+        """
+        Queue paths for animation. The animation runs from the Tk event loop,
+        each frame draws a single path and schedules the next one with
+        `after()`, so the window stays responsive the whole time.
+
+        :paths: paths to be animated, replacing any queued ones.
+        """
+        self._cancel_animation()
+        self._frames = deque(paths)
+        self._anim_job = self._win.after_idle(self._next_frame)
+
+    def _next_frame(self) -> None:
+        """
+        Draw the next queued path and schedule the following frame. Once the
+        queue is empty, the plain network is drawn again.
+        """
+        if not self._frames:
+            self._anim_job = None
+            self._can.delete("path")
+            return
+        self._draw_paths(self._frames.popleft())
+        self._anim_job = self._win.after(self._speed_s.get(), self._next_frame)
 
-        paths = self._network.run()
+    def _skip_frame(self) -> None:
+        """
+        Stop waiting for the current frame and show the next one right away.
+        """
+        if self._anim_job:
+            self._win.after_cancel(self._anim_job)
+            self._next_frame()
 
-        for path in paths:
-            self._draw_paths(path)
-            self._win.update()
-            sleep(2)
-        self._draw()
-        self._win.update()
+    def _cancel(self) -> None:
+        """
+        Stop the network construction, if one is running, as well as the
+        animation.
+        """
+        if self._worker:
+            self._cancel_event.set()
+            self._progress_l.configure(text="Cancelling...")
+        self._cancel_animation()
+
+    def _cancel_animation(self) -> None:
+        """
+        Stop the running animation and drop all queued frames.
+        """
+        if self._anim_job:
+            self._win.after_cancel(self._anim_job)
+            self._anim_job = None
+            self._frames.clear()
+            self._can.delete("path")
 
     def _new_router(self, coords: Tuple[int, int], id: str, priority: int) -> None:
         """
         When left clicking anywhere on the canvas, the user is prompted to
         with a choice of either creating a switch or a router. When the user
         chooses to create a router, this function is responsible for creating
-        a new router, as well as redrawing all the entities to the canvas.
+        a new router, as well as drawing it to the canvas.
 
         :coords: the coordinates of the new router.
         :id: the router ID, an IPv4 address in the form of a string(1.1.1.1).
@@ -232,21 +459,23 @@ class Gui:
         :priority: router's priority of becoming either a DR or a BDR.
         """
         self._index += 1
-        ip = IpAddress(0)
         i = IpAddress.int_from_str(id)
-        if i:
+        if i is not None:
             ip = IpAddress(i)
         else:
-            msg("e",f"Can't convert {id} to an IP Address")
+            msg("e", "Can't convert %s to an IP Address", id)
             ip = IpAddress(self._index)
 
-        self._routers.append(RouterGui(coords[0],
-                                       coords[1],
-                                       self._index,
-                                       ip.get(),
-                                       priority,
-                                       False))
-        self._draw()
+        router = RouterGui(coords[0],
+                           coords[1],
+                           self._index,
+                           ip.get(),
+                           priority,
+                           False)
+        self._routers[router.index] = router
+        self._grid.insert(router)
+        self._edits += 1
+        self._draw_router(router)
 
     def _remove_router(self, coords: Tuple[int, int]) -> None:
         """
@@ -255,9 +484,12 @@ class Gui:
 
         :coords: coordinates of the remove request.
         """
-        for router in self._routers:
-            if router.is_in(coords):
-                self._routers.remove(router)
+        router = self._grid.at(coords)
+        if isinstance(router, RouterGui):
+            self._routers.pop(router.index)
+            self._grid.remove(router)
+            self._edits += 1
+            self._erase(router)
 
     def _remove_links(self, r: Union[RouterGui, SwitchGui]) -> None:
         """
@@ -266,11 +498,13 @@ class Gui:
 
         :r: object we want all links removed from.
         """
-        to_remove = list()
-        for each in self._links:
-            if (each.a.index == r.index) or (each.b.index == r.index):
-                to_remove.append(each)
-        _ = [self._links.remove(x) for x in to_remove]
+        for key, each in self._adjacent.pop(self._tag(r), {}).items():
+            other = each.b if each.a is r else each.a
+            self._adjacent.get(self._tag(other), {}).pop(key, None)
+            self._links.pop(key, None)
+            self._erase(each)
+            if isinstance(other, SwitchGui):
+                other.routers = [x for x in other.routers if x[0] is not r]
 
     def _remove(self, coords: Tuple[int, int]) -> None:
         """
@@ -281,38 +515,32 @@ class Gui:
         :coords: the coordinates of the point we want to check for switches, or
                  routers.
         """
-        for router in self._routers:
-            if router.is_in(coords):
-                self._remove_links(router)
-                self._routers.remove(router)
-                return
+        o = self._grid.at(coords)
+        if not o:
+            return
 
-        for switch in self._switches:
-            if switch.is_in(coords):
-                self._remove_links(switch)
-                self._switches.remove(switch)
-                return
+        self._remove_links(o)
+        self._grid.remove(o)
+        self._edits += 1
+        self._erase(o)
+        if isinstance(o, RouterGui):
+            self._routers.pop(o.index)
+        else:
+            self._switches.pop(o.index)
 
     def _left_click(self, event) -> None:
         """
         Handle an incoming left-click event.
         """
-        coords = (event.x, event.y)
+        coords = self._to_world(event.x, event.y)
         self._pop_up("choice", coords)
 
     def _right_click(self, event) -> None:
         """
         Handle an incoming right-click event.
         """
-        coords = (event.x, event.y)
-        r_i = None
-        for router in self._routers:
-            if router.is_in(coords):
-                r_i = router
-                break
-        for switch in self._switches:
-            if switch.is_in(coords):
-                r_i = switch
+        coords = self._to_world(event.x, event.y)
+        r_i = self._grid.at(coords)
         if not r_i:
             return
 
@@ -325,9 +553,113 @@ class Gui:
         """
         Handle an incoming middle-click event.
         """
-        coords = (event.x, event.y)
+        coords = self._to_world(event.x, event.y)
         self._remove(coords)
-        self._draw()
+
+    def _wheel(self, event) -> None:
+        """
+        Zoom in or out around the mouse pointer.
+        """
+        if event.num == 5 or getattr(event, "delta", 0) < 0:
+            factor = 1 / ZOOM_STEP
+        else:
+            factor = ZOOM_STEP
+        zoom = min(max(self._zoom * factor, ZOOM_MIN), ZOOM_MAX)
+        # keep the point under the pointer where it is
+        x, y = self._to_world(event.x, event.y)
+        scale = zoom / self._zoom
+        self._zoom = zoom
+        self._origin = (x - event.x / zoom, y - event.y / zoom)
+        # the items already drawn are scaled right away, they are only
+        # culled and created again, once the zooming stops
+        self._can.scale("all", event.x, event.y, scale, scale)
+        self._redraw_later()
+
+    def _pan_begin(self, event) -> None:
+        """
+        Start dragging the view around.
+        """
+        self._pan_start = (event.x, event.y)
+
+    def _pan_move(self, event) -> None:
+        """
+        Move the view along with the mouse.
+        """
+        if not self._pan_start:
+            return
+        x, y = self._pan_start
+        self._pan_start = (event.x, event.y)
+        self._pan(event.x - x, event.y - y)
+
+    def _pan(self, dx: float, dy: float) -> None:
+        """
+        Move the view by the given number of screen pixels.
+        """
+        ox, oy = self._origin
+        self._origin = (ox - dx / self._zoom, oy - dy / self._zoom)
+        # the items already drawn are moved right away, they are only culled
+        # and created again, once the panning stops
+        self._can.move("all", dx, dy)
+        self._redraw_later()
+
+    def _redraw_later(self) -> None:
+        """
+        Redraw the canvas once the view has not changed for a while.
+        """
+        if self._draw_job is not None:
+            self._win.after_cancel(self._draw_job)
+        self._draw_job = self._win.after(REDRAW_DELAY, self._draw)
+
+    def _to_world(self, x: float, y: float) -> Tuple[int, int]:
+        """
+        Translate screen coordinates into canvas coordinates.
+        """
+        ox, oy = self._origin
+        return (round(x / self._zoom + ox), round(y / self._zoom + oy))
+
+    def _to_screen(self, x: float, y: float) -> Tuple[float, float]:
+        """
+        Translate canvas coordinates into screen coordinates.
+        """
+        ox, oy = self._origin
+        return ((x - ox) * self._zoom, (y - oy) * self._zoom)
+
+    def _viewport(self) -> Tuple[float, float, float, float]:
+        """
+        Return the part of the canvas that is currently visible, widened by
+        the size of a device, so partially visible devices are included.
+        """
+        ox, oy = self._origin
+        margin = 2 * RADIUS
+        return (ox - margin,
+                oy - margin,
+                ox + self._can.winfo_width() / self._zoom + margin,
+                oy + self._can.winfo_height() / self._zoom + margin)
+
+    def _visible(self,
+                 o: Union[RouterGui, SwitchGui],
+                 view: Optional[Tuple[float, float, float, float]] = None
+                 ) -> bool:
+        """
+        Check whether a device is within the viewport.
+
+        :view: the viewport, if it is already known.
+        """
+        x0, y0, x1, y1 = view or self._viewport()
+        return x0 <= o.x <= x1 and y0 <= o.y <= y1
+
+    def _crosses(self,
+                 link: Link,
+                 view: Optional[Tuple[float, float, float, float]] = None
+                 ) -> bool:
+        """
+        Check whether a link passes through the viewport, even if both of its
+        ends are outside of it.
+
+        :view: the viewport, if it is already known.
+        """
+        return _segment_hits(link.a.x, link.a.y, link.b.x, link.b.y,
+                             view or self._viewport())
 
     def _find(self, index: int) -> Optional[RouterGui]:
         """
@@ -335,13 +667,12 @@ class Gui:
         ---
         :index : index of the router we want to find.
         """
-        for router in self._routers:
-            if router.index == index:
-                return router
+        return self._routers.get(index)
 
     def _draw_paths(self, input: List[int]) -> None:
         """
-        Prepare the paths, which are supposed to be drawn to the screen.
+        Highlight a path on the canvas. Only the previously highlighted path
+        is removed, the rest of the canvas stays untouched.
 
         ---
         Arguments:
@@ -352,89 +683,185 @@ class Gui:
         path = input
 
         last = None
-        self._can.delete("all")
-        self._draw()
+        self._can.delete("path")
         for id in path:
             res = self._find(id)
             if res:
                 if not last:
                     last = res
                 if last:
-                    self._can.create_line(res.x,
-                                          res.y,
-                                          last.x,
-                                          last.y,
+                    self._can.create_line(*self._to_screen(res.x, res.y),
+                                          *self._to_screen(last.x, last.y),
                                           fill="blue",
-                                          width=3)
+                                          width=3,
+                                          tags=("path",))
                     last = res
 
     def _draw(self) -> None:
         """
-        Draw all routers, switches and links to the canvas.
+        Redraw the visible part of the canvas from scratch. Only devices
+        within the viewport and the links passing through it are drawn, both
+        found through the spatial index: a link crossing the viewport has its
+        ends no further than `_reach` from it. Regular changes to the canvas
+        should use the `_draw_*` and `_erase` methods, which only touch the
+        items of the object that changed.
         """
+        if self._draw_job is not None:
+            self._win.after_cancel(self._draw_job)
+            self._draw_job = None
         self._can.delete("all")
 
+        view = self._viewport()
+        x0, y0, x1, y1 = view
+        r = self._reach
+        near = list(self._grid.query(x0 - r, y0 - r, x1 + r, y1 + r))
+        links: Dict[int, Link] = dict()
+        for o in near:
+            links.update(self._adjacent.get(self._tag(o), {}))
+
         # we draw the links first, so we can cover them with routers and 
         # switches later.
-        for link in self._links:
-            a = link.a
-            b = link.b
-            c = link.cost
-
-            self._can.create_line(a.x, a.y,  b.x, b.y)
-            self._can.create_text((a.x + b.x) / 2 + 10,
-                                  (a.y + b.y) / 2 - 10,
-                                  text=f"{c}")
-
-        # drawing of all routers
-        for router in self._routers:
-            if router.dr:
-                self._can.create_oval(router.x - RADIUS,
-                                      router.y - RADIUS,
-                                      router.x + RADIUS,
-                                      router.y + RADIUS,
-                                      fill="#ff2222")
-            elif router.bdr:
-                self._can.create_oval(router.x - RADIUS,
-                                      router.y - RADIUS,
-                                      router.x + RADIUS,
-                                      router.y + RADIUS,
-                                      fill="#2222ff")
+        for link in links.values():
+            self._draw_link(link, view)
+        for o in near:
+            if isinstance(o, RouterGui):
+                self._draw_router(o, view)
             else:
-                self._can.create_oval(router.x - RADIUS,
-                                      router.y - RADIUS,
-                                      router.x + RADIUS,
-                                      router.y + RADIUS,
-                                      fill="#4f4f4f")
-
-            self._can.create_text(router.x,
-                                  router.y + 25,
-                                  text=str(router.index))
-            self._can.create_line(router.x,
-                                  router.y + 2,
-                                  router.x,
-                                  router.y + RADIUS - 2)
-            self._can.create_line(router.x,
-                                  router.y - 2,
-                                  router.x,
-                                  router.y - RADIUS + 2)
-            self._can.create_line(router.x + 2,
-                                  router.y,
-                                  router.x + RADIUS - 2,
-                                  router.y)
-            self._can.create_line(router.x - 2,
-                                  router.y,
-                                  router.x - RADIUS + 3,
-                                  router.y)
-
-        for switch in self._switches:
-            x, y = switch.x, switch.y
-            self._can.create_rectangle(x - 2 * RADIUS,
-                                       y - RADIUS,
-                                       x + 2 * RADIUS,
-                                       y + RADIUS,
-                                       fill="white")
+                self._draw_switch(o, view)
 
+    @classmethod
+    def _tag(cls, o: Union[RouterGui, SwitchGui, Link]) -> str:
+        """
+        Return the canvas tag shared by all items drawn for an object.
+        """
+        if isinstance(o, Link):
+            return f"l:{cls._tag(o.a)}:{cls._tag(o.b)}"
+        if isinstance(o, SwitchGui):
+            return f"s{o.index}"
+        return f"r{o.index}"
+
+    @classmethod
+    def _colour(cls, router: RouterGui) -> str:
+        """
+        Return the fill colour of a router, red for a DR, blue for a BDR.
+        """
+        if router.dr:
+            return "#ff2222"
+        if router.bdr:
+            return "#2222ff"
+        return "#4f4f4f"
+
+    def _draw_link(self,
+                   link: Link,
+                   view: Optional[Tuple[float, float, float, float]] = None
+                   ) -> None:
+        """
+        Create the canvas items of a single link, below all devices. Links,
+        which do not pass through the viewport, are skipped. When zoomed out,
+        the cost label is left out.
+
+        :view: the viewport, if it is already known.
+        """
+        a = link.a
+        b = link.b
+        if not self._crosses(link, view):
+            return
+        tags = (self._tag(link), "link")
+        ax, ay = self._to_screen(a.x, a.y)
+        bx, by = self._to_screen(b.x, b.y)
+
+        self._can.create_line(ax, ay,  bx, by, tags=tags)
+        if self._zoom >= DETAIL_ZOOM:
+            self._can.create_text((ax + bx) / 2 + 10,
+                                  (ay + by) / 2 - 10,
+                                  text=f"{link.cost}",
+                                  tags=tags)
+        self._can.tag_lower(tags[0])
+
+    def _draw_router(self,
+                     router: RouterGui,
+                     view: Optional[Tuple[float, float, float, float]] = None
+                     ) -> None:
+        """
+        Create the canvas items of a single router, if it is within the
+        viewport. When zoomed out, only the router's body is drawn.
+
+        :view: the viewport, if it is already known.
+        """
+        if not self._visible(router, view):
+            return
+        tag = self._tag(router)
+        tags = (tag, "router")
+        x, y = self._to_screen(router.x, router.y)
+        r = RADIUS * self._zoom
+        self._can.create_oval(x - r,
+                              y - r,
+                              x + r,
+                              y + r,
+                              fill=self._colour(router),
+                              tags=tags + (f"{tag}.body",))
+        if self._zoom < DETAIL_ZOOM:
+            return
+
+        z = self._zoom
+        self._can.create_text(x,
+                              y + 25 * z,
+                              text=str(router.index),
+                              tags=tags)
+        self._can.create_line(x,
+                              y + 2 * z,
+                              x,
+                              y + r - 2 * z,
+                              tags=tags)
+        self._can.create_line(x,
+                              y - 2 * z,
+                              x,
+                              y - r + 2 * z,
+                              tags=tags)
+        self._can.create_line(x + 2 * z,
+                              y,
+                              x + r - 2 * z,
+                              y,
+                              tags=tags)
+        self._can.create_line(x - 2 * z,
+                              y,
+                              x - r + 3 * z,
+                              y,
+                              tags=tags)
+
+    def _draw_switch(self,
+                     switch: SwitchGui,
+                     view: Optional[Tuple[float, float, float, float]] = None
+                     ) -> None:
+        """
+        Create the canvas items of a single switch, if it is within the
+        viewport.
+
+        :view: the viewport, if it is already known.
+        """
+        if not self._visible(switch, view):
+            return
+        x, y = self._to_screen(switch.x, switch.y)
+        r = RADIUS * self._zoom
+        self._can.create_rectangle(x - 2 * r,
+                                   y - r,
+                                   x + 2 * r,
+                                   y + r,
+                                   fill="white",
+                                   tags=(self._tag(switch), "switch"))
+
+    def _recolour(self, router: RouterGui) -> None:
+        """
+        Update the fill colour of an already drawn router.
+        """
+        self._can.itemconfigure(f"{self._tag(router)}.body",
+                                fill=self._colour(router))
+
+    def _erase(self, o: Union[RouterGui, SwitchGui, Link]) -> None:
+        """
+        Delete all canvas items of an object.
+        """
+        self._can.delete(self._tag(o))
 
     def _link(self,
               i1: Union[RouterGui, SwitchGui],
@@ -443,7 +870,7 @@ class Gui:
         """
         Link two objects. This means two links are created, one originating
         from the first and the other from the second object. This function is
-        also responsible for redrawing all objects.
+        also responsible for drawing the new links.
 
         :i1: first object, either a switch or a router.
         :i2: second object, either a switch or a router.
@@ -453,7 +880,7 @@ class Gui:
         t1, t2 = str(type(i1))[8:-2].split(".")[2],\
                 str(type(i2))[8:-2].split(".")[2]
         if t1 == "SwitchGui" and t2 == "SwitchGui":
-            msg("w", f"Can't link two switches!")
+            msg("w", "Can't link two switches!")
             return
 
         if (t1 == "SwitchGui" and t2 == "RouterGui") or\
@@ -466,9 +893,13 @@ class Gui:
                     i2.ma = True
                     i1.routers.append((i2, cost))
 
-        self._links.append(Link(i1, i2, cost))
-        self._links.append(Link(i2, i1, cost))
-        self._draw()
+        self._edits += 1
+        self._reach = max(self._reach, math.hypot(i1.x - i2.x, i1.y - i2.y))
+        for link in (Link(i1, i2, cost), Link(i2, i1, cost)):
+            self._links[id(link)] = link
+            self._adjacent.setdefault(self._tag(i1), {})[id(link)] = link
+            self._adjacent.setdefault(self._tag(i2), {})[id(link)] = link
+            self._draw_link(link)
 
     def _pop_up(self,
                 type: str,
@@ -523,6 +954,9 @@ class Gui:
             except ValueError:
                 msg("e", "Priority must be an integer value!")
                 priority = 1
+            if not 0 <= priority <= MAX_PRIORITY:
+                msg("e", "Priority has to be between 0 and %s!", MAX_PRIORITY)
+                priority = 1
             x, y = args[2]
             self._new_router((x, y), id, priority)
         if type == "l":
@@ -532,6 +966,9 @@ class Gui:
             except ValueError:
                 msg("e", "Cost has to be an integer value!")
                 cost = 10
+            if not 1 <= cost <= MAX_COST:
+                msg("e", "Cost has to be between 1 and %s!", MAX_COST)
+                cost = 10
             link = args[1]
 
             if self._link_start:
@@ -568,14 +1005,17 @@ class Gui:
 
     def _create_switch(self, x: int, y: int) -> None:
         """
-        Creates a new switch and re-renders the screen.
+        Creates a new switch and draws it to the canvas.
 
         :x: x part of the coordinates of the new switch.
         :y: y part of the coordinates of the new switch.
         """
-        self._index =+ 1
-        self._switches.append(SwitchGui(x, y, self._index, []))
-        self._draw()
+        self._index += 1
+        switch = SwitchGui(x, y, self._index, [])
+        self._switches[switch.index] = switch
+        self._grid.insert(switch)
+        self._edits += 1
+        self._draw_switch(switch)
 
     def _choice_popup(self, x: int, y: int) -> None:
         """
@@ -627,7 +1067,7 @@ class Gui:
         Extract all necessary information from RouterGuis.
         """
         ret = []
-        for r in self._routers:
+        for r in self._routers.values():
             ret.append((r.index, r.id, r.priority, r.ma))
         return ret
 
@@ -638,14 +1078,14 @@ class Gui:
         """
         ret = []
 
-        for link in self._links:
+        for link in self._links.values():
             if isinstance(link.a, SwitchGui) or isinstance(link.b, SwitchGui):
                 continue
             else:
                 ret.append((link.a.index, link.b.index, link.cost))
 
         new_links = []
-        for switch in self._switches:
+        for switch in self._switches.values():
             for router, cost in switch.routers:
                 rs = [(r, c2) for r, c2 in switch.routers if r.index != router.index]
                 for r, c in rs:
@@ -656,3 +1096,28 @@ class Gui:
                     new_links.append((router.index, r.index, cost + c))
         ret.extend(new_links)
         return ret
+
+
+def _segment_hits(ax: float,
+                  ay: float,
+                  bx: float,
+                  by: float,
+                  rect: Tuple[float, float, float, float]) -> bool:
+    """
+    Check whether the line segment from (ax, ay) to (bx, by) intersects the
+    rectangle (x0, y0, x1, y1), by clipping the segment to it(Liang-Barsky).
+    """
+    x0, y0, x1, y1 = rect
+    dx, dy = bx - ax, by - ay
+    lo, hi = 0.0, 1.0
+    for p, q in ((-dx, ax - x0), (dx, x1 - ax), (-dy, ay - y0), (dy, y1 - ay)):
+        if p == 0:
+            if q < 0:
+                return False
+        elif p < 0:
+            lo = max(lo, q / p)
+        else:
+            hi = min(hi, q / p)
+        if lo > hi:
+            return False
+    return True
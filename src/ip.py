@@ -1,30 +1,61 @@
 #!/usr/bin/env python3
 
-from typing import Optional
+from functools import lru_cache
+from operator import methodcaller
+from typing import Iterable, List, Optional, Tuple
+from weakref import WeakValueDictionary
+
+import numpy as np
+
 from .utils import msg
 
 
+DEFAULT_ADDRESS = 0xc0a80001 # 192.168.0.1
+
+
 class IpAddress:
     """
     A simple handler for all work related to working with and displaying IPv4
     addresses.
+
+    Addresses are immutable and interned, creating an address, which already
+    exists, returns the existing object. The underlying number is in network
+    order, the first octet is the most significant byte.
     """
-    def __init__(self, n: Optional[int] = None, string: Optional[str] = None) -> None:
-        """
-        Create a new IpAddress object from either a string or an integer.
-        """
-        self._num: int
-        if not n and not string:
-            ip = IpAddress.int_from_str("192.168.0.1")
-            if ip:
-                self._num = ip
-        if not n and string:
-            ip = IpAddress.int_from_str(string)
-            if ip:
-                self._num = ip
-        else:
-            if n:
-                self._num = n
+    __slots__ = ("_num", "__weakref__")
+
+    _interned: "WeakValueDictionary[int, IpAddress]" = WeakValueDictionary()
+
+    def __new__(cls, n: Optional[int] = None, string: Optional[str] = None) -> "IpAddress":
+        """
+        Create a new IpAddress object from either a string or an integer. If
+        neither is given, or the string is not a valid address, the address
+        is 192.168.0.1.
+        """
+        if n is None:
+            n = DEFAULT_ADDRESS
+            if string is not None:
+                ip = IpAddress.int_from_str(string)
+                if ip is not None:
+                    n = ip
+        elif not 0 <= n <= 0xffffffff:
+            msg("e", "%s is not within the range of unsigned 32 bit integer!", n)
+            n &= 0xffffffff
+
+        self = cls._interned.get(n)
+        if self is None:
+            self = super().__new__(cls)
+            object.__setattr__(self, "_num", n)
+            cls._interned[n] = self
+        return self
+
+    def __setattr__(self, name: str, value) -> None:
+        raise AttributeError("IpAddress is immutable")
+
+    def __reduce__(self):
+        # pickled and copied through the constructor, so the copy is interned
+        # too, instead of setting the attributes one by one
+        return (IpAddress, (self._num,))
 
     def get(self) -> int:
         """
@@ -36,54 +67,112 @@ class IpAddress:
         """
         Turn the number into a string representation(1.1.1.1).
         """
-        ip = IpAddress.str_from_int(self._num)
-        if ip:
-            return ip
-        return "error"
+        return IpAddress.str_from_int(self._num)
+
+    def __add__(self, o: int) -> "IpAddress":
+        """
+        Return the address `o` higher than this one, as long as it stays
+        within the same /24 network, otherwise this address.
+        """
+        if (self._num & 0xff) + o <= 255:
+            return IpAddress(self._num + o)
+        return self
 
-    def __add__(self, o: int):
-        if self._num & 0xff + o <= 255:
-            self._num += o
-        return IpAddress(n=self._num)
-    
     def __int__(self) -> int:
         return self._num
 
-    @classmethod
-    def int_from_str(cls, s: str) -> Optional[int]:
-        """
-        Create a string version of an IPv4 address from a 32-bit integer.
-        """
-        nums = []
-        for c in s.split("."):
-            num: int
-            try:
-                num = int(c)
-            except ValueError:
-                msg("e", f"Invalid integer value '{c}'")
-                return None
-            if num > 255 and num < 0:
-                msg("e", f"{c} is not within the range of unsigned 8 bit integer!")
-                return None
-            nums.append(num)
-        if len(nums) == 4:
-            return (nums[3] | (nums[2] << 24) | (nums[1] << 16) | nums[0] << 8)
-
-    @classmethod
-    def str_from_int(cls, i: int) -> Optional[str]:
+    def __eq__(self, o: object) -> bool:
+        if isinstance(o, IpAddress):
+            return self._num == o._num
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self._num)
+
+    def __str__(self) -> str:
+        return self.to_str()
+
+    def __repr__(self) -> str:
+        return f"IpAddress({self.to_str()})"
+
+    @staticmethod
+    def int_from_str(s: str) -> Optional[int]:
+        """
+        Create a 32-bit integer from a string version of an IPv4 address.
+        Returns None if the string is not a valid address.
+        """
+        num, error = _parse(s)
+        if error:
+            msg("e", *error)
+        return num
+
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def str_from_int(i: int) -> str:
         """
         Create a string version of a IPv4 address, given a 32-bit integer.
         """
-        mask = 0xff
+        return f"{i >> 24 & 0xff}.{i >> 16 & 0xff}.{i >> 8 & 0xff}.{i & 0xff}"
 
-        a, b, c, d = i, i, i, i
+    @staticmethod
+    def ints_from_strs(strings: Iterable[str]) -> Optional[List[int]]:
+        """
+        Convert many string addresses into 32-bit integers at once. The
+        octets of all addresses are parsed by numpy from a single string and
+        combined with array operations, which is a lot faster than parsing
+        the addresses one by one. Returns None if any of the strings is not
+        a valid address.
+        """
+        strings = list(strings)
+        if any(n != 3 for n in map(methodcaller("count", "."), strings)):
+            msg("e", "Every address has to have four octets")
+            return None
+        text = ".".join(strings)
+        if not set(text) <= _OCTET_CHARS:
+            msg("e", "Invalid integer value in addresses")
+            return None
+        octets = np.fromstring(text.replace(".", " "), dtype=np.int64, sep=" ")
+        if len(octets) != 4 * len(strings):
+            # an empty octet
+            msg("e", "Invalid integer value in addresses")
+            return None
+        if octets.size and octets.max() > 255:
+            msg("e", "An octet is not within the range of unsigned 8 bit integer!")
+            return None
+        octets = octets.reshape(-1, 4)
+        return (octets[:, 0] << 24 | octets[:, 1] << 16 |
+                octets[:, 2] << 8 | octets[:, 3]).tolist()
 
-        a >>= 8
-        a &= mask
-        b >>= 16
-        b &= mask
-        c >>=24
-        c &= mask
-        d &= mask
+    @staticmethod
+    def strs_from_ints(ints: Iterable[int]) -> List[str]:
+        """
+        Convert many 32-bit integers into string addresses at once.
+        """
+        return [f"{i >> 24 & 0xff}.{i >> 16 & 0xff}.{i >> 8 & 0xff}.{i & 0xff}"
+                for i in ints]
+
+
+_OCTET_CHARS = frozenset("0123456789.")
 
-        return f"{a}.{b}.{c}.{d}"
+
+@lru_cache(maxsize=4096)
+def _parse(s: str) -> Tuple[Optional[int], Optional[Tuple]]:
+    """
+    Parse a string version of an IPv4 address into a 32-bit integer, or
+    return None along with the arguments of the error message. Only the
+    parsing is cached, so a repeated invalid address is reported every time.
+    """
+    parts = s.split(".")
+    if len(parts) != 4:
+        return None, ("'%s' does not have four octets", s)
+    num = 0
+    for c in parts:
+        try:
+            octet = int(c)
+        except ValueError:
+            return None, ("Invalid integer value '%s'", c)
+        if octet > 255 or octet < 0:
+            return None, ("%s is not within the range of unsigned 8 bit "
+                          "integer!", c)
+        num = (num << 8) | octet
+    return num, None
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+
+from sys import maxsize
+from typing import Callable, Dict, List, Sequence
+
+import numpy as np
+
+from .graph import CsrGraph
+
+
+def _costs(dist: Sequence[float]) -> np.ndarray:
+    costs = np.asarray(dist, dtype=np.float64)
+    costs[costs >= maxsize] = np.inf
+    return costs
+
+
+def loop_free_alternates(graph: CsrGraph,
+                         source: int,
+                         dist: Sequence[float],
+                         hop: Sequence[int],
+                         dist_from: Callable[[int], Sequence[float]]
+                         ) -> List[int]:
+    """
+    Find a loop-free alternate(RFC 5286) of the next hop to every router.
+
+    A neighbor N of the source S is a loop-free alternate for the destination
+    D, if Dist(N, D) < Dist(N, S) + Dist(S, D), in other words if N does not
+    send the traffic back through S. Of all such neighbors, apart from the
+    next hop itself, the one with the cheapest path through it is taken, ties
+    are broken by the lower router index.
+
+    Returns the dense number of the alternate for each router, -1 where
+    there is none.
+
+    :graph: graph of the network.
+    :source: dense number of the router.
+    :dist: cost of the best path from the source to each router, maxsize or
+           infinity if there is none.
+    :hop: dense number of the next hop to each router.
+    :dist_from: returns the costs of the best paths from a neighbor, just
+                like `dist`.
+    """
+    n = len(graph)
+    d_s = _costs(dist)
+    primary = np.asarray(hop)
+    best = np.full(n, np.inf)
+    backup = np.full(n, -1, dtype=np.int64)
+
+    # of parallel links to a neighbor, only the cheapest one counts
+    links: Dict[int, int] = dict()
+    lo, hi = graph.indptr[source], graph.indptr[source + 1]
+    for v, c in zip(graph.indices[lo:hi].tolist(),
+                    graph.weights[lo:hi].tolist()):
+        if v != source:
+            links[v] = min(links.get(v, c), c)
+
+    for v in sorted(links):
+        d_n = _costs(dist_from(v))
+        through = links[v] + d_n
+        ok = (d_n < d_n[source] + d_s) & (primary != v) & (through < best)
+        best[ok] = through[ok]
+        backup[ok] = v
+    backup[source] = -1
+    backup[~np.isfinite(d_s)] = -1
+    return backup.tolist()
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 
 from dataclasses import dataclass
-from enum import Enum
+from enum import Enum, IntEnum
 from typing import Dict, List
 
 
@@ -16,6 +16,16 @@ class LSType(Enum):
     AS_EXTERNAL_LINK = 5
 
 
+class LinkType(IntEnum):
+    """
+    Type of a link described in the body of a Router Link Advertisement.
+    """
+    POINT_TO_POINT = 1
+    TRANSIT = 2
+    STUB = 3
+    VIRTUAL = 4
+
+
 @dataclass
 class LSAHeader:
     """
@@ -53,20 +63,34 @@ class RLABody:
     ---
     Attributes:
     ---
-    * link_id: int : router ID of the router this link points to.
-    * link_data: int : changes depending on the type of the advertisement,
-      since we only work with routers, this is always the unique index of the
-      router we are linking to.
-    * num_tos_metrics: int : number of metrics for the given link. ALWAYS 0
+    * link_id: int : router ID of the router this link points to, or the
+      network address of a stub network.
+    * link_data: int : changes depending on the type of the link, for links
+      between routers, this is the unique index of the router we are linking
+      to, for stub networks, it is the network mask.
+    * num_tos_metrics: int : number of metrics for the given link, apart
+      from the default one.
     * tos_zero: int : default cost for all services.
     * tos_and_metric: Dict[int, int] : Service ID and metric(cost) for the
-      service. ALWAYS EMPTY
+      service, services without a metric use the default cost.
+    * type: int : type of the link, either a point-to-point link to another
+      router or a stub network, see `LinkType`.
     """
     link_id: int # router id of the router that is being linked to
     link_data: int # ifIndex of the router
-    num_tos_metrics: int # 0
+    num_tos_metrics: int # len(tos_and_metric)
     tos_zero: int # link cost
-    tos_and_metric: Dict[int, int] # ignore
+    tos_and_metric: Dict[int, int] # cost per type of service
+    type: int = LinkType.POINT_TO_POINT
+
+    def metric(self, tos: int = 0) -> int:
+        """
+        Return the cost of the link for a type of service, the default cost if
+        the link has no metric for it.
+        """
+        if not tos:
+            return self.tos_zero
+        return self.tos_and_metric.get(tos, self.tos_zero)
 
 
 @dataclass
@@ -80,14 +104,15 @@ class RouterLinkAdvertisement(LSAHeader):
     * v_b: bool : router is an endpoint of a virtual link. IGNORED
     * e_b: bool : router is an AS boundary router. IGNORED
     * b_b: bool : router is an area border router. IGNORED
-    * num_links: int: number of links advertised. ALWAYS 1
+    * num_links: int: number of links and stub networks advertised.
     * bodies: List[RLABody] : list of all advertised links.
     """
     v_b: bool # ignore
     e_b: bool # ignore
     b_b: bool # ignore
     num_links: int # number of links in a single advertisement
-    bodies: List[RLABody] # list of *num_links* link bodies
+    bodies: List[RLABody] # list of *num_links* link bodies, one router
+                          # advertises all of its links in a single LSA
 
 
 LinkStateAdvertisement = RouterLinkAdvertisement
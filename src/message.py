@@ -29,9 +29,10 @@ class MessageHeader:
 @dataclass
 class HelloMessage(MessageHeader):
     net_mask: int               # not used
+    hello_interval: int         # used
     options: int                # present, but not used
     priority: int               # used
-    router_dead_interval: int   # not used
+    router_dead_interval: int   # used
     dr: int                     # used
     bdr: int                    # used
     neighbors: List[int]        # used
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+
+from enum import IntEnum
+from typing import Optional
+
+from .timer import Timer
+
+
+class NeighborState(IntEnum):
+    """
+    State of the conversation with a neighbor(RFC 2328, section 10.1). The
+    database exchange is not simulated, the link state databases are kept in
+    sync by the network, so the states in between ExStart and Full are never
+    entered.
+    """
+    DOWN = 0
+    INIT = 1
+    TWO_WAY = 2
+    EXSTART = 3
+    FULL = 4
+
+
+class Neighbor:
+    """
+    A neighbor of a router, as learned from its Hello messages.
+
+    ---
+    Attributes:
+    ---
+    * router_id: int : router ID of the neighbor.
+    * priority: int : priority of the neighbor in the DR and BDR election.
+    * dr: int : router ID of the DR, as seen by the neighbor, 0 if none.
+    * bdr: int : router ID of the BDR, as seen by the neighbor, 0 if none.
+    * state: NeighborState : state of the conversation with the neighbor.
+    * heard: int : tick the last Hello message was received at.
+    * inactivity: Optional[Timer] : fires, when no Hello message was received
+      from the neighbor for the whole dead interval.
+    * exchange: Optional[Timer] : fires, when the database exchange with the
+      neighbor is done.
+    """
+    __slots__ = ("router_id",
+                 "priority",
+                 "dr",
+                 "bdr",
+                 "state",
+                 "heard",
+                 "inactivity",
+                 "exchange")
+
+    def __init__(self, router_id: int, priority: int) -> None:
+        self.router_id: int = router_id
+        self.priority: int = priority
+        self.dr: int = 0
+        self.bdr: int = 0
+        self.state: NeighborState = NeighborState.DOWN
+        self.heard: int = 0
+        self.inactivity: Optional[Timer] = None
+        self.exchange: Optional[Timer] = None
+
+    def __repr__(self) -> str:
+        return f"Neighbor({self.router_id}, {self.state.name})"
@@ -1,93 +1,549 @@
-from typing import List, Optional, Tuple
+from itertools import chain
+from sys import maxsize
+from threading import Event
+from typing import (TYPE_CHECKING, Any, Callable, Dict, Iterable, List,
+                    Optional, Set, Tuple)
 
+from .cache import LRUCache
+from .constants import (CACHE_SIZE, DENSE_MAX_ROUTERS, DENSE_MIN_DENSITY,
+                        MAX_COST, MAX_PRIORITY)
+from .db import LinkStateDatabase, make_routing_table, tos_values
+from .dense import all_pairs
+from .failures import RouteChange, what_if_failures
+from .lfa import loop_free_alternates
+from .message import HelloMessage
+from .neighbor import Neighbor, NeighborState
 from .router import Router
+from .rt import RoutingTable
 from .ip import IpAddress
-from .link_state import LinkStateAdvertisement, RLABody
-from .utils import debug
+from .link_state import LinkStateAdvertisement, LinkType, RLABody
+from .stats import Stats, profile, timed
+from .timer import TimerWheel
+from .utils import debug, msg
+
+if TYPE_CHECKING:
+    from .trace import Trace
+
+
+ENGINES = ("auto", "dijkstra", "dense")
 
 
 class Network:
     """
     A representation and a simulation of a network running the OSPF protocol.
-    This is not a continuous network, it's but a simple snapshot of the network
-    in at one point in time.
+    Routers and links can be added, removed and changed at any point, only
+    the affected link state advertisements are re-originated and flooded to
+    the routers.
 
     ---
     Attributes:
     ---
-    * _routers: List[Router] : all routers in the network.
-    * _lsas: List[LinkStateAdvertisement] : all link state advertisement
-      generated, when initializing the network.
+    * _routers: Dict[int, Router] : all routers in the network, keyed by
+      their index.
+    * _lsas: Dict[int, LinkStateAdvertisement] : the Router-LSA of every
+      router with links or stub networks, keyed by the index of the router.
+    * _links: Dict[int, Dict[int, RLABody]] : bodies of the links every
+      router advertises, keyed by the index of the router and the index of
+      the router the link points to.
+    * _stubs: Dict[int, Dict[Tuple[int, int], RLABody]] : bodies of the stub
+      networks every router advertises, keyed by the index of the router and
+      the address and mask of the network.
     * _last_address: IpAddress : when no IPv4 address is assigned to a new
       router, the network automatically assigns a new, one higher address than
       the last time.
     * has_dr: bool : indicate if the network has a DR
     * has_bdr: bool : indicate if the network has a BDR
+    * _dr: int : index of the DR, if the network has one
+    * _bdr: int : index of the BDR, if the network has one
+    * _stats: Stats : timers and counters of the network wide phases and of
+      the routers already removed, the routers on the network keep their
+      own, see `stats()`.
+    * generation: int : topology generation, incremented every time a router
+      or a link is added, removed or changed.
+    * _installed: int : generation of the link state advertisements currently
+      installed in the routers' link state databases, -1 if none are.
+    * _lsdb: LinkStateDatabase : link state database shared by all routers,
+      whose databases are in sync, see `db.py`.
+    * _cache: LRUCache : routing tables and paths computed so far, keyed by
+      the generation they were computed for, paths by the forwarding state
+      too.
+    * _forwarding: int : forwarding state, incremented every time a link is
+      marked down or up or the failover is turned on or off. Unlike the
+      generation, it changes the paths but not the routing tables.
+    * _failover: bool : whether the routers use their loop-free alternates,
+      when the link to a next hop is down, see `set_failover()`.
+    * engine: str : how `run()` computes the routing tables, 'dijkstra' runs
+      Dijkstra's algorithm in every router, 'dense' computes all of them at
+      once with `dense.all_pairs()`, 'auto' picks the dense engine for small
+      networks with many links.
+    * lfa: bool : whether the routing tables include loop-free alternates of
+      the next hops, see `lfa.py`.
+    * _wheel: TimerWheel : drives the Hello messages and neighbor timers of
+      all routers, one tick is one second of simulated time, see `tick()`.
+    * _neighbor_events: Optional[List[Tuple[int, int, NeighborState]]] :
+      neighbor state changes during the current `tick()`, None outside of
+      it.
+    * trace: Optional[Trace] : topology changes are recorded into it, see
+      `record()`.
     """
-    def __init__(self) -> None:
-        self._routers: List[Router] = list()
-        self._lsas: List[LinkStateAdvertisement] = list()
-        self._last_address: IpAddress = IpAddress(x) if\
-                (x := IpAddress.int_from_str("192.168.0.0")) else IpAddress(0)
+    def __init__(self,
+                 collect_stats: bool = False,
+                 cache_size: int = CACHE_SIZE,
+                 engine: str = "auto",
+                 lfa: bool = False) -> None:
+        self._routers: Dict[int, Router] = dict()
+        self._lsas: Dict[int, LinkStateAdvertisement] = dict()
+        self._links: Dict[int, Dict[int, RLABody]] = dict()
+        self._stubs: Dict[int, Dict[Tuple[int, int], RLABody]] = dict()
+        self._last_address: IpAddress = IpAddress(string="192.168.0.0")
         self.has_dr: bool = False
         self.has_bdr: bool = False
+        self._dr: int = 0
+        self._bdr: int = 0
+        self._stats: Stats = Stats(collect_stats)
+        self.generation: int = 0
+        self._installed: int = -1
+        self._lsdb: LinkStateDatabase = LinkStateDatabase(0)
+        self._cache: LRUCache = LRUCache(cache_size)
+        self._forwarding: int = 0
+        self._failover: bool = False
+        self.lfa: bool = lfa
+        self._wheel: TimerWheel = TimerWheel()
+        self._neighbor_events: Optional[List[Tuple[int, int,
+                                                   NeighborState]]] = None
+        self.trace: Optional["Trace"] = None
+        self.engine: str = engine
+        if engine not in ENGINES:
+            msg("e", "Unknown engine '%s', using 'auto'.", engine)
+            self.engine = "auto"
 
+    @timed("ingest")
     def add_routers(self, input: List[Tuple[int, int, int, bool]]) -> None:
         """
         Given a list of router settings, create new routers on the network.
+        Raises ValueError, before anything is added, if any priority is not
+        between 0 and 255.
         """
+        if not input:
+            return
+        for info in input:
+            check_priority(info[2])
+        in_sync = self._installed == self.generation
         for info in input:
             index, id, priority, ma = info
-            new_router = Router(IpAddress(id), index, priority, ma)
-            self._routers.append(new_router)
+            new_router = Router(IpAddress(id),
+                                index,
+                                priority,
+                                ma,
+                                Stats(self._stats.enabled),
+                                self.lfa)
+            new_router.set_failover(self._failover)
+            old = self._routers.get(index)
+            if old:
+                old.stop_timers()
+                self._stats.merge(old._stats)
+            self._routers[index] = new_router
+            self._record("router_join", index, id, priority, int(ma))
+            self._start(new_router)
+            # a new router receives the whole database from its neighbors
+            if in_sync:
+                new_router.share_database(self._lsdb)
+        self.generation += 1
+        if in_sync:
+            self._installed = self.generation
 
-    def add_links(self, input: List[Tuple[int, int, int]]) -> None:
+    @timed("ingest")
+    def add_links(self, input: List[Tuple]) -> None:
         """
-        Given a list of link configurations, create a list of link state
-        advertisements from the list of configurations. After this step,
+        Given a list of link configurations, add the links to the link state
+        advertisements of the routers they originate from. After this step,
         link all routers and establish neighboring relationships.
+
+        A link is configured by the indexes of the routers it connects and its
+        cost, optionally followed by a dictionary of costs per type of service,
+        e.g. `(1, 2, 10, {4: 50})`. Types of service without a cost use the
+        default one.
+
+        Adding a link, that already exists, changes its costs. Links between
+        routers, which are not on the network, are skipped. Raises ValueError,
+        before anything is added, if any cost is not between 1 and 65535.
         """
         for link in input:
-            a, b, cost = link
+            check_cost(link[2])
+            for metric in (link[3] or {}).values() if len(link) > 3 else ():
+                check_cost(metric)
+        changed: Set[int] = set()
+        for link in input:
+            a, b, cost = link[:3]
+            metrics = tos_metrics(link[3] if len(link) > 3 else None)
             r1 = self.find_id(a)
             r2 = self.find_id(b)
 
-            if not (r1 and r2):
-                return
-
-            # simulation of becoming neighbors between two routers
-            r1.add_neighbor(r2.send_hello())
-
-            if r1 and r2:
-                lsa = LinkStateAdvertisement(0,
-                                             0,
-                                             1,
-                                             r1.id.get(),
-                                             r1.index,
-                                             1,
-                                             0,
-                                             0,
-                                             False,
-                                             False,
-                                             False,
-                                             1,
-                                             [RLABody(
-                                                 r2.id.get(),
-                                                 r2.index,
-                                                 0,
-                                                 cost,
-                                                 {}
-                                                 )])
-                self._lsas.append(lsa)
+            if not (r1 and r2) or metrics is None:
+                continue
+
+            # simulation of becoming neighbors between two routers, the
+            # first Hello message goes over the new link
+            r2.add_neighbor(r1.send_hello())
+            self._record("link_up", a, b, cost, metrics=metrics)
+            self._links.setdefault(a, {})[b] =\
+                RLABody(r2.id.get(), b, len(metrics), cost, metrics)
+            changed.add(a)
+        self._reoriginate(changed)
+
+    def remove_link(self, a: int, b: int) -> None:
+        """
+        Remove the link from router `a` to router `b`. The link state
+        advertisement of router `a` is re-originated without the link and
+        router `b` forgets about router `a`, as it cannot hear its Hello
+        messages anymore. Links are directional, just like in `add_links()`.
+
+        :a: index of the router the link originates from.
+        :b: index of the router the link points to.
+        """
+        if b not in self._links.get(a, {}):
+            return
+        r1, r2 = self.find_id(a), self.find_id(b)
+        if r1 and r2:
+            r2.remove_neighbor(r1.id.get())
+        del self._links[a][b]
+        self._record("link_down", a, b)
+        self._reoriginate({a})
+
+    def link_down(self, a: int, b: int) -> None:
+        """
+        Mark the link from router `a` to router `b` as down, without
+        re-originating anything, as if the failure had just been detected.
+        Router `a` drops the traffic over the link, or sends it to the
+        loop-free alternate with the failover on, until the link is removed
+        or marked up again.
+
+        :a: index of the router the link originates from.
+        :b: index of the router the link points to.
+        """
+        router = self.find_id(a)
+        if router and b in self._links.get(a, {}):
+            router.link_down(b)
+            self._forwarding += 1
+
+    def link_up(self, a: int, b: int) -> None:
+        """
+        Mark the link from router `a` to router `b` as up again, see
+        `link_down()`.
+
+        :a: index of the router the link originates from.
+        :b: index of the router the link points to.
+        """
+        router = self.find_id(a)
+        if router:
+            router.link_up(b)
+            self._forwarding += 1
+
+    def set_failover(self, enabled: bool = True) -> None:
+        """
+        Turn the local failover of all routers on or off, see
+        `Router.set_failover()`. It only has an effect on routing tables with
+        loop-free alternates.
+        """
+        self._failover = enabled
+        for router in self._routers.values():
+            router.set_failover(enabled)
+        self._forwarding += 1
+
+    def update_cost(self, a: int, b: int, cost: int, tos: int = 0) -> None:
+        """
+        Change the cost of the link from router `a` to router `b`. Only the
+        link state advertisement of router `a` is re-originated.
+
+        :a: index of the router the link originates from.
+        :b: index of the router the link points to.
+        :cost: the new cost, between 1 and 65535, ValueError is raised
+               otherwise.
+        :tos: type of service the cost is for, the default cost if 0.
+        """
+        check_cost(cost)
+        body = self._links.get(a, {}).get(b)
+        r1, r2 = self.find_id(a), self.find_id(b)
+        if not (body and r1 and r2):
+            return
+        changed = changed_cost(body, cost, tos)
+        if changed is None:
+            return
+        self._record("cost", a, b, cost, tos)
+        self._links[a][b] = RLABody(r2.id.get(), b, len(changed[1]), *changed)
+        self._reoriginate({a})
+
+    @timed("ingest")
+    def add_stubs(self, input: List[Tuple]) -> None:
+        """
+        Given a list of stub network configurations(index of the router, network
+        address, network mask, cost, optionally costs per type of service just
+        like in `add_links()`), let the routers advertise the networks
+        attached to them. Adding a network, that is already advertised by the
+        router, changes its cost. Networks of routers, which are not on the
+        network, and networks with a non-contiguous mask are skipped. Costs
+        are checked just like in `add_links()`.
+        """
+        for stub in input:
+            check_cost(stub[3])
+            for metric in (stub[4] or {}).values() if len(stub) > 4 else ():
+                check_cost(metric)
+        changed: Set[int] = set()
+        for stub in input:
+            index, network, mask, cost = stub[:4]
+            metrics = tos_metrics(stub[4] if len(stub) > 4 else None)
+            router = self.find_id(index)
+            if not router or metrics is None or not contiguous_mask(mask):
+                continue
+            network &= mask
+            self._record("stub_up", index, network, mask, cost,
+                         metrics=metrics)
+            self._stubs.setdefault(index, {})[(network, mask)] =\
+                RLABody(network, mask, len(metrics), cost, metrics,
+                        LinkType.STUB)
+            changed.add(index)
+        self._reoriginate(changed)
+
+    def remove_stub(self, index: int, network: int, mask: int) -> None:
+        """
+        Stop advertising a stub network attached to a router.
+
+        :index: index of the router the network is attached to.
+        :network: address of the network.
+        :mask: mask of the network.
+        """
+        networks = self._stubs.get(index, {})
+        if networks.pop((network & mask, mask), None):
+            self._record("stub_down", index, network & mask, mask)
+            self._reoriginate({index})
+
+    def stubs(self, tos: int = 0) -> Dict[Tuple[int, int, int], int]:
+        """
+        Return the cost of every stub network, keyed by the index of the router
+        it is attached to, its address and its mask.
+
+        :tos: type of service, whose costs are returned.
+        """
+        return {(index, network, mask): body.metric(tos)
+                for index, networks in self._stubs.items()
+                for (network, mask), body in networks.items()}
+
+    def remove_router(self, index: int) -> None:
+        """
+        Remove a router from the network, along with all links originating
+        from it or pointing to it. If the router was a DR or a BDR, a new one
+        is elected the next time the network is run.
+
+        :index: unique index of the router.
+        """
+        router = self._routers.pop(index, None)
+        if not router:
+            return
+        router.stop_timers()
+        # the totals of the network keep what the router did, the routes of
+        # the router are gone along with it
+        self._stats.merge(router._stats)
+        if self._stats.enabled:
+            self._stats.count("routes_changed",
+                              RoutingTable().count_changes(router.get_rt()))
+        self._record("router_leave", index)
+        changed = {index}
+        for a, links in self._links.items():
+            if index in links:
+                del links[index]
+                changed.add(a)
+        for other in chain(changed, self._links.pop(index, {})):
+            r = self.find_id(other)
+            if r:
+                r.remove_neighbor(router.id.get())
+        self._stubs.pop(index, None)
+        if router.is_dr():
+            self.has_dr = False
+        if router.is_bdr():
+            self.has_bdr = False
+        # the router itself is gone, so the generation has to change, even if
+        # it had no links
+        if not self._reoriginate(changed):
+            self._bump(self._installed == self.generation)
+
+    def update(self,
+               routers: List[Tuple[int, int, int, bool]],
+               links: List[Tuple[int, int, int]]) -> None:
+        """
+        Bring the network in line with the given router and link settings.
+        Only routers and links, which differ from the current ones, are
+        added, removed or changed, so the network can be kept alive across
+        any number of edits.
+
+        :routers: router settings, just like in `add_routers()`.
+        :links: link settings, just like in `add_links()`.
+        """
+        wanted = {r[0]: r for r in routers}
+        for index, router in list(self._routers.items()):
+            info = wanted.get(index)
+            current = (index, router.id.get(), router.priority, router.has_ma())
+            if info != current:
+                self.remove_router(index)
+        self.add_routers([r for i, r in wanted.items()
+                          if i not in self._routers])
+
+        costs = {(a, b): cost for a, b, cost in links}
+        for key in [k for k in self.links() if k not in costs]:
+            self.remove_link(*key)
+        current = self.links()
+        self.add_links([(a, b, cost) for (a, b), cost in costs.items()
+                        if current.get((a, b)) != cost])
+
+    def links(self, tos: int = 0) -> Dict[Tuple[int, int], int]:
+        """
+        Return the cost of every link on the network, keyed by the indexes of
+        the routers it connects.
+
+        :tos: type of service, whose costs are returned.
+        """
+        return {(a, b): body.metric(tos)
+                for a, links in self._links.items()
+                for b, body in links.items()}
+
+    def _originate(self, index: int) -> Optional[LinkStateAdvertisement]:
+        """
+        Create the Router-LSA of a router, listing all of its links and stub
+        networks. If the router already advertises them, the new
+        advertisement gets a higher sequence number than the old one. Routers
+        without any links or stub networks, as well as removed routers, don't
+        advertise anything.
+
+        :index: index of the router.
+        """
+        router = self.find_id(index)
+        if not router:
+            return None
+        return router_lsa(router.id.get(),
+                          index,
+                          self._links.get(index, {}),
+                          self._stubs.get(index, {}),
+                          self._lsas.get(index))
+
+    def _reoriginate(self, indexes: Iterable[int]) -> bool:
+        """
+        Re-originate and flood the Router-LSAs of the given routers. Returns
+        whether anything was flooded.
+        """
+        changes: Dict[int, Optional[LinkStateAdvertisement]] = dict()
+        for index in indexes:
+            lsa = self._originate(index)
+            if lsa or index in self._lsas:
+                changes[index] = lsa
+        self._flood(changes)
+        return bool(changes)
+
+    def _advertisements(self) -> List[LinkStateAdvertisement]:
+        """
+        Return all link state advertisements.
+        """
+        return list(self._lsas.values())
+
+    def _flood(self,
+               changes: Dict[int, Optional[LinkStateAdvertisement]]) -> None:
+        """
+        Replace, add or withdraw (when None) the link state advertisements of
+        the given routers. If the routers' link state databases are up to
+        date, they receive only these changes instead of the whole database.
+
+        :changes: the new advertisements, keyed by the index of the router.
+        """
+        if not changes:
+            return
+        in_sync = self._installed == self.generation
+        withdrawn = []
+        originated = []
+        for key, lsa in changes.items():
+            old = self._lsas.pop(key, None)
+            if old:
+                withdrawn.append(old)
+            if lsa:
+                self._lsas[key] = lsa
+                originated.append(lsa)
+        if in_sync:
+            # the routers in sync see the changes in the shared database,
+            # only the ones out of sync receive them on their own
+            with self._stats.timer("lsdb_install"):
+                for each in withdrawn:
+                    self._lsdb.remove(each)
+                for each in originated:
+                    self._lsdb.add(each)
+                for router in self._routers.values():
+                    if not router._database.in_sync():
+                        router.withdraw_advertisements(withdrawn)
+                        router.recieve_advertisements(originated)
+                self._stats.count("lsas_installed", len(originated))
+        self._bump(in_sync)
+
+    def _bump(self, in_sync: bool) -> None:
+        """
+        Move to the next topology generation.
+
+        :in_sync: whether the link state databases were brought up to date
+                  with the change.
+        """
+        self.generation += 1
+        if in_sync:
+            self._installed = self.generation
+
+    def _start(self, router: Router) -> None:
+        """
+        Start the Hello messages and neighbor timers of a router.
+        """
+        router.on_neighbor_change = self._neighbor_changed
+        router.start_timers(self._wheel,
+                            lambda hello: self._deliver(router.index, hello))
+
+    def _deliver(self, index: int, hello: HelloMessage) -> None:
+        """
+        Send a Hello message of a router over all of its links. A router
+        only hears the Hello messages, which come over a link pointing to it,
+        `add_links()` and `remove_link()` follow the same direction.
+        """
+        for b in self._links.get(index, ()):
+            router = self._routers.get(b)
+            if router:
+                router.add_neighbor(hello)
+
+    def _neighbor_changed(self, router: Router, n: Neighbor) -> None:
+        if self._neighbor_events is not None:
+            self._neighbor_events.append((router.index, n.router_id, n.state))
+
+    def tick(self, seconds: int = 1) -> List[Tuple[int, int, NeighborState]]:
+        """
+        Move the simulated time forward. Routers send their Hello messages
+        every hello interval over all of their links and declare neighbors,
+        which they did not hear from for the dead interval, down. For more
+        information, please consult the documentation in `neighbor.py` and
+        `timer.py`.
+
+        Returns every change of a neighbor's state on the way, as the index
+        of the router, the router ID of its neighbor and the new state.
+
+        :seconds: number of seconds to move forward.
+        """
+        self._neighbor_events = []
+        with self._stats.timer("hello"):
+            self._wheel.advance(seconds)
+        events, self._neighbor_events = self._neighbor_events, None
+        return events
+
+    @property
+    def now(self) -> int:
+        """
+        Simulated time in seconds.
+        """
+        return self._wheel.now
 
     def find_id(self, id: int) -> Optional[Router]:
         """
         Find a router given its unique index.
         """
-        for router in self._routers:
-            if router.index == id:
-                return router
-        return None
+        return self._routers.get(id)
 
     def get_dr_and_bdr(self) -> Optional[Tuple[int, int]]:
         """
@@ -103,7 +559,9 @@ class Network:
             else:
                 return None
 
-    def run(self) -> List[List[int]]:
+    def run(self,
+            progress: Optional[Callable[[str, int, int], None]] = None,
+            cancel: Optional[Event] = None) -> List[List[int]]:
         """
         Run the network simulation.
 
@@ -112,59 +570,310 @@ class Network:
            Network.
         3. Communicate all these changes and processes back to the GUI so it
            can be drawn on the canvas.
+
+        Routing tables and paths are cached per topology generation, running
+        an unchanged network again does not recompute anything.
+
+        This can be run from a worker thread, as long as nothing else touches
+        the network in the meantime.
+
+        :progress: optional callback, called after each router is processed
+                   with the name of the step ('spf' or 'paths'), the number
+                   of routers processed so far and the number of routers.
+        :cancel: optional event, once it is set, the run stops after the
+                 router currently being processed and returns the paths
+                 found up to that point.
         """
         self.election()
-        for each in self._routers:
-            each.recieve_advertisements(self._lsas)
+        if self._use_dense():
+            self._all_pairs()
 
         path_list = []
-        [r.init_rt() for r in self._routers]
-        for router in self._routers:
-            path_list.extend(self._get_paths(router))
+        total = len(self._routers)
+        for i, router in enumerate(self._routers.values(), 1):
+            if cancel and cancel.is_set():
+                return path_list
+            self._update_rt(router)
+            if progress:
+                progress("spf", i, total)
+        with self._stats.timer("path_extraction"):
+            for i, router in enumerate(self._routers.values(), 1):
+                if cancel and cancel.is_set():
+                    return path_list
+                path_list.extend(self._get_paths(router))
+                if progress:
+                    progress("paths", i, total)
 
         return path_list
 
+    def compute_tables(self) -> None:
+        """
+        Bring the routing tables of all routers up to date with the current
+        generation, without electing a DR and BDR or extracting any paths.
+        """
+        if self._use_dense():
+            self._all_pairs()
+        for router in self._routers.values():
+            self._update_rt(router)
+
+    def record(self, trace: Optional["Trace"] = None) -> "Trace":
+        """
+        Start recording every change of the topology into a trace, see
+        `trace.py`. The trace starts with the routers, links and stub networks
+        already on the network, so replaying it rebuilds the network from
+        scratch. Set `trace` to None to stop recording.
+
+        :trace: trace to append the changes to, a new one if None.
+        """
+        from .trace import Trace
+
+        self.trace = trace if trace is not None else Trace()
+        for index, router in self._routers.items():
+            self._record("router_join",
+                         index,
+                         router.id.get(),
+                         router.priority,
+                         int(router.has_ma()))
+        for a, links in self._links.items():
+            for b, body in links.items():
+                self._record("link_up", a, b, body.tos_zero,
+                             metrics=body.tos_and_metric)
+        for index, networks in self._stubs.items():
+            for (network, mask), body in networks.items():
+                self._record("stub_up", index, network, mask, body.tos_zero,
+                             metrics=body.tos_and_metric)
+        return self.trace
+
+    def _record(self,
+                kind: str,
+                *args: int,
+                metrics: Optional[Dict[int, int]] = None) -> None:
+        if self.trace is not None:
+            self.trace.record(self.now, kind, *args, metrics=metrics)
+
+    def _install(self) -> None:
+        """
+        Install the link state advertisements of the current generation into
+        every router's link state database, unless they already are. This is
+        only done once a routing table actually has to be computed.
+        """
+        if self._installed == self.generation:
+            return
+        with self._stats.timer("lsdb_install"):
+            lsas = self._advertisements()
+            self._lsdb = LinkStateDatabase(0)
+            for each in lsas:
+                self._lsdb.add(each)
+            for router in self._routers.values():
+                router.share_database(self._lsdb)
+            self._stats.count("lsas_installed", len(lsas))
+        self._installed = self.generation
+
+    def _use_dense(self) -> bool:
+        """
+        Decide whether to compute all routing tables at once. A matrix of all
+        pairs of routers pays off, once there are enough links per router.
+        """
+        if self.engine != "auto":
+            return self.engine == "dense"
+        n = len(self._routers)
+        return 0 < n <= DENSE_MAX_ROUTERS and\
+            sum(map(len, self._links.values())) >= DENSE_MIN_DENSITY * n * n
+
+    def _all_pairs(self) -> None:
+        """
+        Compute the routing tables of all routers, which are not cached for
+        the current generation yet, at once and cache them.
+        """
+        missing = [r for r in self._routers.values()
+                   if ("rt", r.index, self.generation) not in self._cache]
+        if not missing:
+            return
+        # the tables are computed from the shared database, the routers'
+        # databases are brought up to date along with it
+        self._install()
+        with self._stats.timer("graph_build"):
+            graph = self._lsdb.graph()
+            stubs = self._lsdb.stubs()
+        tables = {r.index: RoutingTable() for r in missing}
+        with self._stats.timer("spf"):
+            for tos in [0] + tos_values(graph, stubs):
+                metric = graph.for_tos(tos)
+                dist, hop = all_pairs(metric)
+                self._stats.count("spf_runs", len(graph))
+                for router in missing:
+                    start = graph.dense.get(router.index)
+                    if start is None:
+                        continue
+                    costs = [int(c) if c != float("inf") else maxsize
+                             for c in dist[start].tolist()]
+                    backup = None
+                    if self.lfa:
+                        backup = loop_free_alternates(metric,
+                                                      start,
+                                                      costs,
+                                                      hop[start],
+                                                      dist.__getitem__)
+                    rt = make_routing_table(metric,
+                                            start,
+                                            costs,
+                                            hop[start].tolist(),
+                                            stubs,
+                                            backup,
+                                            tos)
+                    if tos:
+                        tables[router.index].add_tos_table(tos, rt)
+                    else:
+                        tables[router.index] = rt
+        for index, rt in tables.items():
+            self._cache.put(("rt", index, self.generation), rt)
+
+    def _update_rt(self, router: Router) -> RoutingTable:
+        """
+        Bring a router's routing table up to date with the current generation,
+        computing it only if it is not cached yet.
+        """
+        key = ("rt", router.index, self.generation)
+        rt = self._cache.get(key)
+        if rt is None:
+            self._install()
+            router.init_rt()
+            rt = router.get_rt()
+            self._cache.put(key, rt)
+        else:
+            router.set_rt(rt)
+        return rt
+
+    def routing_table(self,
+                      index: int,
+                      tos: int = 0) -> Optional[RoutingTable]:
+        """
+        Return the up to date routing table of a router, None if there is no
+        router with the given index.
+
+        :index: unique index of the router.
+        :tos: type of service, whose routing table is returned.
+        """
+        router = self.find_id(index)
+        if not router:
+            return None
+        return self._update_rt(router).for_tos(tos)
+
+    def what_if_failures(self,
+                         links: Optional[List[Tuple[int, int]]] = None,
+                         bidirectional: bool = True,
+                         workers: int = 1
+                         ) -> Dict[Tuple[int, int], List[RouteChange]]:
+        """
+        Find out, which routes break or change, when a single link fails, for
+        each of the given links. The network itself is left untouched. For
+        more information, please consult the documentation in `failures.py`.
+
+        :links: links to fail one at a time, as pairs of router indexes, all
+                links if not given.
+        :bidirectional: whether a failure takes down the link in both
+                        directions.
+        :workers: number of processes the failures are spread over.
+        """
+        if links is None:
+            current = self.links()
+            links = [(a, b) for a, b in current
+                     if not (bidirectional and (b, a) in current and b < a)]
+        self._install()
+        return what_if_failures(self._lsdb.graph(),
+                                links,
+                                bidirectional,
+                                workers,
+                                self._stats)
+
+    def profile_run(self, path: str = "network.prof") -> List[List[int]]:
+        """
+        Same as `run()`, but the whole run is profiled with cProfile and the
+        results are written into a `.prof` file.
+
+        :path: path of the output file.
+        """
+        return profile(path, self.run)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Return the timers and counters of the network, summed up with the
+        timers and counters of all of its routers, including the removed
+        ones, so the totals never go down.
+        """
+        total = Stats()
+        total.merge(self._stats)
+        for router in self._routers.values():
+            total.merge(router._stats)
+        return total.as_dict()
+
+    def enable_stats(self, enabled: bool = True) -> None:
+        """
+        Turn the collection of statistics on or off for the network and all
+        of its routers.
+        """
+        self._stats.enabled = enabled
+        for router in self._routers.values():
+            router.enable_stats(enabled)
+
     def _get_paths(self, start: Router) -> List[List[int]]:
         """
         Get best path from every router on the network to every router on the
-        network.
+        network. The paths are cached for the current generation and
+        forwarding state, links marked down have to go through `link_down()`
+        and `link_up()` for the cache to notice.
+        """
+        key = ("paths", start.index, self.generation, self._forwarding)
+        path_list = self._cache.get(key)
+        if path_list is None:
+            path_list = self._find_paths(start)
+            self._cache.put(key, path_list)
+        return path_list
+
+    def _find_paths(self, start: Router) -> List[List[int]]:
+        """
+        Follow the routing tables from a router to every other router, one
+        path per routing table entry, the way a packet would be forwarded.
+        The routing tables of all routers have to be up to date.
+        Every hop, including the first one, is taken from `get_next_for()`,
+        so links marked down and the failover are taken into account. A path
+        ends at the destination, or at the router dropping the packet, if
+        there is no next hop. Raises RuntimeError if the routing tables lead
+        around in a loop.
         """
         path_list = []
         for entry in start.get_rt_entries():
-            output = [start.index]
             dest = entry.destination_id
-            next = entry.next_hop
-            output.append(next)
-            if not next == dest:
-                while next != dest:
-                    if not next:
-                        break
-                    res = self.find_id(next)
-                    if res:
-                        if next not in output:
-                            output.append(next)
-                        next = res.get_next_for(dest)
-                    else:
-                        break
-            output.append(dest)
-
+            output = [start.index]
+            router: Optional[Router] = start
+            while router and router.index != dest:
+                next = router.get_next_for(dest)
+                if next is None:
+                    break
+                if len(output) > len(self._routers):
+                    raise RuntimeError(f"The routing tables loop on the "
+                                       f"way from {start.index} to "
+                                       f"{dest}.")
+                output.append(next)
+                router = self.find_id(next)
             path_list.append(output)
 
         return path_list
 
+    @timed("election")
     def election(self) -> None:
         """
         Run the process of electing a DR and a BDR on the network. These
         routers will be marked as such, DR will be RED and BDR will be BLUE.
         """
-        ma_capable = [r for r in self._routers if r.has_ma()]
+        ma_capable = [r for r in self._routers.values() if r.has_ma()]
 
         if not ma_capable:
             return
 
         s = sorted(ma_capable, key=lambda x: x.priority, reverse=True)
 
-        debug(f"sorted dr and bdr is {[x.index for x in s]}")
+        debug("sorted dr and bdr is %s", lambda: [x.index for x in s])
 
         if self.has_dr and self.has_bdr:
             return
@@ -181,4 +890,107 @@ class Network:
                 self._bdr = each.index
                 self.has_bdr = True
                 break
-        debug(f"dr and bdr are: {self._dr}, {self._bdr}")
+        debug("dr and bdr are: %s, %s", self._dr, self._bdr)
+
+
+def router_lsa(id: int,
+               index: int,
+               links: Dict[int, RLABody],
+               stubs: Dict[Tuple[int, int], RLABody],
+               old: Optional[LinkStateAdvertisement]
+               ) -> Optional[LinkStateAdvertisement]:
+    """
+    Create the Router-LSA of a router, listing all of its links and stub
+    networks, None if it has neither.
+
+    :id: router ID of the router.
+    :index: index of the router.
+    :links: bodies of the router's links, keyed by the index of the router
+            they point to.
+    :stubs: bodies of the router's stub networks, keyed by address and mask.
+    :old: the router's current advertisement, the new one gets a higher
+          sequence number.
+    """
+    bodies = list(links.values()) + list(stubs.values())
+    if not bodies:
+        return None
+    return LinkStateAdvertisement(0,
+                                  0,
+                                  1,
+                                  id,
+                                  index,
+                                  old.ls_seq_num + 1 if old else 1,
+                                  0,
+                                  0,
+                                  False,
+                                  False,
+                                  False,
+                                  len(bodies),
+                                  bodies)
+
+
+def changed_cost(body: RLABody,
+                 cost: int,
+                 tos: int) -> Optional[Tuple[int, Dict[int, int]]]:
+    """
+    Return the default cost and the costs per type of service of a link,
+    once the cost of a type of service is changed, None if nothing changes
+    or the type of service is invalid.
+    """
+    if tos_metrics({tos: cost}) is None:
+        return None
+    metrics = dict(body.tos_and_metric)
+    if tos:
+        if metrics.get(tos) == cost:
+            return None
+        metrics[tos] = cost
+        return body.tos_zero, metrics
+    if body.tos_zero == cost:
+        return None
+    return cost, metrics
+
+
+def contiguous_mask(mask: int) -> bool:
+    """
+    Check whether a network mask is contiguous, logging an error if not.
+    """
+    host = ~mask & 0xffffffff
+    if host & (host + 1):
+        msg("e", "%s is not a contiguous network mask",
+            lambda: IpAddress.str_from_int(mask))
+        return False
+    return True
+
+
+def tos_metrics(metrics: Optional[Dict[int, int]]) -> Optional[Dict[int, int]]:
+    """
+    Check the costs of a link per type of service, None if they are invalid.
+    The type of service is a single byte, TOS 0 being the default cost.
+    """
+    metrics = dict(metrics) if metrics else {}
+    for tos in metrics:
+        if not 0 <= tos <= 255:
+            msg("e", "%s is not a valid type of service.", tos)
+            return None
+    metrics.pop(0, None)
+    return metrics
+
+
+def check_cost(cost: int) -> None:
+    """
+    Raise ValueError if a cost is not a valid OSPF metric, which is between 1
+    and 65535. Links without any cost would let routes loop.
+    """
+    if not 1 <= cost <= MAX_COST:
+        raise ValueError(f"{cost} is not a valid cost, it has to be between "
+                         f"1 and {MAX_COST}.")
+
+
+def check_priority(priority: int) -> None:
+    """
+    Raise ValueError if a router priority does not fit the single byte of a
+    Hello packet, which is between 0 and 255.
+    """
+    if not 0 <= priority <= MAX_PRIORITY:
+        raise ValueError(f"{priority} is not a valid router priority, it has "
+                         f"to be between 0 and {MAX_PRIORITY}.")
@@ -0,0 +1,908 @@
+#!/usr/bin/env python3
+"""
+A network simulated by several processes at once.
+
+The routers are split into partitions, each owned by a worker process. A
+worker keeps everything its routers need: the router objects, their Hello
+and neighbor timers, their links and stub networks, and a link state
+database of the whole area they share. It originates the Router-LSAs of its
+routers and computes their routing tables.
+
+The coordinator, a `PartitionedNetwork`, only keeps the configuration of
+the topology: the settings of every router, the bodies of every link and
+stub network and which partition owns which router. It has no routers, no
+timers and no advertisements of its own. Every change is sent to the
+workers owning the routers it concerns, and every step, the advertisements
+originated by each worker are passed on to all the other workers in a single
+Link State Update, through ring buffers in shared memory. Hello messages to
+routers of other partitions take the same way.
+
+A worker computes again only the routing tables, which an advertisement
+can actually change, see `_Partition.install()`, so a change far away from
+most routers costs only a few SPF runs.
+
+There is only a single area, so every router needs every advertisement,
+the routers are spread evenly over the partitions to balance the work.
+"""
+
+import multiprocessing
+from dataclasses import replace
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .constants import MAX_AGE, RING_SIZE
+from .db import LinkStateDatabase
+from .ip import IpAddress
+from .link_state import LinkStateAdvertisement, LinkType, RLABody
+from .message import HelloMessage, LSUpdate, MessageType
+from .neighbor import Neighbor, NeighborState
+from .net import (changed_cost, check_cost, check_priority, contiguous_mask,
+                  router_lsa, tos_metrics)
+from .ring import RingBuffer
+from .router import Router
+from .rt import RoutingTable
+from .stats import Stats, timed
+from .timer import TimerWheel
+
+
+RouterInfo = Tuple[int, int, int, bool]
+NeighborEvent = Tuple[int, int, NeighborState]
+Hello = Tuple[int, HelloMessage]
+
+
+class _Partition:
+    """
+    The routers of a single partition, kept by its worker process.
+
+    ---
+    Attributes:
+    ---
+    * lfa: bool : whether the routing tables include loop-free alternates.
+    * stats: Stats : timers and counters of all routers of the partition.
+    * wheel: TimerWheel : drives the Hello messages and neighbor timers.
+    * database: LinkStateDatabase : advertisements of the whole area, shared
+      by all routers of the partition.
+    * lsas: Dict[int, LinkStateAdvertisement] : every advertisement in the
+      database, keyed by the index of the advertising router.
+    * routers: Dict[int, Router] : routers of the partition, keyed by index.
+    * links: Dict[int, Dict[int, RLABody]] : bodies of the links of the
+      routers, keyed by the index of the router they point to.
+    * stubs: Dict[int, Dict[Tuple[int, int], RLABody]] : bodies of the stub
+      networks of the routers, keyed by address and mask.
+    * dirty: Set[int] : routers, whose Router-LSA has to be originated again.
+    * hellos: List[Hello] : Hello messages to routers of other partitions,
+      along with the index of the receiving router.
+    * events: Optional[List[NeighborEvent]] : changes of neighbor states
+      during a tick, None outside of it.
+    * stale: Set[int] : routers, whose routing table has to be computed
+      again.
+    """
+    def __init__(self, lfa: bool, collect_stats: bool) -> None:
+        self.lfa: bool = lfa
+        self.stats: Stats = Stats(collect_stats)
+        self.wheel: TimerWheel = TimerWheel()
+        self.database: LinkStateDatabase = LinkStateDatabase(0)
+        self.lsas: Dict[int, LinkStateAdvertisement] = dict()
+        self.routers: Dict[int, Router] = dict()
+        self.links: Dict[int, Dict[int, RLABody]] = dict()
+        self.stubs: Dict[int, Dict[Tuple[int, int], RLABody]] = dict()
+        self.dirty: Set[int] = set()
+        self.hellos: List[Hello] = []
+        self.events: Optional[List[NeighborEvent]] = None
+        self.stale: Set[int] = set()
+
+    def add_routers(self, infos: List[RouterInfo]) -> None:
+        for index, id, priority, ma in infos:
+            router = Router(IpAddress(id), index, priority, ma, self.stats,
+                            self.lfa)
+            old = self.routers.get(index)
+            if old:
+                old.stop_timers()
+            router.share_database(self.database)
+            router.on_neighbor_change = self._neighbor_changed
+            router.start_timers(self.wheel,
+                                lambda hello, index=index:
+                                    self._deliver(index, hello))
+            self.routers[index] = router
+            self.stale.add(index)
+
+    def remove_routers(self, indexes: List[int]) -> None:
+        for index in indexes:
+            router = self.routers.pop(index, None)
+            if not router:
+                continue
+            router.stop_timers()
+            if self.stats.enabled:
+                self.stats.count("routes_changed",
+                                 RoutingTable().count_changes(router.get_rt()))
+            self.links.pop(index, None)
+            self.stubs.pop(index, None)
+            self.stale.discard(index)
+            self.dirty.add(index)
+
+    def set_links(self,
+                  changes: List[Tuple[int, int, Optional[RLABody]]]) -> None:
+        """
+        Add, change or remove(when None) links of routers of the partition,
+        the first Hello message goes over the link right away, just like in
+        `Network.add_links()`.
+        """
+        for a, b, body in changes:
+            router = self.routers.get(a)
+            if not router:
+                continue
+            if body:
+                self._send(b, router.send_hello())
+                self.links.setdefault(a, {})[b] = body
+            else:
+                self.links.get(a, {}).pop(b, None)
+            self.dirty.add(a)
+
+    def set_stubs(self,
+                  changes: List[Tuple[int, Tuple[int, int], Optional[RLABody]]]
+                  ) -> None:
+        """
+        Add, change or remove(when None) stub networks of routers of the
+        partition.
+        """
+        for index, key, body in changes:
+            if index not in self.routers:
+                continue
+            if body:
+                self.stubs.setdefault(index, {})[key] = body
+            else:
+                self.stubs.get(index, {}).pop(key, None)
+            self.dirty.add(index)
+
+    def forget(self, pairs: List[Tuple[int, int]]) -> None:
+        """
+        Let routers of the partition forget about neighbors, whose Hello
+        messages can't reach them anymore, given as the index of the router
+        and the router ID of the neighbor.
+        """
+        for index, id in pairs:
+            router = self.routers.get(index)
+            if router:
+                router.remove_neighbor(id)
+
+    def hear(self, hellos: List[Hello]) -> None:
+        """
+        Deliver Hello messages sent by routers of other partitions.
+        """
+        for index, hello in hellos:
+            router = self.routers.get(index)
+            if router:
+                router.add_neighbor(hello)
+
+    def originate(self) -> List[LinkStateAdvertisement]:
+        """
+        Originate the Router-LSAs of the changed routers of the partition and
+        install them. Returns them for the other partitions, along with the
+        withdrawn advertisements of routers, which have nothing left to
+        advertise.
+        """
+        lsas = []
+        for index in self.dirty:
+            old = self.lsas.get(index)
+            router = self.routers.get(index)
+            lsa = router_lsa(router.id.get(),
+                             index,
+                             self.links.get(index, {}),
+                             self.stubs.get(index, {}),
+                             old) if router else None
+            if lsa:
+                lsas.append(lsa)
+            elif old:
+                # withdrawn by flushing it with the maximum age(RFC 2328,
+                # section 14.1)
+                lsas.append(replace(old, ls_age=MAX_AGE))
+        self.dirty = set()
+        self.install(lsas)
+        return lsas
+
+    def install(self, advs: List[LinkStateAdvertisement]) -> None:
+        """
+        Install advertisements into the shared database, replacing the older
+        instances of the same routers, and mark the routers, whose routing
+        tables they change, as stale, see `_mark_stale()`. An advertisement
+        with the maximum age withdraws the instance it was flushed from,
+        instances older than the installed one are dropped.
+        """
+        installed = 0
+        with self.stats.timer("lsdb_install"):
+            for adv in advs:
+                index = adv.advertising_router
+                old = self.lsas.get(index)
+                if old and adv.ls_seq_num < old.ls_seq_num:
+                    continue
+                if old:
+                    self.database.remove(self.lsas.pop(index))
+                new = adv if adv.ls_age < MAX_AGE else None
+                if new:
+                    self.lsas[index] = new
+                    self.database.add(new)
+                    installed += 1
+                self._mark_stale(index, old, new)
+            self.stats.count("lsas_installed", installed)
+
+    def _mark_stale(self,
+                    index: int,
+                    old: Optional[LinkStateAdvertisement],
+                    new: Optional[LinkStateAdvertisement]) -> None:
+        """
+        Mark the routers, whose routing tables change, when the advertisement
+        of a router changes from `old` to `new`.
+
+        A router appearing on or leaving the graph changes every routing
+        table. Any other change only matters to the routers reaching the
+        advertising router, and only through the links, whose old cost lies
+        on a shortest path, or whose new cost makes one at least as short as
+        the current one. Every other link is longer than the shortest path
+        before and after the change, so the shortest paths and their next
+        hops stay the same. Changes of stub networks, as well as loop-free
+        alternates, which depend on the paths of the neighbors, mark every
+        router reaching the advertising router.
+        """
+        if old is None or new is None:
+            if old is not new:
+                self.stale.update(self.routers)
+            return
+        other = self.lfa or _stubs(old) != _stubs(new)
+        services = {tos for body in old.bodies + new.bodies
+                    for tos in body.tos_and_metric}
+        changes: Dict[int, List[Tuple[int, Optional[int], Optional[int]]]] =\
+            dict()
+        for r, router in self.routers.items():
+            if r in self.stale:
+                continue
+            rt = router.get_rt()
+            values = rt.tos_values()
+            if r == index or not services.issubset(values):
+                self.stale.add(r)
+                continue
+            for tos in values:
+                start = _distance(rt, index, tos)
+                if start is None:
+                    break
+                if other:
+                    self.stale.add(r)
+                    break
+                if tos not in changes:
+                    changes[tos] = _changed_links(old, new, tos)
+                if any(b != r and _shorter(start, before, after,
+                                           _distance(rt, b, tos))
+                       for b, before, after in changes[tos]):
+                    self.stale.add(r)
+                    break
+
+    def compute(self) -> None:
+        """
+        Compute the routing tables of the stale routers.
+        """
+        for index in self.stale:
+            self.routers[index].init_rt()
+        self.stale = set()
+
+    def tick(self) -> None:
+        """
+        Move the simulated time forward by a second, collecting the changes
+        of neighbor states until `take_events()`.
+        """
+        if self.events is None:
+            self.events = []
+        with self.stats.timer("hello"):
+            self.wheel.advance(1)
+
+    def take_events(self) -> List[NeighborEvent]:
+        """
+        Return the changes of neighbor states collected since the first tick
+        and stop collecting them.
+        """
+        events, self.events = self.events or [], None
+        return events
+
+    def take_hellos(self) -> List[Hello]:
+        """
+        Return the Hello messages to routers of other partitions sent so far.
+        """
+        hellos, self.hellos = self.hellos, []
+        return hellos
+
+    def _deliver(self, index: int, hello: HelloMessage) -> None:
+        """
+        Send a Hello message of a router over all of its links, see
+        `Network._deliver()`.
+        """
+        for b in self.links.get(index, ()):
+            self._send(b, hello)
+
+    def _send(self, index: int, hello: HelloMessage) -> None:
+        router = self.routers.get(index)
+        if router:
+            router.add_neighbor(hello)
+        else:
+            self.hellos.append((index, hello))
+
+    def _neighbor_changed(self, router: Router, n: Neighbor) -> None:
+        if self.events is not None:
+            self.events.append((router.index, n.router_id, n.state))
+
+
+def _stubs(adv: LinkStateAdvertisement) -> List[RLABody]:
+    return [body for body in adv.bodies if body.type == LinkType.STUB]
+
+
+def _changed_links(old: LinkStateAdvertisement,
+                   new: LinkStateAdvertisement,
+                   tos: int) -> List[Tuple[int, Optional[int], Optional[int]]]:
+    """
+    Return the links, whose cost of a type of service differs between two
+    advertisements of a router, as the index of the router they point to,
+    the old cost and the new one, None if the link is missing.
+    """
+    before = {body.link_data: body.metric(tos) for body in old.bodies
+              if body.type != LinkType.STUB}
+    after = {body.link_data: body.metric(tos) for body in new.bodies
+             if body.type != LinkType.STUB}
+    return [(b, before.get(b), after.get(b))
+            for b in before.keys() | after.keys()
+            if before.get(b) != after.get(b)]
+
+
+def _shorter(start: int,
+             before: Optional[int],
+             after: Optional[int],
+             end: Optional[int]) -> bool:
+    """
+    Tell whether a changed link from a router `start` away to a router `end`
+    away(None if unreachable) lay on a shortest path, or lies on one now.
+    """
+    if before is not None and start + before == end:
+        return True
+    return after is not None and (end is None or start + after <= end)
+
+
+def _distance(rt: RoutingTable, index: int, tos: int) -> Optional[int]:
+    entry = rt.get_entry(index, tos)
+    return entry.cost if entry else None
+
+
+def _worker(inbox: RingBuffer,
+            outbox: RingBuffer,
+            lfa: bool,
+            collect_stats: bool) -> None:
+    """
+    Main loop of a worker process, it serves the messages of the
+    coordinator until told to stop.
+
+    :inbox: messages from the coordinator.
+    :outbox: replies to the coordinator.
+    :lfa: whether the routing tables include loop-free alternates.
+    :collect_stats: whether statistics are collected.
+    """
+    part = _Partition(lfa, collect_stats)
+    while True:
+        message = inbox.recv()
+        kind = message[0]
+        if kind == "routers":
+            part.add_routers(message[1])
+        elif kind == "remove":
+            part.remove_routers(message[1])
+        elif kind == "links":
+            part.set_links(message[1])
+        elif kind == "stubs":
+            part.set_stubs(message[1])
+        elif kind == "forget":
+            part.forget(message[1])
+        elif kind == "hellos":
+            part.hear(message[1])
+        elif kind == "sent":
+            outbox.send(("sent", part.take_hellos()))
+        elif kind == "originate":
+            outbox.send(("originated", part.originate()))
+        elif kind == "lsu":
+            part.install(message[1].advertisements)
+        elif kind == "step":
+            part.compute()
+            outbox.send(("done", part.stats))
+            part.stats.reset()
+        elif kind == "tick":
+            part.tick()
+            outbox.send(("ticked", part.take_hellos()))
+        elif kind == "events":
+            outbox.send(("events", part.take_events()))
+        elif kind == "table":
+            router = part.routers.get(message[1])
+            outbox.send(("table", router.get_rt() if router else None))
+        elif kind == "stats":
+            part.stats.enabled = message[1]
+        elif kind == "stop":
+            return
+
+
+class PartitionedNetwork:
+    """
+    A network, whose routers are kept and computed by several worker
+    processes, see the module documentation. Routers, links and stub
+    networks are added, removed and changed just like on a `Network`, the
+    changes reach the workers with the next `tick()` or `step()`. The worker
+    processes are started then, `close()` stops them.
+
+    The coordinator keeps no routers, so there is no `run()` and nothing else
+    computed from the routers of a `Network`, like paths.
+
+    ---
+    Attributes:
+    ---
+    * parts: int : number of partitions and worker processes.
+    * lfa: bool : whether the routing tables include loop-free alternates of
+      the next hops.
+    * generation: int : topology generation, incremented every time a router
+      or a link is added, removed or changed.
+    * trace: Optional[Trace] : topology changes are recorded into it, see
+      `Network.record()`.
+    * _stats: Stats : timers and counters of the coordinator, summed up with
+      the ones the workers report every step.
+    * _now: int : simulated time in seconds.
+    * _routers: Dict[int, RouterInfo] : settings of every router, keyed by
+      its index.
+    * _links: Dict[int, Dict[int, RLABody]] : bodies of the links every
+      router advertises, keyed by the index of the router they point to.
+    * _stubs: Dict[int, Dict[Tuple[int, int], RLABody]] : bodies of the stub
+      networks every router advertises, keyed by address and mask.
+    * _owner: Dict[int, int] : partition of every router, keyed by its index.
+    * _load: List[int] : number of routers in every partition.
+    * _pending: List[List[tuple]] : changes not sent to every worker yet.
+    * _computed: int : generation the routing tables were last computed for,
+      -1 if never.
+    * _ring_size: int : size of each ring buffer in bytes.
+    * _inboxes: List[RingBuffer] : messages to every worker.
+    * _outboxes: List[RingBuffer] : replies from every worker.
+    * _workers: List[Process] : the worker processes, empty until started.
+    """
+    def __init__(self,
+                 parts: Optional[int] = None,
+                 ring_size: int = RING_SIZE,
+                 collect_stats: bool = False,
+                 lfa: bool = False) -> None:
+        """
+        Create a new partitioned network.
+
+        :parts: number of worker processes, one per CPU if None.
+        :ring_size: size of each ring buffer in bytes.
+        :collect_stats: whether statistics are collected, see `stats()`.
+        :lfa: whether the routing tables include loop-free alternates.
+        """
+        self.parts: int = max(1, parts or multiprocessing.cpu_count())
+        self.lfa: bool = lfa
+        self.generation: int = 0
+        self.trace: Optional["Trace"] = None
+        self._stats: Stats = Stats(collect_stats)
+        self._now: int = 0
+        self._routers: Dict[int, RouterInfo] = dict()
+        self._links: Dict[int, Dict[int, RLABody]] = dict()
+        self._stubs: Dict[int, Dict[Tuple[int, int], RLABody]] = dict()
+        self._owner: Dict[int, int] = dict()
+        self._load: List[int] = [0] * self.parts
+        self._pending: List[List[tuple]] = [[] for _ in range(self.parts)]
+        self._computed: int = -1
+        self._ring_size: int = ring_size
+        self._inboxes: List[RingBuffer] = []
+        self._outboxes: List[RingBuffer] = []
+        self._workers: List[Any] = []
+
+    def __enter__(self) -> "PartitionedNetwork":
+        return self
+
+    def __exit__(self, *_) -> bool:
+        self.close()
+        return False
+
+    def __del__(self) -> None:
+        if hasattr(self, "_workers"):
+            self.close()
+
+    def _queue(self, index: int, kind: str, item: Any) -> None:
+        """
+        Queue a change for the worker owning a router, changes of the same
+        kind following each other are sent in a single message.
+        """
+        pending = self._pending[self._owner[index]]
+        if pending and pending[-1][0] == kind:
+            pending[-1][1].append(item)
+        else:
+            pending.append((kind, [item]))
+
+    @timed("ingest")
+    def add_routers(self, input: List[RouterInfo]) -> None:
+        """
+        Add routers just like `Network.add_routers()`, every new router goes
+        to the partition with the fewest routers.
+        """
+        if not input:
+            return
+        for info in input:
+            check_priority(info[2])
+        for index, id, priority, ma in input:
+            if index not in self._owner:
+                part = min(range(self.parts), key=self._load.__getitem__)
+                self._owner[index] = part
+                self._load[part] += 1
+            self._routers[index] = (index, id, priority, ma)
+            self._record("router_join", index, id, priority, int(ma))
+            self._queue(index, "routers", (index, id, priority, ma))
+        self.generation += 1
+
+    def remove_router(self, index: int) -> None:
+        """
+        Remove a router just like `Network.remove_router()`.
+        """
+        info = self._routers.pop(index, None)
+        if not info:
+            return
+        self._record("router_leave", index)
+        neighbors = set(self._links.pop(index, {}))
+        for a, links in self._links.items():
+            if links.pop(index, None):
+                neighbors.add(a)
+                self._queue(a, "links", (a, index, None))
+        for b in neighbors:
+            if b in self._routers:
+                self._queue(b, "forget", (b, info[1]))
+        self._stubs.pop(index, None)
+        self._queue(index, "remove", index)
+        self._load[self._owner.pop(index)] -= 1
+        self.generation += 1
+
+    @timed("ingest")
+    def add_links(self, input: List[Tuple]) -> None:
+        """
+        Add links just like `Network.add_links()`.
+        """
+        for link in input:
+            check_cost(link[2])
+            for metric in (link[3] or {}).values() if len(link) > 3 else ():
+                check_cost(metric)
+        changed = False
+        for link in input:
+            a, b, cost = link[:3]
+            metrics = tos_metrics(link[3] if len(link) > 3 else None)
+            if a not in self._routers or b not in self._routers or\
+                    metrics is None:
+                continue
+            self._record("link_up", a, b, cost, metrics=metrics)
+            body = RLABody(self._routers[b][1], b, len(metrics), cost, metrics)
+            self._links.setdefault(a, {})[b] = body
+            self._queue(a, "links", (a, b, body))
+            changed = True
+        if changed:
+            self.generation += 1
+
+    def remove_link(self, a: int, b: int) -> None:
+        """
+        Remove a link just like `Network.remove_link()`.
+        """
+        if b not in self._links.get(a, {}):
+            return
+        del self._links[a][b]
+        self._record("link_down", a, b)
+        self._queue(a, "links", (a, b, None))
+        if b in self._routers:
+            self._queue(b, "forget", (b, self._routers[a][1]))
+        self.generation += 1
+
+    def update_cost(self, a: int, b: int, cost: int, tos: int = 0) -> None:
+        """
+        Change the cost of a link just like `Network.update_cost()`.
+        """
+        check_cost(cost)
+        body = self._links.get(a, {}).get(b)
+        if not body or b not in self._routers:
+            return
+        changed = changed_cost(body, cost, tos)
+        if changed is None:
+            return
+        self._record("cost", a, b, cost, tos)
+        body = RLABody(self._routers[b][1], b, len(changed[1]), *changed)
+        self._links[a][b] = body
+        self._queue(a, "links", (a, b, body))
+        self.generation += 1
+
+    @timed("ingest")
+    def add_stubs(self, input: List[Tuple]) -> None:
+        """
+        Add stub networks just like `Network.add_stubs()`.
+        """
+        for stub in input:
+            check_cost(stub[3])
+            for metric in (stub[4] or {}).values() if len(stub) > 4 else ():
+                check_cost(metric)
+        changed = False
+        for stub in input:
+            index, network, mask, cost = stub[:4]
+            metrics = tos_metrics(stub[4] if len(stub) > 4 else None)
+            if index not in self._routers or metrics is None or\
+                    not contiguous_mask(mask):
+                continue
+            network &= mask
+            self._record("stub_up", index, network, mask, cost,
+                         metrics=metrics)
+            body = RLABody(network, mask, len(metrics), cost, metrics,
+                           LinkType.STUB)
+            self._stubs.setdefault(index, {})[(network, mask)] = body
+            self._queue(index, "stubs", (index, (network, mask), body))
+            changed = True
+        if changed:
+            self.generation += 1
+
+    def remove_stub(self, index: int, network: int, mask: int) -> None:
+        """
+        Stop advertising a stub network just like `Network.remove_stub()`.
+        """
+        key = (network & mask, mask)
+        if self._stubs.get(index, {}).pop(key, None):
+            self._record("stub_down", index, *key)
+            self._queue(index, "stubs", (index, key, None))
+            self.generation += 1
+
+    def links(self, tos: int = 0) -> Dict[Tuple[int, int], int]:
+        """
+        Return the cost of every link, see `Network.links()`.
+        """
+        return {(a, b): body.metric(tos)
+                for a, links in self._links.items()
+                for b, body in links.items()}
+
+    def stubs(self, tos: int = 0) -> Dict[Tuple[int, int, int], int]:
+        """
+        Return the cost of every stub network, see `Network.stubs()`.
+        """
+        return {(index, network, mask): body.metric(tos)
+                for index, networks in self._stubs.items()
+                for (network, mask), body in networks.items()}
+
+    def record(self, trace: Optional["Trace"] = None) -> "Trace":
+        """
+        Start recording every change of the topology into a trace, see
+        `Network.record()`.
+        """
+        from .trace import Trace
+
+        self.trace = trace if trace is not None else Trace()
+        for index, id, priority, ma in self._routers.values():
+            self._record("router_join", index, id, priority, int(ma))
+        for a, links in self._links.items():
+            for b, body in links.items():
+                self._record("link_up", a, b, body.tos_zero,
+                             metrics=body.tos_and_metric)
+        for index, networks in self._stubs.items():
+            for (network, mask), body in networks.items():
+                self._record("stub_up", index, network, mask, body.tos_zero,
+                             metrics=body.tos_and_metric)
+        return self.trace
+
+    def _record(self,
+                kind: str,
+                *args: int,
+                metrics: Optional[Dict[int, int]] = None) -> None:
+        if self.trace is not None:
+            self.trace.record(self._now, kind, *args, metrics=metrics)
+
+    @property
+    def now(self) -> int:
+        """
+        Simulated time in seconds.
+        """
+        return self._now
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Return the timers and counters of the coordinator, summed up with the
+        ones of all workers up to the last step.
+        """
+        return self._stats.as_dict()
+
+    def enable_stats(self, enabled: bool = True) -> None:
+        """
+        Turn the collection of statistics on or off for the coordinator and
+        every worker.
+        """
+        self._stats.enabled = enabled
+        for part in range(len(self._inboxes)):
+            self._send(part, ("stats", enabled))
+
+    def _start_workers(self) -> None:
+        """
+        Start the worker processes, unless they are running already. The
+        routers, which were added before, reach them with the next flush.
+        """
+        if self._workers:
+            return
+        ctx = multiprocessing.get_context()
+        for _ in range(self.parts):
+            inbox = RingBuffer(ctx, self._ring_size)
+            outbox = RingBuffer(ctx, self._ring_size)
+            worker = ctx.Process(target=_worker,
+                                 args=(inbox,
+                                       outbox,
+                                       self.lfa,
+                                       self._stats.enabled),
+                                 daemon=True)
+            worker.start()
+            self._inboxes.append(inbox)
+            self._outboxes.append(outbox)
+            self._workers.append(worker)
+
+    def _send(self, part: int, message: tuple) -> None:
+        """
+        Send a message to a worker, waiting while its ring is full. Raises
+        BrokenPipeError, if the worker stopped.
+        """
+        self._inboxes[part].send(message, alive=self._workers[part].is_alive)
+
+    def _receive(self, part: int) -> tuple:
+        """
+        Wait for the reply of a worker. Raises BrokenPipeError, if the worker
+        stopped.
+        """
+        alive = self._workers[part].is_alive
+        while True:
+            reply = self._outboxes[part].recv(timeout=1.0, alive=alive)
+            if reply is not None:
+                return reply
+            if not alive():
+                raise BrokenPipeError(f"The worker of partition {part} "
+                                      f"stopped.")
+
+    def _ask(self, message: tuple) -> List[tuple]:
+        """
+        Send a message to every worker and return their replies.
+        """
+        for part in range(self.parts):
+            self._send(part, message)
+        return [self._receive(part) for part in range(self.parts)]
+
+    def _flush(self) -> None:
+        """
+        Start the workers and send them the changes made since the last
+        flush. The first Hello messages over new links to routers of other
+        partitions are passed on right away.
+        """
+        self._start_workers()
+        sent = False
+        for part in range(self.parts):
+            for message in self._pending[part]:
+                self._send(part, message)
+                sent = True
+            self._pending[part] = []
+        if sent:
+            self._route([reply[1] for reply in self._ask(("sent",))])
+
+    def _route(self, hellos: List[List[Hello]]) -> None:
+        """
+        Pass the Hello messages sent by every worker on to the workers owning
+        the routers they are sent to.
+        """
+        incoming: List[List[Hello]] = [[] for _ in range(self.parts)]
+        for sent in hellos:
+            for index, hello in sent:
+                part = self._owner.get(index)
+                if part is not None:
+                    incoming[part].append((index, hello))
+        for part, received in enumerate(incoming):
+            if received:
+                self._send(part, ("hellos", received))
+
+    def compute_tables(self) -> None:
+        """
+        Bring the routing tables of all routers up to date with the current
+        generation. Every worker originates the advertisements of its changed
+        routers, receives the ones of the other workers and computes the
+        routing tables they change, in parallel. Raises BrokenPipeError, if a
+        worker stopped.
+        """
+        if self._computed == self.generation:
+            return
+        self._flush()
+        originated = [reply[1] for reply in self._ask(("originate",))]
+        for part in range(self.parts):
+            advs = [adv for other, lsas in enumerate(originated)
+                    if other != part for adv in lsas]
+            if advs:
+                self._send(part, ("lsu", LSUpdate(2,
+                                                  MessageType.LSU.value,
+                                                  0,
+                                                  0,
+                                                  0,
+                                                  0,
+                                                  0,
+                                                  0,
+                                                  len(advs),
+                                                  advs)))
+        for reply in self._ask(("step",)):
+            self._stats.merge(reply[1])
+        self._computed = self.generation
+
+    def tick(self, seconds: int = 1) -> List[NeighborEvent]:
+        """
+        Move the simulated time forward, see `Network.tick()`. The workers
+        move on one second at a time, Hello messages to routers of other
+        partitions arrive at the end of the second they were sent in. The
+        first Hello messages over new links between partitions are all sent
+        before any of them is heard, so such neighbors may go through the
+        Init and 2-Way states with the first tick, where on a `Network` they
+        would become full right away. Raises BrokenPipeError, if a worker
+        stopped.
+
+        :seconds: number of seconds to move forward.
+        """
+        self._flush()
+        for _ in range(seconds):
+            self._route([reply[1] for reply in self._ask(("tick",))])
+            self._now += 1
+        return [event for reply in self._ask(("events",))
+                for event in reply[1]]
+
+    def step(self, seconds: int = 1) -> List[NeighborEvent]:
+        """
+        Move the simulated time forward, see `tick()`, and then bring the
+        routing tables of all routers up to date. Returns every change of a
+        neighbor's state on the way.
+
+        :seconds: number of seconds to move forward.
+        """
+        events = self.tick(seconds) if seconds else []
+        self.compute_tables()
+        return events
+
+    def routing_table(self,
+                      index: int,
+                      tos: int = 0) -> Optional[RoutingTable]:
+        """
+        Return the up to date routing table of a router, as computed by the
+        worker owning it, None if there is no router with the given index.
+
+        :index: unique index of the router.
+        :tos: type of service, whose routing table is returned.
+        """
+        part = self._owner.get(index)
+        if part is None:
+            return None
+        self.compute_tables()
+        self._send(part, ("table", index))
+        rt = self._receive(part)[1]
+        return rt.for_tos(tos) if rt is not None else None
+
+    def close(self) -> None:
+        """
+        Stop the worker processes and free the ring buffers. Workers, which
+        do not stop in time, are terminated, the ring buffers are freed even
+        if workers died. The workers are started again by the next tick or
+        step, with the whole topology.
+        """
+        try:
+            for inbox, worker in zip(self._inboxes, self._workers):
+                try:
+                    inbox.send(("stop",), timeout=1.0, alive=worker.is_alive)
+                except (BrokenPipeError, TimeoutError):
+                    pass
+            for worker in self._workers:
+                worker.join(timeout=1.0)
+                if worker.is_alive():
+                    worker.terminate()
+                    worker.join()
+        finally:
+            for ring in self._inboxes + self._outboxes:
+                ring.close()
+        if not self._workers:
+            return
+        self._inboxes, self._outboxes, self._workers = [], [], []
+        self._pending = [[] for _ in range(self.parts)]
+        for index, info in self._routers.items():
+            self._queue(index, "routers", info)
+        for a, links in self._links.items():
+            for b, body in links.items():
+                self._queue(a, "links", (a, b, body))
+        for index, networks in self._stubs.items():
+            for key, body in networks.items():
+                self._queue(index, "stubs", (index, key, body))
+        self._computed = -1
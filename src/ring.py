@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+
+import os
+import pickle
+import struct
+from multiprocessing.context import BaseContext
+from multiprocessing.shared_memory import SharedMemory
+from time import monotonic, sleep
+from typing import Any, Callable, Optional
+
+from .constants import RING_SIZE
+
+
+_COUNTERS = struct.Struct("<QQ")
+_FRAME = struct.Struct("<I")
+_MORE = 1 << 31
+_CHECK = 0.1
+
+
+class RingBuffer:
+    """
+    Ring buffer of messages in shared memory, written by a single process
+    and read by a single other one.
+
+    The memory starts with two counters, the number of bytes ever written,
+    only updated by the writer, and the number of bytes ever read, only
+    updated by the reader, followed by the ring itself. Messages are split
+    into length prefixed frames, small enough for several of them to fit
+    into the ring, so a message of any size can be passed through it. A
+    semaphore counts the frames waiting to be read, the reader blocks on it
+    instead of polling the memory.
+
+    A writer waits while the ring is full, a reader while a message is only
+    partly written. Both can be given a callback telling whether the other
+    side is still alive, so a dead process raises BrokenPipeError instead
+    of blocking forever.
+
+    ---
+    Attributes:
+    ---
+    * _shm: SharedMemory : the shared memory.
+    * _frames: Semaphore : number of frames waiting to be read.
+    * _capacity: int : size of the ring in bytes.
+    * _owner: bool : whether this process created the memory and has to free
+      it.
+    * _pid: int : process, which created or attached to the memory. A forked
+      child inherits the object, but never frees the memory.
+    * _closed: bool : whether the memory was detached from already.
+    """
+    def __init__(self,
+                 ctx: Optional[BaseContext],
+                 size: int = RING_SIZE,
+                 name: Optional[str] = None,
+                 frames: Any = None) -> None:
+        """
+        Create a new ring buffer or attach to an existing one.
+
+        :ctx: multiprocessing context the semaphore is created with, only
+              needed to create a new ring buffer.
+        :size: size of the shared memory in bytes.
+        :name: name of the shared memory to attach to, None to create it.
+        :frames: semaphore of the ring buffer attached to.
+        """
+        self._owner: bool = name is None
+        self._shm: SharedMemory = SharedMemory(name, self._owner, size)
+        self._pid: int = os.getpid()
+        self._closed: bool = False
+        if self._owner:
+            _COUNTERS.pack_into(self._shm.buf, 0, 0, 0)
+        self._frames = frames if frames is not None\
+            else ctx.Semaphore(0)  # type: ignore
+        self._capacity: int = size - _COUNTERS.size
+
+    def __reduce__(self):
+        return (_attach, (self._shm.name, self._shm.size, self._frames))
+
+    def send(self,
+             message: Any,
+             timeout: Optional[float] = None,
+             alive: Optional[Callable[[], bool]] = None) -> None:
+        """
+        Put a message into the ring, waiting while it is full, see `put()`.
+        """
+        self.put(pickle.dumps(message, pickle.HIGHEST_PROTOCOL), timeout, alive)
+
+    def recv(self,
+             timeout: Optional[float] = None,
+             alive: Optional[Callable[[], bool]] = None) -> Any:
+        """
+        Take the next message out of the ring, None if none arrives within
+        the timeout, see `get()`.
+        """
+        data = self.get(timeout, alive)
+        return pickle.loads(data) if data is not None else None
+
+    def put(self,
+            data: bytes,
+            timeout: Optional[float] = None,
+            alive: Optional[Callable[[], bool]] = None) -> None:
+        """
+        Put raw bytes into the ring, waiting while it is full. Raises
+        TimeoutError if the ring stays full for longer than the timeout and
+        BrokenPipeError once the reader is not alive anymore, or the ring is
+        closed.
+
+        :timeout: seconds to wait for room in the ring, forever if None.
+        :alive: tells whether the reader is still alive.
+        """
+        if self._closed:
+            raise BrokenPipeError("The ring buffer is closed.")
+        deadline = monotonic() + timeout if timeout is not None else None
+        limit = self._capacity // 4 - _FRAME.size
+        view = memoryview(data)
+        for start in range(0, max(len(view), 1), limit):
+            chunk = view[start:start + limit]
+            more = _MORE if start + limit < len(view) else 0
+            self._write(_FRAME.pack(len(chunk) | more) + chunk,
+                        deadline,
+                        alive)
+
+    def get(self,
+            timeout: Optional[float] = None,
+            alive: Optional[Callable[[], bool]] = None) -> Optional[bytes]:
+        """
+        Take the next raw bytes out of the ring, None if none arrive within
+        the timeout. Raises BrokenPipeError, if the writer stops being alive
+        in the middle of a message.
+
+        :timeout: seconds to wait, forever if None.
+        :alive: tells whether the writer is still alive.
+        """
+        if not self._frames.acquire(timeout=timeout):
+            return None
+        chunks = []
+        while True:
+            (head,) = _FRAME.unpack(self._read(_FRAME.size))
+            chunks.append(self._read(head & ~_MORE))
+            if not head & _MORE:
+                return b"".join(chunks)
+            # the rest of the message is on its way
+            while not self._frames.acquire(timeout=_CHECK if alive else None):
+                if not alive():  # type: ignore
+                    raise BrokenPipeError("The writer of the ring buffer "
+                                          "stopped in the middle of a "
+                                          "message.")
+
+    def _write(self,
+               frame: bytes,
+               deadline: Optional[float],
+               alive: Optional[Callable[[], bool]]) -> None:
+        buf = self._shm.buf
+        delay = 0.0001
+        while True:
+            written, read = _COUNTERS.unpack_from(buf, 0)
+            if self._capacity - (written - read) >= len(frame):
+                break
+            if alive is not None and not alive():
+                raise BrokenPipeError("The reader of the ring buffer stopped.")
+            if deadline is not None and monotonic() >= deadline:
+                raise TimeoutError("The ring buffer stayed full.")
+            sleep(delay)
+            delay = min(delay * 2, 0.01)
+        pos = written % self._capacity
+        first = min(len(frame), self._capacity - pos)
+        base = _COUNTERS.size
+        buf[base + pos:base + pos + first] = frame[:first]
+        buf[base:base + len(frame) - first] = frame[first:]
+        struct.pack_into("<Q", buf, 0, written + len(frame))
+        self._frames.release()
+
+    def _read(self, size: int) -> bytes:
+        buf = self._shm.buf
+        (read,) = struct.unpack_from("<Q", buf, 8)
+        pos = read % self._capacity
+        first = min(size, self._capacity - pos)
+        base = _COUNTERS.size
+        data = bytes(buf[base + pos:base + pos + first]) +\
+            bytes(buf[base:base + size - first])
+        struct.pack_into("<Q", buf, 8, read + size)
+        return data
+
+    def close(self) -> None:
+        """
+        Detach from the shared memory, freeing it if this process created it.
+        The memory is freed, even if the other side died without closing it.
+        Closing again does nothing.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._shm.close()
+        if self._owner and self._pid == os.getpid():
+            self._shm.unlink()
+
+    def __del__(self) -> None:
+        if hasattr(self, "_closed"):
+            self.close()
+
+
+def _attach(name: str, size: int, frames: Any) -> RingBuffer:
+    return RingBuffer(None, size, name, frames)
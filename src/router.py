@@ -1,10 +1,14 @@
-from typing import List, Optional
+from typing import Any, Callable, Dict, List, Optional, Set
 
+from .constants import DEAD_INTERVAL, HELLO_INTERVAL
 from .db import LinkStateDatabase
 from .ip import IpAddress
 from .rt import RoutingTable, RTEntry
 from .message import HelloMessage
 from .link_state import LinkStateAdvertisement
+from .neighbor import Neighbor, NeighborState
+from .stats import Stats
+from .timer import Timer, TimerWheel
 
 class Router:
     """
@@ -20,26 +24,63 @@ class Router:
       router can never become a DR or a BDR. The higher the value, the higher
       the chance of a router becoming a DR or a BDR.
     * _database: LinkStateDatabase : each router has it's own link state
-      database. For more information about how they work, please consult their
-      documentation on in `db.py`.
+      database, which shares the advertisements with the other routers of
+      the area, while they are in sync. For more information about how they
+      work, please consult their documentation on in `db.py`.
     * _routing_table: RoutingTable : each router also has a routing table,
       where all the routing information and best paths to every other part
       of the network is located. For more information about a Routing Table,
       please consult the documentation in the `rt.py`.
-    * _neighbors: List[int] : list of router IDs of its neighboring routers.
+    * _neighbors: Dict[int, Neighbor] : neighboring routers keyed by their
+      router IDs, for more information, please consult `neighbor.py`.
     * _dr: bool : indicates if the routers has been elected as a DR
     * _bdr: bool : indicates if the routers has been elected as a BDR
     * _ma: bool : indicates if the router is connected to a switch, if it has
       multi-access capability. Only routers that have multi-access capability
       can be considered election candidates for the DR and BDR election.
+    * _stats: Stats : timers and counters of this router's graph build and
+      SPF runs, see `stats.py`.
+    * lfa: bool : whether the routing table includes loop-free alternates of
+      the next hops.
+    * _failover: bool : whether packets are sent to the loop-free alternate,
+      when the link to the next hop is down, instead of being dropped until
+      the routing table is computed again.
+    * _down: Set[int] : indexes of the neighbors, whose links are down.
+    * hello_interval: int : seconds between two Hello messages.
+    * dead_interval: int : seconds without a Hello message, after which a
+      neighbor is declared down.
+    * _wheel: Optional[TimerWheel] : timer wheel driving the Hello messages
+      and the neighbor timers, None while the timers are stopped.
+    * _hello: Optional[Timer] : fires, when the next Hello message is due.
+    * _send: Optional[Callable[[HelloMessage], None]] : sends a Hello message
+      to the neighbors.
+    * on_neighbor_change: Optional[Callable[[Router, Neighbor], None]] : called
+      every time the state of a neighbor changes.
     """
-    def __init__(self, id: IpAddress, index: int, priority: int, ma: bool) -> None:
+    def __init__(self,
+                 id: IpAddress,
+                 index: int,
+                 priority: int,
+                 ma: bool,
+                 stats: Optional[Stats] = None,
+                 lfa: bool = False) -> None:
         self._database: LinkStateDatabase = LinkStateDatabase(index)
         self._routing_table: RoutingTable = RoutingTable()
-        self._neighbors: List[int] = list()
+        self._neighbors: Dict[int, Neighbor] = dict()
         self._dr: bool = False
         self._bdr: bool = False
         self._ma: bool = ma
+        self._stats: Stats = stats if stats else Stats()
+        self._failover: bool = False
+        self._down: Set[int] = set()
+        self.lfa: bool = lfa
+        self.hello_interval: int = HELLO_INTERVAL
+        self.dead_interval: int = DEAD_INTERVAL
+        self._wheel: Optional[TimerWheel] = None
+        self._hello: Optional[Timer] = None
+        self._send: Optional[Callable[[HelloMessage], None]] = None
+        self.on_neighbor_change: Optional[Callable[["Router", Neighbor],
+                                                   None]] = None
 
         self.index: int = index
         self.id: IpAddress = id
@@ -47,22 +88,110 @@ class Router:
 
     def add_neighbor(self, r: HelloMessage) -> None:
         """
-        Add a new number from a parsed Hello message.
+        Handle a Hello message received from a neighbor(RFC 2328, section
+        10.5). A new neighbor is learned from its first Hello message, the
+        conversation becomes two-way, once the neighbor lists this router in
+        its Hello messages. Hello messages with different intervals than
+        ours are dropped.
         """
-        if not r.router_id in self._neighbors:
-            self._neighbors.append(r.router_id)
+        if r.hello_interval != self.hello_interval or\
+                r.router_dead_interval != self.dead_interval:
+            self._stats.count("hellos_dropped")
+            return
+        n = self._neighbors.get(r.router_id)
+        if n is None:
+            n = Neighbor(r.router_id, r.priority)
+            self._neighbors[r.router_id] = n
+        n.priority, n.dr, n.bdr = r.priority, r.dr, r.bdr
+        if n.state == NeighborState.DOWN:
+            self._set_state(n, NeighborState.INIT)
+        if self._wheel:
+            # the timer is not moved with every Hello message, once it fires,
+            # it is set again for the rest of the dead interval instead
+            n.heard = self._wheel.now
+            if n.inactivity is None:
+                n.inactivity = self._wheel.schedule(self.dead_interval,
+                                                    self._inactive,
+                                                    n)
+
+        if self.id.get() in r.neighbors:
+            if n.state == NeighborState.INIT:
+                self._two_way(n)
+        elif n.state >= NeighborState.TWO_WAY:
+            # the neighbor forgot about us, the adjacency is torn down
+            if self._wheel:
+                self._wheel.cancel(n.exchange)
+            n.exchange = None
+            self._set_state(n, NeighborState.INIT)
+
+    def _two_way(self, n: Neighbor) -> None:
+        """
+        Move to two-way communication with a neighbor and start forming an
+        adjacency, if the two routers should be adjacent. On a multi-access
+        network, only the DR and the BDR become adjacent to the others.
+        """
+        self._set_state(n, NeighborState.TWO_WAY)
+        if self._ma and not (self._dr or self._bdr) and\
+                n.router_id not in (n.dr, n.bdr):
+            return
+        self._set_state(n, NeighborState.EXSTART)
+        if self._wheel:
+            # the database exchange takes a tick
+            n.exchange = self._wheel.schedule(1, self._full, n)
+        else:
+            self._full(n)
+
+    def _full(self, n: Neighbor) -> None:
+        n.exchange = None
+        if n.state == NeighborState.EXSTART:
+            self._set_state(n, NeighborState.FULL)
+
+    def _inactive(self, n: Neighbor) -> None:
+        """
+        Declare a neighbor down, no Hello message came from it in time.
+        """
+        n.inactivity = None
+        if self._wheel:
+            left = n.heard + self.dead_interval - self._wheel.now
+            if left > 0:
+                n.inactivity = self._wheel.schedule(left, self._inactive, n)
+                return
+        if self._wheel:
+            self._wheel.cancel(n.exchange)
+        n.exchange = None
+        self._set_state(n, NeighborState.DOWN)
+
+    def _set_state(self, n: Neighbor, state: NeighborState) -> None:
+        n.state = state
+        self._stats.count("neighbor_changes")
+        if self.on_neighbor_change:
+            self.on_neighbor_change(self, n)
 
     def remove_neighbor(self, r: int) -> None:
         """
         Remove a neighbor based on its router ID.
         """
-        for n in self._neighbors:
-            if n == r:
-                self._neighbors.remove(n)
+        n = self._neighbors.pop(r, None)
+        if not n:
+            return
+        if self._wheel:
+            self._wheel.cancel(n.inactivity)
+            self._wheel.cancel(n.exchange)
+        n.inactivity = n.exchange = None
+        if n.state != NeighborState.DOWN:
+            self._set_state(n, NeighborState.DOWN)
+
+    def neighbors(self) -> Dict[int, NeighborState]:
+        """
+        Return the state of every neighbor, keyed by its router ID.
+        """
+        return {id: n.state for id, n in self._neighbors.items()}
 
     def send_hello(self) -> HelloMessage:
         """
-        Create a Hello message describing this router.
+        Create a Hello message describing this router. It lists every
+        neighbor, which a Hello message was received from within the dead
+        interval.
         """
         return HelloMessage(2,
                             1,
@@ -73,18 +202,92 @@ class Router:
                             0,
                             0,
                             0,
+                            self.hello_interval,
                             0,
-                            0,
-                            0,
-                            0,
-                            0,
-                            self._neighbors)
+                            self.priority,
+                            self.dead_interval,
+                            self.id.get() if self._dr else 0,
+                            self.id.get() if self._bdr else 0,
+                            [id for id, n in self._neighbors.items()
+                             if n.state != NeighborState.DOWN])
+
+    def start_timers(self,
+                     wheel: TimerWheel,
+                     send: Callable[[HelloMessage], None]) -> None:
+        """
+        Start sending Hello messages every hello interval and watching the
+        neighbors for their dead interval. The first Hello message is sent
+        within one hello interval, depending on the index of the router, so
+        not all routers send theirs at the same tick.
+
+        :wheel: timer wheel, which drives the timers.
+        :send: sends a Hello message to the neighbors.
+        """
+        self.stop_timers()
+        self._wheel = wheel
+        self._send = send
+        self._hello = wheel.schedule(self.index % self.hello_interval + 1,
+                                     self._send_hello)
+        for n in self._neighbors.values():
+            if n.state != NeighborState.DOWN:
+                n.heard = wheel.now
+                n.inactivity = wheel.schedule(self.dead_interval,
+                                              self._inactive,
+                                              n)
+
+    def stop_timers(self) -> None:
+        """
+        Stop sending Hello messages and stop all neighbor timers.
+        """
+        if not self._wheel:
+            return
+        self._wheel.cancel(self._hello)
+        for n in self._neighbors.values():
+            self._wheel.cancel(n.inactivity)
+            self._wheel.cancel(n.exchange)
+            n.inactivity = n.exchange = None
+        self._wheel = None
+        self._hello = None
+        self._send = None
+
+    def _send_hello(self) -> None:
+        if not self._wheel:
+            return
+        self._hello = self._wheel.schedule(self.hello_interval,
+                                           self._send_hello)
+        if self._send:
+            self._send(self.send_hello())
+        self._stats.count("hellos_sent")
 
     def recieve_advertisements(self, l: List[LinkStateAdvertisement]) -> None:
         """
         Receive and handle any and all incoming link state advertisements.
         """
         [self._database.add(x) for x in l]
+        self._stats.count("lsas_installed", len(l))
+
+    def withdraw_advertisements(self, l: List[LinkStateAdvertisement]) -> None:
+        """
+        Remove withdrawn or outdated link state advertisements from the link
+        state database.
+        """
+        [self._database.remove(x) for x in l]
+
+    def clear_database(self) -> None:
+        """
+        Drop all link state advertisements from the link state database.
+        """
+        self._database = LinkStateDatabase(self.index)
+
+    def share_database(self, db: LinkStateDatabase) -> None:
+        """
+        Bring the link state database in sync with the shared database of the
+        area, dropping all of its own changes. Nothing is copied, the changes
+        flooded into the shared database are seen right away.
+
+        :db: shared database of the area.
+        """
+        self._database = LinkStateDatabase(self.index, db)
 
     def init_rt(self) -> None:
         """
@@ -92,7 +295,36 @@ class Router:
         more information about this procedure, please consult the documentation
         in `db.py`.
         """
-        self._routing_table = self._database.create_routing_table()
+        self.set_rt(self._database.create_routing_table(self._stats, self.lfa))
+
+    def set_rt(self, rt: RoutingTable) -> None:
+        """
+        Replace the routing table with an already computed one.
+        """
+        old = self._routing_table
+        if rt is old:
+            return
+        self._routing_table = rt
+        if self._stats.enabled:
+            self._stats.count("routes_changed", rt.count_changes(old))
+
+    def get_rt(self) -> RoutingTable:
+        """
+        Return the routing table.
+        """
+        return self._routing_table
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Return the timers and counters collected by this router.
+        """
+        return self._stats.as_dict()
+
+    def enable_stats(self, enabled: bool = True) -> None:
+        """
+        Turn the collection of statistics on or off.
+        """
+        self._stats.enabled = enabled
 
     def is_dr(self) -> bool:
         """
@@ -131,10 +363,45 @@ class Router:
         """
         return self._routing_table.get_entries()
 
-    def get_next_for(self, dest: int) -> Optional[int]:
+    def set_failover(self, enabled: bool = True) -> None:
+        """
+        Turn the local failover on or off. With failover on, the loop-free
+        alternate of a next hop is used right away, once the link to the next
+        hop goes down, without computing anything.
+        """
+        self._failover = enabled
+
+    def link_down(self, neighbor: int) -> None:
+        """
+        Mark the link to a neighbor as down.
+
+        :neighbor: index of the neighbor.
         """
-        Return the next hop for a specified destination.
+        self._down.add(neighbor)
+
+    def link_up(self, neighbor: int) -> None:
+        """
+        Mark the link to a neighbor as up again.
+
+        :neighbor: index of the neighbor.
+        """
+        self._down.discard(neighbor)
+
+    def get_next_for(self, dest: int, tos: int = 0) -> Optional[int]:
+        """
+        Return the next hop for a specified destination. If the link to the
+        next hop is down, it is the loop-free alternate in failover mode and
+        None otherwise.
+
+        :dest: index of the destination router.
+        :tos: type of service of the traffic.
         """
-        entries = list(filter(lambda x: x.destination_id == dest, self.get_rt_entries()))
-        if entries:
-            return entries[0].next_hop
+        entry = self._routing_table.get_entry(dest, tos)
+        if not entry:
+            return None
+        if entry.next_hop not in self._down:
+            return entry.next_hop
+        backup = entry.backup_next_hop
+        if self._failover and backup is not None and backup not in self._down:
+            return backup
+        return None
@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 
 from dataclasses import dataclass
-from typing import List
+from itertools import chain
+from typing import Dict, List, Optional, Tuple
 from enum import IntEnum
 from .link_state import LinkStateAdvertisement
 
@@ -25,36 +26,50 @@ class RTEntry:
     ---
     * destination_type: int : the type of the destination this route leads to.
       `ALWAYS 1`
-    * destination_id: int : router ID of the destination router.
-    * network_mask: int : network mask with which a sub net can be derived. 
-      `IGNORE`
+    * destination_id: int : router ID of the destination router, or the
+      network address of a stub network.
+    * network_mask: int : network mask with which a sub net can be derived.
+      Full mask(0xffffffff) for routers.
     * path_type: type of the path, intra-network, inter-network and others.
       `ALWAYS 1`
     * cost: int : total cost of this path.
     * next_hop: int : router ID of the next step in packet's journey.
+    * backup_next_hop: Optional[int] : loop-free alternate(RFC 5286) of the
+      next hop, used when the link to the next hop fails, None if there is
+      none or it was not computed.
     """
     destination_type: int # alwasy going to be 1
-    destination_id: int   # id of the destination router
-    network_mask: int     # ignore
+    destination_id: int   # id of the destination router or network
+    network_mask: int     # full mask for routers
     path_type: int     # this will always be one, since we only simulate paths
                        # within a network
     cost: int          # total cost
     next_hop: int      # id of the "next hop" router
+    backup_next_hop: Optional[int] = None # loop-free alternate
 
     @classmethod
-    def from_lsa(cls, adv: LinkStateAdvertisement, next_hop_id: int) -> "RTEntry":
+    def from_lsa(cls,
+                 adv: LinkStateAdvertisement,
+                 next_hop_id: int,
+                 cost: int) -> "RTEntry":
+        """
+        Create a Router Entry leading to the router advertising a Router-LSA.
+        The Router-LSA lists all links of the router, none of them is the
+        cost of the route, so it has to be given.
+        """
         return RTEntry(1, # always 1
                        adv.advertising_router, # advertising router
                        0xffffffff, # full mask
                        1, # always 1, we simulate paths within a network
-                       adv.bodies[0].tos_zero, # we only use one tos, tos zero
-                                               # as well as each router having
-                                               # only one interface, therefore
-                                               # only one RLABody
-                       next_hop_id)            # TODO
+                       cost,
+                       next_hop_id)
 
     @classmethod
-    def create(cls, dest: int, cost: int, next_hop: int) -> "RTEntry":
+    def create(cls,
+               dest: int,
+               cost: int,
+               next_hop: int,
+               backup: Optional[int] = None) -> "RTEntry":
         """
         Create a new Router Entry given only the necessary information.
         """
@@ -63,26 +78,44 @@ class RTEntry:
                        0xffffffff,
                        1,
                        cost,
-                       next_hop)
+                       next_hop,
+                       backup)
 
 
 class RoutingTable:
     """
     A table or a database of all the best paths within a network.
 
+    Routes to routers and routes to stub networks are kept apart, router
+    entries are keyed by router indexes, network entries by network
+    addresses, so the two could clash.
+
+    The table itself holds the routes of TOS 0, the default type of service.
+    Every other type of service, which some link has a metric for, has its
+    own table, the rest of them are routed just like TOS 0.
+
     ---
     Attributes:
     ---
     * _entries: List[RTEntry] : a list of all router entries
+    * _networks: List[RTEntry] : a list of all stub network entries
+    * _index: Optional[Dict[int, RTEntry]] : router entries keyed by their
+      destination, built on the first lookup.
+    * _tos: Dict[int, RoutingTable] : routing tables of the other types of
+      service, keyed by the type of service.
     """
     def __init__(self):
         self._entries: List[RTEntry] = list()
+        self._networks: List[RTEntry] = list()
+        self._index: Optional[Dict[int, RTEntry]] = None
+        self._tos: Dict[int, RoutingTable] = dict()
 
     def add_entry(self, entry: RTEntry) -> None:
         """
         Add a new entry to the routing table.
         """
         self._entries.append(entry)
+        self._index = None
 
     def get_entries(self) -> List[RTEntry]:
         """
@@ -91,9 +124,79 @@ class RoutingTable:
         """
         return self._entries
 
+    def get_entry(self, dest: int, tos: int = 0) -> Optional[RTEntry]:
+        """
+        Return the entry of a destination router, None if there is none.
+
+        :dest: index of the destination router.
+        :tos: type of service.
+        """
+        if tos:
+            table = self.for_tos(tos)
+            if table is not self:
+                return table.get_entry(dest)
+        if self._index is None:
+            self._index = {e.destination_id: e for e in self.get_entries()}
+        return self._index.get(dest)
+
+    def add_network(self, entry: RTEntry) -> None:
+        """
+        Add a new entry of a stub network to the routing table.
+        """
+        self._networks.append(entry)
+
+    def get_networks(self) -> List[RTEntry]:
+        """
+        Return all entries of stub networks.
+        """
+        return self._networks
+
+    def add_tos_table(self, tos: int, rt: "RoutingTable") -> None:
+        """
+        Add the routing table of a type of service other than TOS 0.
+        """
+        self._tos[tos] = rt
+
+    def for_tos(self, tos: int) -> "RoutingTable":
+        """
+        Return the routing table of a type of service, this table for TOS 0
+        and for types of service no link has a metric for.
+        """
+        return self._tos.get(tos, self) if tos else self
+
+    def tos_values(self) -> List[int]:
+        """
+        Return the types of service, which have their own routing table,
+        including TOS 0.
+        """
+        return [0] + sorted(self._tos)
+
+    def count_changes(self, old: "RoutingTable") -> int:
+        """
+        Count the routes which differ from an older routing table. A route
+        counts as changed when it was added, removed or when its cost or next
+        hop changed, in the table of any type of service.
+
+        :old: the routing table this one replaces.
+        """
+        changed = 0
+        for tos in set(self.tos_values()) | set(old.tos_values()):
+            new, before = self.for_tos(tos), old.for_tos(tos)
+            changed += _count_changes(new.get_entries(), before.get_entries())
+            changed += _count_changes(new.get_networks(), before.get_networks())
+        return changed
+
     def __str__(self) -> str:
-        s = ""
+        return "".join(f"{each}\n" for each in
+                       chain(self.get_entries(), self.get_networks()))
+
 
-        for each in self._entries:
-            s += f"{each}\n"
-        return s
+def _count_changes(new: List[RTEntry], old: List[RTEntry]) -> int:
+    before: Dict[Tuple[int, int], Tuple[int, int]] =\
+        {(e.destination_id, e.network_mask): (e.cost, e.next_hop) for e in old}
+    changed = 0
+    for each in new:
+        route = (each.cost, each.next_hop)
+        if before.pop((each.destination_id, each.network_mask), None) != route:
+            changed += 1
+    return changed + len(before)
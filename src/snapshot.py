@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Snapshots of a whole network, its link state advertisements, routing tables
+and the state of the DR and BDR election.
+
+A snapshot is a little endian binary file made of a header followed by five
+tables of fixed size records:
+
+    header   magic, version, flags, generation, election state, table sizes
+    routers  index, router ID, priority, flags, first RT entry, RT entries
+    lsas     header fields, flags, first body, number of bodies
+    bodies   link ID, link data, tos zero, first TOS metric, TOS metrics, type
+    tos      TOS, metric
+    entries  routing table entries of all routers, one router after another,
+             each tagged with its type of service and whether it leads to
+             a stub network, a backup next hop of -1 stands for none
+
+Because all records have a fixed size, loading only decodes the routers and
+the link state advertisements. Routing tables stay in the memory mapped file
+and each one is decoded the first time it is used.
+"""
+
+import mmap
+import struct
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from .ip import IpAddress
+from .link_state import LinkStateAdvertisement, LinkType, RLABody
+from .net import Network
+from .router import Router
+from .rt import RoutingTable, RTEntry
+from .utils import msg
+
+
+MAGIC = b"2SPF"
+VERSION = 5
+
+_HEADER = struct.Struct("<4sHHQBBxxiiIIIII")
+_ROUTER = struct.Struct("<iIBBxxII")
+_LSA = struct.Struct("<iiiIiiiiBxHI")
+_BODY = struct.Struct("<IqqIIB")
+_TOS = struct.Struct("<iq")
+_ENTRY = struct.Struct("<BBBBqIqii")
+
+_MAPPED_SIZE = 256
+
+_LFA = 1
+_NETWORK = 1
+_MA, _DR, _BDR = 1, 2, 4
+_V, _E, _B = 1, 2, 4
+
+
+class MappedRoutingTable(RoutingTable):
+    """
+    A routing table backed by a memory mapped snapshot. The entries are only
+    decoded, once they are first asked for, along with the routing tables
+    of all types of service.
+
+    ---
+    Attributes:
+    ---
+    * _view: Optional[memoryview] : encoded entries, None once decoded.
+    """
+    def __init__(self, view: memoryview) -> None:
+        super().__init__()
+        self._view: Optional[memoryview] = view
+
+    def _decode(self) -> None:
+        if self._view is None:
+            return
+        tables: Dict[int, RoutingTable] = {0: self}
+        for dt, pt, tos, kind, dest, mask, cost, hop, backup in\
+                _ENTRY.iter_unpack(self._view):
+            table = tables.get(tos)
+            if table is None:
+                table = tables[tos] = RoutingTable()
+                self._tos[tos] = table
+            entry = RTEntry(dt, dest, mask, pt, cost, hop,
+                            backup if backup >= 0 else None)
+            if kind & _NETWORK:
+                table._networks.append(entry)
+            else:
+                table._entries.append(entry)
+        self._view = None
+
+    def add_entry(self, entry: RTEntry) -> None:
+        self._decode()
+        super().add_entry(entry)
+
+    def get_entries(self) -> List[RTEntry]:
+        self._decode()
+        return super().get_entries()
+
+    def add_network(self, entry: RTEntry) -> None:
+        self._decode()
+        super().add_network(entry)
+
+    def get_networks(self) -> List[RTEntry]:
+        self._decode()
+        return super().get_networks()
+
+    def add_tos_table(self, tos: int, rt: RoutingTable) -> None:
+        self._decode()
+        super().add_tos_table(tos, rt)
+
+    def for_tos(self, tos: int) -> RoutingTable:
+        self._decode()
+        return super().for_tos(tos)
+
+    def tos_values(self) -> List[int]:
+        self._decode()
+        return super().tos_values()
+
+
+def _flags(*bits: Tuple[bool, int]) -> int:
+    return sum(bit for on, bit in bits if on)
+
+
+def save(net: Network, path: str) -> None:
+    """
+    Write a snapshot of a network into a file. The routing tables are
+    brought up to date with the current generation first, as they are
+    loaded back as such.
+
+    :net: the network.
+    :path: path of the output file.
+    """
+    routers = list(net._routers.values())
+    lsas = net._advertisements()
+    bodies = [b for lsa in lsas for b in lsa.bodies]
+    n_tos = sum(len(b.tos_and_metric) for b in bodies)
+    tables = [list(_entries(net._update_rt(r))) for r in routers]
+
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC,
+                             VERSION,
+                             _flags((net.lfa, _LFA)),
+                             net.generation,
+                             net.has_dr,
+                             net.has_bdr,
+                             net._dr,
+                             net._bdr,
+                             len(routers),
+                             len(lsas),
+                             len(bodies),
+                             n_tos,
+                             sum(len(t) for t in tables)))
+        _write(f, _routers(routers, tables))
+        _write(f, _lsas(lsas))
+        _write(f, _bodies(bodies))
+        _write(f, (_TOS.pack(tos, metric)
+                   for b in bodies
+                   for tos, metric in b.tos_and_metric.items()))
+        for table in tables:
+            _write(f, (_ENTRY.pack(e.destination_type,
+                                   e.path_type,
+                                   tos,
+                                   kind,
+                                   e.destination_id,
+                                   e.network_mask,
+                                   e.cost,
+                                   e.next_hop,
+                                   -1 if e.backup_next_hop is None
+                                   else e.backup_next_hop)
+                       for tos, kind, e in table))
+
+
+def _entries(rt: RoutingTable) -> Iterator[Tuple[int, int, RTEntry]]:
+    """
+    List the entries of the routing tables of all types of service, along
+    with their type of service and kind.
+    """
+    for tos in rt.tos_values():
+        table = rt.for_tos(tos)
+        for e in table.get_entries():
+            yield tos, 0, e
+        for e in table.get_networks():
+            yield tos, _NETWORK, e
+
+
+def _write(f: BinaryIO, records: Iterator[bytes]) -> None:
+    """
+    Write records in large chunks instead of one by one.
+    """
+    chunk: List[bytes] = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) == 4096:
+            f.write(b"".join(chunk))
+            chunk.clear()
+    f.write(b"".join(chunk))
+
+
+def _routers(routers: List[Router],
+             tables: List[List[Tuple[int, int, RTEntry]]]) -> Iterator[bytes]:
+    first = 0
+    for r, table in zip(routers, tables):
+        yield _ROUTER.pack(r.index,
+                           r.id.get(),
+                           r.priority,
+                           _flags((r.has_ma(), _MA),
+                                  (r.is_dr(), _DR),
+                                  (r.is_bdr(), _BDR)),
+                           first,
+                           len(table))
+        first += len(table)
+
+
+def _lsas(lsas: List[LinkStateAdvertisement]) -> Iterator[bytes]:
+    first = 0
+    for lsa in lsas:
+        yield _LSA.pack(lsa.ls_age,
+                        lsa.options,
+                        lsa.ls_type,
+                        lsa.ls_id,
+                        lsa.advertising_router,
+                        lsa.ls_seq_num,
+                        lsa.ls_checksum,
+                        lsa.length,
+                        _flags((lsa.v_b, _V), (lsa.e_b, _E), (lsa.b_b, _B)),
+                        len(lsa.bodies),
+                        first)
+        first += len(lsa.bodies)
+
+
+def _bodies(bodies: List[RLABody]) -> Iterator[bytes]:
+    first = 0
+    for b in bodies:
+        yield _BODY.pack(b.link_id,
+                         b.link_data,
+                         b.tos_zero,
+                         first,
+                         len(b.tos_and_metric),
+                         b.type)
+        first += len(b.tos_and_metric)
+
+
+def load(path: str, collect_stats: bool = False) -> Optional[Network]:
+    """
+    Load a network from a snapshot file. The file is memory mapped and the
+    routing tables are decoded lazily, so even large networks load quickly.
+    The routing tables are put into the network's cache, running the loaded
+    network does not recompute them, unless it is changed.
+
+    Returns None if the file is not a valid snapshot.
+
+    :path: path of the snapshot.
+    :collect_stats: whether the loaded network collects statistics.
+    """
+    with open(path, "rb") as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            msg("e", "Snapshot '%s' is empty.", path)
+            return None
+    view = memoryview(data)
+    if len(view) < _HEADER.size:
+        msg("e", "Snapshot '%s' is truncated.", path)
+        return None
+    (magic, version, net_flags, generation, has_dr, has_bdr, dr, bdr,
+     n_routers, n_lsas, n_bodies, n_tos, n_entries) =\
+        _HEADER.unpack_from(view)
+    if magic != MAGIC:
+        msg("e", "'%s' is not a network snapshot.", path)
+        return None
+    if version != VERSION:
+        msg("e", "Snapshot '%s' has an unsupported version %s.", path, version)
+        return None
+
+    sizes = [(n_routers, _ROUTER),
+             (n_lsas, _LSA),
+             (n_bodies, _BODY),
+             (n_tos, _TOS),
+             (n_entries, _ENTRY)]
+    offsets = []
+    offset = _HEADER.size
+    for n, record in sizes:
+        offsets.append(offset)
+        offset += n * record.size
+    if len(view) < offset:
+        msg("e", "Snapshot '%s' is truncated.", path)
+        return None
+    routers_at, lsas_at, bodies_at, tos_at, entries_at = offsets
+
+    def table(at: int, n: int, record: struct.Struct) -> Iterator[tuple]:
+        return record.iter_unpack(view[at:at + n * record.size])
+
+    net = Network(collect_stats, lfa=bool(net_flags & _LFA))
+    net.generation = generation
+    net.has_dr, net.has_bdr, net._dr, net._bdr =\
+        bool(has_dr), bool(has_bdr), dr, bdr
+
+    tos = list(table(tos_at, n_tos, _TOS))
+    bodies = [RLABody(link_id,
+                      link_data,
+                      n,
+                      tos_zero,
+                      dict(tos[first:first + n]),
+                      type)
+              for link_id, link_data, tos_zero, first, n, type
+              in table(bodies_at, n_bodies, _BODY)]
+
+    for index, id, priority, flags, first, n in\
+            table(routers_at, n_routers, _ROUTER):
+        router = Router(IpAddress(id),
+                        index,
+                        priority,
+                        bool(flags & _MA),
+                        lfa=net.lfa)
+        if flags & _DR:
+            router.set_dr()
+        if flags & _BDR:
+            router.set_bdr()
+        start = entries_at + first * _ENTRY.size
+        end = start + n * _ENTRY.size
+        rt = MappedRoutingTable(view[start:end])
+        # statistics are only turned on afterwards, otherwise counting the
+        # changed routes would decode the table right away
+        router.set_rt(rt)
+        router.enable_stats(collect_stats)
+        net._routers[index] = router
+        net._start(router)
+        # the entries live in the mapped file, not on the heap
+        net._cache.put(("rt", index, generation), rt, _MAPPED_SIZE)
+
+    for (age, options, ls_type, ls_id, adv, seq, checksum, length, flags,
+         n, first) in table(lsas_at, n_lsas, _LSA):
+        lsa = LinkStateAdvertisement(age,
+                                     options,
+                                     ls_type,
+                                     ls_id,
+                                     adv,
+                                     seq,
+                                     checksum,
+                                     length,
+                                     bool(flags & _V),
+                                     bool(flags & _E),
+                                     bool(flags & _B),
+                                     n,
+                                     bodies[first:first + n])
+        net._lsas[adv] = lsa
+        for body in lsa.bodies:
+            if body.type == LinkType.STUB:
+                net._stubs.setdefault(adv, {})[(body.link_id,
+                                                body.link_data)] = body
+                continue
+            net._links.setdefault(adv, {})[body.link_data] = body
+            r1, r2 = net.find_id(adv), net.find_id(body.link_data)
+            if r1 and r2:
+                r1.add_neighbor(r2.send_hello())
+
+    return net
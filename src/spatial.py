@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+
+from typing import Dict, Generic, Iterator, List, Optional, Tuple, TypeVar
+
+from .constants import RADIUS
+
+
+T = TypeVar("T")
+
+
+class GridIndex(Generic[T]):
+    """
+    A uniform grid spatial index over objects placed on the canvas.
+
+    Each object is stored in the cell containing its center. As long as no
+    object reaches further than one cell from its center, a point lookup only
+    has to look at the 3x3 block of cells around the point, no matter how many
+    objects there are.
+
+    Stored objects have to provide `x` and `y` attributes and an
+    `is_in(coords)` method, like `RouterGui` and `SwitchGui` do.
+
+    ---
+    Attributes:
+    ---
+    * _size: int : width and height of a single cell.
+    * _cells: Dict[Tuple[int, int], List[T]] : objects in each non-empty cell.
+    * _where: Dict[int, Tuple[int, int]] : cell of each object, keyed by the
+      object's `id()`.
+    """
+    def __init__(self, size: int = 4 * RADIUS) -> None:
+        self._size: int = size
+        self._cells: Dict[Tuple[int, int], List[T]] = dict()
+        self._where: Dict[int, Tuple[int, int]] = dict()
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        return (int(x // self._size), int(y // self._size))
+
+    def insert(self, o: T) -> None:
+        """
+        Add an object to the index.
+        """
+        cell = self._cell(o.x, o.y)  # type: ignore
+        self._cells.setdefault(cell, []).append(o)
+        self._where[id(o)] = cell
+
+    def remove(self, o: T) -> None:
+        """
+        Remove an object from the index, if it is there.
+        """
+        cell = self._where.pop(id(o), None)
+        if cell is None:
+            return
+        bucket = self._cells[cell]
+        bucket.remove(o)
+        if not bucket:
+            del self._cells[cell]
+
+    def at(self, coords: Tuple[float, float]) -> Optional[T]:
+        """
+        Return an object located at the given point, None if there is none.
+
+        :coords: coordinates of the point.
+        """
+        cx, cy = self._cell(*coords)
+        for i in (cx - 1, cx, cx + 1):
+            for j in (cy - 1, cy, cy + 1):
+                for o in self._cells.get((i, j), ()):
+                    if o.is_in(coords):  # type: ignore
+                        return o
+        return None
+
+    def query(self,
+              x0: float,
+              y0: float,
+              x1: float,
+              y1: float) -> Iterator[T]:
+        """
+        Yield all objects, whose center lies within a rectangle.
+
+        :x0, y0: top left corner of the rectangle.
+        :x1, y1: bottom right corner of the rectangle.
+        """
+        c0x, c0y = self._cell(x0, y0)
+        c1x, c1y = self._cell(x1, y1)
+        if (c1x - c0x + 1) * (c1y - c0y + 1) > len(self._cells):
+            cells = (c for c in self._cells if c0x <= c[0] <= c1x
+                                           and c0y <= c[1] <= c1y)
+        else:
+            cells = ((i, j) for i in range(c0x, c1x + 1)
+                            for j in range(c0y, c1y + 1))
+        for cell in cells:
+            for o in self._cells.get(cell, ()):
+                if x0 <= o.x <= x1 and y0 <= o.y <= y1:  # type: ignore
+                    yield o
+
+    def __len__(self) -> int:
+        return len(self._where)
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+
+import cProfile
+from functools import wraps
+from time import perf_counter, process_time
+from typing import Any, Callable, Dict, List, TypeVar
+
+
+PHASES = ("ingest",
+          "election",
+          "lsdb_install",
+          "graph_build",
+          "spf",
+          "path_extraction",
+          "hello")
+
+COUNTERS = ("heap_pushes",
+            "heap_pops",
+            "relaxations",
+            "lsas_installed",
+            "routes_changed",
+            "spf_runs",
+            "hellos_sent",
+            "hellos_dropped",
+            "neighbor_changes")
+
+T = TypeVar("T")
+
+
+class _Timer:
+    """
+    Context manager measuring the wall and CPU time of a single phase. The
+    time of phases timed inside of it is left out, so every second is
+    counted in a single phase only and the phases add up to the total.
+    """
+    __slots__ = ("_stats", "_phase", "_wall", "_cpu", "_inner")
+
+    def __init__(self, stats: "Stats", phase: str) -> None:
+        self._stats = stats
+        self._phase = phase
+        self._wall = 0.0
+        self._cpu = 0.0
+        self._inner = [0.0, 0.0]
+
+    def __enter__(self) -> "_Timer":
+        self._stats._active.append(self)
+        self._wall = perf_counter()
+        self._cpu = process_time()
+        return self
+
+    def __exit__(self, *_) -> bool:
+        wall = perf_counter() - self._wall
+        cpu = process_time() - self._cpu
+        active = self._stats._active
+        active.pop()
+        if active:
+            outer = active[-1]._inner
+            outer[0] += wall
+            outer[1] += cpu
+        self._stats.add_time(self._phase,
+                             wall - self._inner[0],
+                             cpu - self._inner[1])
+        return False
+
+
+class _NullTimer:
+    """
+    Timer used when statistics are disabled, it does nothing at all.
+    """
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullTimer":
+        return self
+
+    def __exit__(self, *_) -> bool:
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Stats:
+    """
+    Per-phase timers and counters of a network simulation.
+
+    When disabled, `timer()` hands out a shared no-op context manager and
+    `count()` returns right away, so instrumented code pays only for a single
+    attribute check. Hot loops should count into local variables and report
+    the totals once.
+
+    ---
+    Attributes:
+    ---
+    * enabled: bool : whether anything is being recorded.
+    * _wall: Dict[str, float] : wall clock seconds spent in each phase.
+    * _cpu: Dict[str, float] : CPU seconds spent in each phase.
+    * _counters: Dict[str, int] : event counters, see `COUNTERS`.
+    * _active: List[_Timer] : timers currently running, the innermost last.
+    """
+    def __init__(self, enabled: bool = False) -> None:
+        self.enabled: bool = enabled
+        self._wall: Dict[str, float] = dict()
+        self._cpu: Dict[str, float] = dict()
+        self._counters: Dict[str, int] = dict()
+        self._active: List[_Timer] = []
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Zero all timers and counters.
+        """
+        self._wall = dict.fromkeys(PHASES, 0.0)
+        self._cpu = dict.fromkeys(PHASES, 0.0)
+        self._counters = dict.fromkeys(COUNTERS, 0)
+
+    def timer(self, phase: str):
+        """
+        Return a context manager timing the given phase.
+
+        :phase: name of the phase, one of `PHASES`.
+        """
+        if self.enabled:
+            return _Timer(self, phase)
+        return _NULL_TIMER
+
+    def add_time(self, phase: str, wall: float, cpu: float) -> None:
+        """
+        Add already measured time to a phase.
+        """
+        self._wall[phase] = self._wall.get(phase, 0.0) + wall
+        self._cpu[phase] = self._cpu.get(phase, 0.0) + cpu
+
+    def count(self, counter: str, n: int = 1) -> None:
+        """
+        Increment a counter by `n`.
+
+        :counter: name of the counter, one of `COUNTERS`.
+        :n: the increment.
+        """
+        if self.enabled:
+            self._counters[counter] = self._counters.get(counter, 0) + n
+
+    def merge(self, other: "Stats") -> None:
+        """
+        Add all timers and counters of another `Stats` object to this one.
+        """
+        for phase, wall in other._wall.items():
+            self.add_time(phase, wall, other._cpu.get(phase, 0.0))
+        for counter, n in other._counters.items():
+            self._counters[counter] = self._counters.get(counter, 0) + n
+
+    def as_dict(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Return a copy of all timers and counters.
+        """
+        return {"wall": dict(self._wall),
+                "cpu": dict(self._cpu),
+                "counters": dict(self._counters)}
+
+
+def timed(phase: str) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    """
+    Decorator timing a whole method as a phase. The object the method belongs
+    to has to keep its `Stats` in the `_stats` attribute.
+
+    :phase: name of the phase, one of `PHASES`.
+    """
+    def decorator(func: Callable[..., T]) -> Callable[..., T]:
+        @wraps(func)
+        def wrapper(self, *args, **kwargs) -> T:
+            if not self._stats.enabled:
+                return func(self, *args, **kwargs)
+            with self._stats.timer(phase):
+                return func(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def profile(path: str, func: Callable[..., T], *args, **kwargs) -> T:
+    """
+    Run a function under cProfile and write the result into a `.prof` file,
+    which can be inspected with `pstats` or `snakeviz`.
+
+    :path: path of the output file.
+    :func: the function to profile.
+    """
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func, *args, **kwargs)
+    finally:
+        profiler.dump_stats(path)
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class Timer:
+    """
+    A callback scheduled on a `TimerWheel`.
+
+    ---
+    Attributes:
+    ---
+    * expires: int : tick the timer fires at.
+    * callback: Callable : called with `args` once the timer fires.
+    * args: tuple : arguments of the callback.
+    * _slot: Optional[Dict[int, Timer]] : slot of the wheel the timer waits
+      in, None once it fired or was cancelled.
+    """
+    __slots__ = ("expires", "callback", "args", "_slot")
+
+    def __init__(self,
+                 expires: int,
+                 callback: Callable[..., Any],
+                 args: Tuple[Any, ...]) -> None:
+        self.expires: int = expires
+        self.callback: Callable[..., Any] = callback
+        self.args: Tuple[Any, ...] = args
+        self._slot: Optional[Dict[int, Timer]] = None
+
+    @property
+    def pending(self) -> bool:
+        """
+        Whether the timer is still waiting to fire.
+        """
+        return self._slot is not None
+
+
+class TimerWheel:
+    """
+    Hierarchical timer wheel, as used by operating system kernels.
+
+    Every level is a ring of slots, a slot of the lowest level covers a
+    single tick, a slot of every level above covers a whole turn of the level
+    below. A timer is put into the lowest level, whose turn reaches its
+    expiry, so scheduling and cancelling a timer take constant time, no
+    matter how many timers there are. Each tick fires one slot of the lowest
+    level, whenever a level completes a turn, the next slot of the level
+    above is spread over the levels below. Only timers, which are about to
+    fire, are ever touched, instead of scanning all of them every tick.
+
+    ---
+    Attributes:
+    ---
+    * now: int : current tick.
+    * _bits: int : the number of slots of each level is 2 ** bits.
+    * _levels: List[List[Dict[int, Timer]]] : slots of every level, the
+      timers in a slot are keyed by their `id()`.
+    * _count: int : number of pending timers.
+    """
+    def __init__(self, bits: int = 8, levels: int = 4) -> None:
+        """
+        Create a new timer wheel.
+
+        :bits: the number of slots of each level is 2 ** bits.
+        :levels: number of levels, timers further away than
+                 2 ** (bits * levels) ticks wait in the highest level, until
+                 they come into its reach.
+        """
+        self.now: int = 0
+        self._bits: int = bits
+        self._levels: List[List[Dict[int, Timer]]] =\
+            [[dict() for _ in range(1 << bits)] for _ in range(levels)]
+        self._count: int = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def schedule(self,
+                 delay: int,
+                 callback: Callable[..., Any],
+                 *args: Any) -> Timer:
+        """
+        Call a callback after a number of ticks, at least one.
+
+        :delay: number of ticks from now.
+        :callback: the callback.
+        :args: arguments the callback is called with.
+        """
+        timer = Timer(self.now + max(1, delay), callback, args)
+        self._insert(timer)
+        self._count += 1
+        return timer
+
+    def cancel(self, timer: Optional[Timer]) -> None:
+        """
+        Stop a timer from firing, nothing happens if it is not pending.
+        """
+        if timer is None or timer._slot is None:
+            return
+        del timer._slot[id(timer)]
+        timer._slot = None
+        self._count -= 1
+
+    def _insert(self, timer: Timer) -> None:
+        """
+        Put a timer into the slot of the lowest level, whose turn reaches its
+        expiry.
+        """
+        bits = self._bits
+        mask = (1 << bits) - 1
+        delta = timer.expires - self.now
+        top = len(self._levels) - 1
+        for level in range(top + 1):
+            if delta < 1 << (bits * (level + 1)) or level == top:
+                expires = timer.expires
+                if level == top and delta >= 1 << (bits * (level + 1)):
+                    # out of reach, it waits in the last slot the highest
+                    # level can see and is put back in, once that comes up
+                    expires = self.now + (1 << (bits * (level + 1))) - 1
+                slot = self._levels[level][(expires >> (bits * level)) & mask]
+                slot[id(timer)] = timer
+                timer._slot = slot
+                return
+
+    def _cascade(self, level: int) -> None:
+        """
+        Spread the timers of the slot of a level, which has just come up, over
+        the levels below it.
+        """
+        mask = (1 << self._bits) - 1
+        index = (self.now >> (self._bits * level)) & mask
+        if index == 0 and level + 1 < len(self._levels):
+            self._cascade(level + 1)
+        slot = self._levels[level][index]
+        if not slot:
+            return
+        timers = list(slot.values())
+        slot.clear()
+        for timer in timers:
+            self._insert(timer)
+
+    def advance(self, ticks: int = 1) -> int:
+        """
+        Move the time forward, firing every timer, which expires on the way.
+        Callbacks may schedule and cancel timers. Returns the number of timers
+        fired.
+
+        :ticks: number of ticks to move forward.
+        """
+        mask = (1 << self._bits) - 1
+        fired = 0
+        for _ in range(ticks):
+            if not self._count:
+                # nothing to fire, the slots are all empty
+                self.now += ticks - _
+                break
+            self.now += 1
+            if not self.now & mask and len(self._levels) > 1:
+                self._cascade(1)
+            slot = self._levels[0][self.now & mask]
+            while slot:
+                _, timer = slot.popitem()
+                timer._slot = None
+                self._count -= 1
+                fired += 1
+                timer.callback(*timer.args)
+        return fired
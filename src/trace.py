@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Traces of topology changes, recorded from a network and replayed into a new
+one, to compare how the routing engines cope with churn.
+
+A trace is a text file with one event per line:
+
+    <time> <event> <arguments>... [<tos>:<metric>]...
+
+    router_join   index, router ID, priority, multi-access(0 or 1)
+    router_leave  index
+    link_up       index of both routers, cost, costs per type of service
+    link_down     index of both routers
+    cost          index of both routers, cost, type of service
+    stub_up       index, network address, network mask, cost, costs per
+                  type of service
+    stub_down     index, network address, network mask
+
+Empty lines and lines starting with '#' are skipped.
+"""
+
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .net import ENGINES, Network
+from .utils import msg
+
+
+EVENTS = {"router_join": 4,
+          "router_leave": 1,
+          "link_up": 3,
+          "link_down": 2,
+          "cost": 4,
+          "stub_up": 4,
+          "stub_down": 3}
+
+
+@dataclass
+class TraceEvent:
+    """
+    A single topology change.
+
+    ---
+    Attributes:
+    ---
+    * time: float : when the change happened, in simulated seconds.
+    * kind: str : type of the change, one of `EVENTS`.
+    * args: Tuple[int, ...] : arguments of the change, see the module
+      documentation.
+    * metrics: Dict[int, int] : costs per type of service of a new link or
+      stub network.
+    """
+    time: float
+    kind: str
+    args: Tuple[int, ...]
+    metrics: Dict[int, int] = field(default_factory=dict)
+
+    def apply(self, net: Network) -> None:
+        """
+        Make the change to a network.
+        """
+        a = self.args
+        if self.kind == "router_join":
+            net.add_routers([(a[0], a[1], a[2], bool(a[3]))])
+        elif self.kind == "router_leave":
+            net.remove_router(a[0])
+        elif self.kind == "link_up":
+            net.add_links([(a[0], a[1], a[2], self.metrics)])
+        elif self.kind == "link_down":
+            net.remove_link(a[0], a[1])
+        elif self.kind == "cost":
+            net.update_cost(a[0], a[1], a[2], a[3])
+        elif self.kind == "stub_up":
+            net.add_stubs([(a[0], a[1], a[2], a[3], self.metrics)])
+        elif self.kind == "stub_down":
+            net.remove_stub(a[0], a[1], a[2])
+
+    def to_line(self) -> str:
+        """
+        Encode the event as a line of a trace file, without the line break.
+        """
+        return " ".join([repr(self.time), self.kind] +
+                        [str(x) for x in self.args] +
+                        [f"{tos}:{metric}" for tos, metric
+                         in sorted(self.metrics.items())])
+
+    @classmethod
+    def from_line(cls, line: str) -> Optional["TraceEvent"]:
+        """
+        Decode a line of a trace file, None if it is not a valid event.
+        """
+        fields = line.split()
+        if len(fields) < 2 or fields[1] not in EVENTS:
+            return None
+        n = EVENTS[fields[1]]
+        try:
+            time = float(fields[0])
+            args = tuple(int(x) for x in fields[2:2 + n])
+            metrics = {int(tos): int(metric) for tos, metric
+                       in (x.split(":") for x in fields[2 + n:])}
+        except ValueError:
+            return None
+        if len(args) != n:
+            return None
+        return cls(time, fields[1], args, metrics)
+
+
+class Trace:
+    """
+    A sequence of topology changes, in the order they happened.
+
+    A network records into a trace, once it is given one, see
+    `Network.record()`.
+
+    ---
+    Attributes:
+    ---
+    * events: List[TraceEvent] : the changes.
+    """
+    def __init__(self, events: Optional[List[TraceEvent]] = None) -> None:
+        self.events: List[TraceEvent] = events if events else list()
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def __iter__(self) -> Iterator[TraceEvent]:
+        return iter(self.events)
+
+    def record(self,
+               time: float,
+               kind: str,
+               *args: int,
+               metrics: Optional[Dict[int, int]] = None) -> None:
+        """
+        Append a change to the trace.
+
+        :time: when the change happened, in simulated seconds.
+        :kind: type of the change, one of `EVENTS`.
+        :args: arguments of the change.
+        :metrics: costs per type of service of a new link or stub network.
+        """
+        self.events.append(TraceEvent(float(time),
+                                      kind,
+                                      tuple(int(x) for x in args),
+                                      dict(metrics) if metrics else {}))
+
+    def save(self, path: str) -> None:
+        """
+        Write the trace into a file.
+
+        :path: path of the output file.
+        """
+        with open(path, "w", buffering=1 << 16) as f:
+            for event in self.events:
+                f.write(event.to_line())
+                f.write("\n")
+
+    @classmethod
+    def load(cls, path: str) -> Optional["Trace"]:
+        """
+        Read a trace from a file, None if it is not a valid trace.
+
+        :path: path of the trace.
+        """
+        events = []
+        with open(path) as f:
+            for number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                event = TraceEvent.from_line(line)
+                if event is None:
+                    msg("e", "Line %s of trace '%s' is not a valid event.",
+                        number, path)
+                    return None
+                events.append(event)
+        return cls(events)
+
+
+@dataclass
+class StepResult:
+    """
+    What it took to bring the routing tables up to date after a step of a
+    replayed trace.
+
+    ---
+    Attributes:
+    ---
+    * events: List[TraceEvent] : the changes made in the step.
+    * spf_runs: int : number of shortest path trees computed.
+    * spf_time: float : wall clock seconds spent computing them.
+    * graph_time: float : wall clock seconds spent building graphs.
+    * routes_changed: int : number of routes, which changed in any routing
+      table, the routes of a removed router count as changed too.
+    * wall_time: float : wall clock seconds taken by the whole step.
+    * engine: str : the engine, which computed the routing tables, 'dense' or
+      'dijkstra', even if the network picks it on its own.
+    """
+    events: List[TraceEvent]
+    spf_runs: int
+    spf_time: float
+    graph_time: float
+    routes_changed: int
+    wall_time: float
+    engine: str
+
+    @property
+    def time_per_spf(self) -> float:
+        """
+        Average wall clock seconds per shortest path tree.
+        """
+        return self.spf_time / self.spf_runs if self.spf_runs else 0.0
+
+
+@dataclass
+class ReplayReport:
+    """
+    Results of replaying a trace with one routing engine.
+
+    ---
+    Attributes:
+    ---
+    * engine: str : the engine asked for, see `Network`, followed by the
+      engines it resolved to, when the network picked them on its own, e.g.
+      'auto→dense' or 'auto→dijkstra+dense', if it switched during the
+      replay.
+    * steps: List[StepResult] : results of every step.
+    """
+    engine: str
+    steps: List[StepResult]
+
+    def totals(self) -> Dict[str, float]:
+        """
+        Return the results of all steps summed up.
+        """
+        return {"steps": len(self.steps),
+                "spf_runs": sum(s.spf_runs for s in self.steps),
+                "spf_time": sum(s.spf_time for s in self.steps),
+                "graph_time": sum(s.graph_time for s in self.steps),
+                "routes_changed": sum(s.routes_changed for s in self.steps),
+                "wall_time": sum(s.wall_time for s in self.steps)}
+
+
+def _steps(trace: Trace, group: bool) -> Iterator[List[TraceEvent]]:
+    step: List[TraceEvent] = []
+    for event in trace:
+        if step and not (group and event.time == step[-1].time):
+            yield step
+            step = []
+        step.append(event)
+    if step:
+        yield step
+
+
+def replay(trace: Trace,
+           engine: str = "auto",
+           lfa: bool = False,
+           group: bool = False) -> ReplayReport:
+    """
+    Drive the changes of a trace into a new network, bringing the routing
+    tables of all routers up to date after every step, and measure what it
+    took.
+
+    :trace: the trace.
+    :engine: routing engine of the network, see `Network`.
+    :lfa: whether the routing tables include loop-free alternates.
+    :group: whether changes, which happened at the same time, are made in a
+            single step, otherwise every change is a step of its own.
+    """
+    net = Network(collect_stats=True, engine=engine, lfa=lfa)
+    steps = []
+    before = net.stats()
+    used: List[str] = []
+    for events in _steps(trace, group):
+        start = perf_counter()
+        for event in events:
+            event.apply(net)
+        resolved = "dense" if net._use_dense() else "dijkstra"
+        if resolved not in used:
+            used.append(resolved)
+        net.compute_tables()
+        wall = perf_counter() - start
+        after = net.stats()
+        steps.append(StepResult(
+            events,
+            after["counters"]["spf_runs"] - before["counters"]["spf_runs"],
+            after["wall"]["spf"] - before["wall"]["spf"],
+            after["wall"]["graph_build"] - before["wall"]["graph_build"],
+            after["counters"]["routes_changed"] -
+            before["counters"]["routes_changed"],
+            wall,
+            resolved))
+        before = after
+    if net.engine == "auto" and used:
+        return ReplayReport("auto→" + "+".join(used), steps)
+    return ReplayReport(net.engine, steps)
+
+
+def compare_engines(trace: Trace,
+                    engines: Sequence[str] = ENGINES,
+                    lfa: bool = False,
+                    group: bool = False) -> Dict[str, ReplayReport]:
+    """
+    Replay a trace with every given routing engine, see `replay()`.
+    """
+    return {engine: replay(trace, engine, lfa, group) for engine in engines}
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Link loads and utilization caused by a traffic matrix, when the traffic is
+routed along the computed routing tables.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .forward import Forwarder
+from .utils import msg
+
+
+@dataclass
+class LinkUtilization:
+    """
+    Load of every link of a network under a traffic matrix.
+
+    ---
+    Attributes:
+    ---
+    * links: np.ndarray : indexes of the routers each link connects, one link
+      per row.
+    * load: np.ndarray : traffic carried by each link.
+    * capacity: np.ndarray : capacity of each link, infinite if unknown.
+    * utilization: np.ndarray : load divided by capacity.
+    * unrouted: float : traffic, which never reaches its destination, because
+      of a missing route or a routing loop.
+    """
+    links: np.ndarray
+    load: np.ndarray
+    capacity: np.ndarray
+    utilization: np.ndarray
+    unrouted: float
+
+    def hot_links(self,
+                  count: Optional[int] = None
+                  ) -> List[Tuple[Tuple[int, int], float, float]]:
+        """
+        Return links carrying any traffic as (link, load, utilization), the
+        most utilized first.
+
+        :count: return only this many links, all if not given.
+        """
+        used = np.nonzero(self.load)[0]
+        # ties in utilization are broken by the load
+        order = used[np.lexsort((-self.load[used], -self.utilization[used]))]
+        return [((int(self.links[i, 0]), int(self.links[i, 1])),
+                 float(self.load[i]),
+                 float(self.utilization[i]))
+                for i in order[:count]]
+
+
+def link_utilization(fwd: Forwarder,
+                     demand: np.ndarray,
+                     capacities: Union[Dict[Tuple[int, int], float],
+                                       np.ndarray, None] = None
+                     ) -> Optional[LinkUtilization]:
+    """
+    Route a traffic matrix over a network and compute the load and the
+    utilization of every link.
+
+    Traffic to a destination flows along the tree formed by every router's
+    next hop towards it. The trees of all destinations are processed
+    together, one level at a time, starting with the routers furthest from
+    their destination. Each router passes everything it received, along with
+    its own demand, on to its next hop, so no (source, destination) pair has
+    to be followed on its own.
+
+    Returns None if the traffic matrix does not match the network.
+
+    :fwd: forwarding engine compiled from the network's routing tables.
+    :demand: N×N matrix of traffic from router(row) to router(column), the
+             routers ordered like `fwd.routers`.
+    :capacities: capacity of each link, either keyed by the indexes of the
+                 routers it connects, or ordered like `fwd.links`.
+    """
+    n, m = len(fwd.routers), len(fwd.links)
+    demand = np.asarray(demand, dtype=np.float64)
+    if demand.shape != (n, n):
+        msg("e", "Traffic matrix has to be %sx%s, not %s.", n, n, demand.shape)
+        return None
+
+    via = fwd._via
+    cols = np.arange(n)
+    hop = np.where(via >= 0, fwd._ends[np.maximum(via, 0)], -1)
+
+    # (router, destination) pairs one hop further from the destination than
+    # the pairs of the previous level, found by looking up which pairs have
+    # their next hop in the previous level, so every pair is visited once.
+    # Routers caught in a loop or in a black hole are never reached.
+    flat = np.flatnonzero((hop >= 0) & (cols[:, None] != cols[None, :]))
+    parent = hop.ravel()[flat] * n + flat % n
+    order = np.argsort(parent)
+    flat, parent = flat[order], parent[order]
+    levels = []
+    frontier = cols * n + cols
+    while True:
+        start = np.searchsorted(parent, frontier, "left")
+        count = np.searchsorted(parent, frontier, "right") - start
+        total = int(count.sum())
+        if not total:
+            break
+        offset = np.repeat(start - np.cumsum(count) + count, count)
+        frontier = flat[offset + np.arange(total)]
+        levels.append(frontier)
+
+    flow = demand.copy()
+    reached = np.zeros(n * n, dtype=bool)
+    reached[cols * n + cols] = True
+    load = np.zeros(m, dtype=np.float64)
+    for pairs in reversed(levels):
+        reached[pairs] = True
+        r, d = np.divmod(pairs, n)
+        f = flow[r, d]
+        np.add.at(flow, (hop[r, d], d), f)
+        load += np.bincount(via[r, d], weights=f, minlength=m)
+
+    if capacities is None:
+        capacity = np.full(m, np.inf)
+    elif isinstance(capacities, dict):
+        capacity = np.array([capacities.get((int(a), int(b)), np.inf)
+                             for a, b in fwd.links], dtype=np.float64)
+    else:
+        capacity = np.asarray(capacities, dtype=np.float64)
+        if capacity.shape != (m,):
+            msg("e", "Expected capacities of %s links, got %s.", m, capacity.shape)
+            return None
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        utilization = np.where(capacity > 0, load / capacity, np.inf)
+    utilization[load == 0] = 0.0
+    return LinkUtilization(fwd.links,
+                           load,
+                           capacity,
+                           utilization,
+                           float(demand.ravel()[~reached].sum()))
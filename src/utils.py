@@ -1,15 +1,96 @@
+import sys
+from typing import Any, Dict, Optional, TextIO
+
 from .constants import flag_debug, flag_silent
 
-def msg(type: str, message: str) -> None:
-    # FIXME: Use a match statement here!
-    if not flag_silent: 
-        if type == "w":
-            print(f"[WARNINIG] {message}")
-        if type == "e":
-            print(f"[ERROR] {message}")
-        if type == "m":
-            print(f"[MESSAGE] {message}")
-
-def debug(message: str) -> None:
-    if flag_debug:
-        print(f"[DEBUG] {message}")
+
+DEBUG = 10
+MESSAGE = 20
+WARNING = 30
+ERROR = 40
+SILENT = 100
+
+_NAMES: Dict[int, str] = {DEBUG: "DEBUG",
+                          MESSAGE: "MESSAGE",
+                          WARNING: "WARNING",
+                          ERROR: "ERROR"}
+
+_TYPES: Dict[str, int] = {"m": MESSAGE,
+                          "w": WARNING,
+                          "e": ERROR}
+
+
+class Logger:
+    """
+    A small leveled logger.
+
+    Messages are `%`-style format strings, which are only formatted once the
+    message is really going to be written. Arguments, which are callables,
+    are called at that point too, so an expensive value can be deferred with
+    a `lambda`. Code on hot paths should check `enabled()` first, so that not
+    even the arguments are built when the logger is off.
+
+    ---
+    Attributes:
+    ---
+    * level: int : messages below this level are dropped.
+    * _out: Optional[TextIO] : where messages are written, `sys.stdout` when
+      not set.
+    """
+    __slots__ = ("level", "_out")
+
+    def __init__(self, level: int = MESSAGE, out: Optional[TextIO] = None) -> None:
+        self.level: int = level
+        self._out: Optional[TextIO] = out
+
+    def enabled(self, level: int) -> bool:
+        """
+        Check whether messages of the given level are written.
+        """
+        return level >= self.level
+
+    def log(self, level: int, message: str, *args: Any) -> None:
+        """
+        Write a message, if its level is enabled.
+
+        :level: level of the message.
+        :message: the message, a `%`-style format string when `args` are
+                  given.
+        :args: format arguments, callables are called before formatting.
+        """
+        if level < self.level:
+            return
+        if args:
+            message = message % tuple(a() if callable(a) else a for a in args)
+        print(f"[{_NAMES.get(level, level)}] {message}",
+              file=self._out if self._out else sys.stdout)
+
+    def debug(self, message: str, *args: Any) -> None:
+        self.log(DEBUG, message, *args)
+
+    def message(self, message: str, *args: Any) -> None:
+        self.log(MESSAGE, message, *args)
+
+    def warning(self, message: str, *args: Any) -> None:
+        self.log(WARNING, message, *args)
+
+    def error(self, message: str, *args: Any) -> None:
+        self.log(ERROR, message, *args)
+
+
+log = Logger(DEBUG if flag_debug else SILENT if flag_silent else MESSAGE)
+
+
+def msg(type: str, message: str, *args: Any) -> None:
+    """
+    Write a message of the given type: 'm' for a message, 'w' for a warning
+    and 'e' for an error.
+    """
+    log.log(_TYPES.get(type, MESSAGE), message, *args)
+
+
+def debug(message: str, *args: Any) -> None:
+    """
+    Write a debug message.
+    """
+    log.log(DEBUG, message, *args)
@@ -0,0 +1,23 @@
+import copy
+import pickle
+
+from src.ip import IpAddress
+from src.router import Router
+
+
+def test_pickle_round_trip():
+    ip = IpAddress(5)
+    assert pickle.loads(pickle.dumps(ip)) is ip
+
+
+def test_deepcopy():
+    ip = IpAddress(string="10.0.0.1")
+    assert copy.deepcopy(ip) is ip
+    assert copy.copy(ip) is ip
+
+
+def test_router_with_address_pickles():
+    router = Router(IpAddress(7), 1, 1, False)
+    copied = pickle.loads(pickle.dumps(router))
+    assert copied.id is IpAddress(7)
+    assert copy.deepcopy(router).id.get() == 7
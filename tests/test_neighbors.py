@@ -0,0 +1,35 @@
+from src.neighbor import NeighborState
+from src.net import Network
+
+
+def _network():
+    net = Network()
+    net.add_routers([(1, 1, 1, False), (2, 2, 1, False)])
+    net.add_links([(1, 2, 1), (2, 1, 1)])
+    net.tick(30)
+    return net
+
+
+def test_link_in_both_directions_is_full():
+    net = _network()
+    assert net.find_id(1).neighbors() == {2: NeighborState.FULL}
+    assert net.find_id(2).neighbors() == {1: NeighborState.FULL}
+
+
+def test_one_way_removal():
+    net = _network()
+    net.remove_link(1, 2)
+    net.tick(30)
+    # router 2 no longer hears router 1, router 1 still hears router 2, but
+    # is not listed in its Hello messages anymore
+    assert net.find_id(2).neighbors() == {}
+    assert net.find_id(1).neighbors() == {2: NeighborState.INIT}
+
+
+def test_one_way_link_never_becomes_two_way():
+    net = Network()
+    net.add_routers([(1, 1, 1, False), (2, 2, 1, False)])
+    net.add_links([(1, 2, 1)])
+    net.tick(30)
+    assert net.find_id(1).neighbors() == {}
+    assert net.find_id(2).neighbors() == {1: NeighborState.INIT}